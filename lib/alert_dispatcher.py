@@ -0,0 +1,153 @@
+'''
+    release date: 2026-10-19
+        - 경고 신호 비동기 전송 (프레임 루프가 경고 장치 응답을 기다리지 않음)
+        - 이벤트 단위 중복 제거, 동일 신호 전송 간격 제한, 백오프 재시도, 전송 지연 집계
+'''
+
+import threading
+import time
+from queue import Queue, Empty, Full
+
+from lib.metrics import RollingStats
+
+
+class AlertDispatcher:
+    """
+    RPIClient / WebhookClient를 감싸 전용 스레드에서 send_signal을 수행합니다.
+
+    - dispatch(): 큐에 넣고 즉시 반환 (큐가 가득 차면 버리고 False)
+    - 같은 (message, event_key)는 dedup_window 동안 한 번만 전송
+    - 같은 message는 min_interval 이내 재전송하지 않음 (경광등이 이미 켜진 상태)
+    - 실패 시 backoff_base * 2^n (최대 backoff_max) 간격으로 max_retries회 재시도
+      (다중 엔드포인트 WebhookClient는 실패한 엔드포인트로만 재전송)
+    """
+    def __init__(self, client, queue_size=16, dedup_window=10.0, min_interval=3.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=5.0):
+        self.client = client
+        self.queue = Queue(maxsize=queue_size)
+        self.dedup_window = dedup_window
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._recent_events = {}        # (message, event_key) -> 마지막 접수 시각
+        self._last_sent = {}            # message -> 마지막 전송 성공 시각
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # 지표
+        self.send_latency = RollingStats()          # 장치 호출 1회 소요 (ms)
+        self.delivery_latency = RollingStats()      # 접수 ~ 전송 성공 (ms)
+        self.sent_count = 0
+        self.failed_count = 0
+        self.deduped_count = 0
+        self.rate_limited_count = 0
+        self.dropped_count = 0
+
+    @property
+    def is_connected(self):
+        return getattr(self.client, 'is_connected', False)
+
+    def connect(self):
+        """전송 스레드를 시작합니다. 장치 연결도 이 스레드에서 수행하므로 호출자는 대기하지 않습니다."""
+        if self._thread and self._thread.is_alive(): return True
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="AlertDispatcher", daemon=True)
+        self._thread.start()
+        return True
+
+    def dispatch(self, message, event_key=None):
+        now = time.time()
+        with self._lock:
+            # 오래된 이벤트 키 정리
+            for k in [k for k, t in self._recent_events.items() if now - t > self.dedup_window]:
+                del self._recent_events[k]
+            key = (message, event_key)
+            if event_key is not None and key in self._recent_events:
+                self.deduped_count += 1
+                return False
+
+            # 큐에 넣은 뒤에만 키를 남김 (버려진 신호 때문에 같은 이벤트의 재시도가 막히지 않도록)
+            try:
+                self.queue.put_nowait((message, now))
+            except Full:
+                self.dropped_count += 1
+                print(f"⚠️ 경고 신호 큐가 가득 차 '{message}' 신호를 버립니다.")
+                return False
+            if event_key is not None:
+                self._recent_events[key] = now
+            return True
+
+    def send_signal(self, message):
+        """기존 클라이언트와 같은 인터페이스. 이벤트 구분 없이 큐에 넣습니다."""
+        return self.dispatch(message)
+
+    def get_metrics(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'deduped': self.deduped_count,
+            'rate_limited': self.rate_limited_count,
+            'dropped': self.dropped_count,
+            'send_latency_ms': self.send_latency.summary(),
+            'delivery_latency_ms': self.delivery_latency.summary(),
+        }
+
+    def close(self, timeout=5):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.client.close()
+        print(f"🚨 경고 전송기 종료: {self.get_metrics()}")
+
+    def _run(self):
+        if hasattr(self.client, 'connect'):
+            self.client.connect()
+
+        while not self._stop_event.is_set():
+            try:
+                message, queued_at = self.queue.get(timeout=0.5)
+            except Empty:
+                continue
+
+            last = self._last_sent.get(message)
+            if last and queued_at - last < self.min_interval:
+                self.rate_limited_count += 1
+                continue
+
+            self._deliver(message, queued_at)
+
+    def _deliver(self, message, queued_at):
+        retry_endpoints = None
+        for attempt in range(self.max_retries + 1):
+            t0 = time.perf_counter()
+            try:
+                if retry_endpoints:
+                    ok = self.client.send_signal(message, endpoints=retry_endpoints)
+                else:
+                    ok = self.client.send_signal(message)
+                # 엔드포인트별 결과를 주는 클라이언트(WebhookClient)는 이미 성공한 곳에 다시 보내지 않음
+                retry_endpoints = getattr(self.client, 'last_failed', None) or retry_endpoints
+            except Exception as e:
+                print(f"❌ 경고 신호 전송 중 예기치 않은 오류 발생: {e}")
+                ok = False
+            self.send_latency.add((time.perf_counter() - t0) * 1000)
+
+            if ok:
+                now = time.time()
+                self._last_sent[message] = now
+                self.sent_count += 1
+                self.delivery_latency.add((now - queued_at) * 1000)
+                return True
+
+            if attempt < self.max_retries:
+                delay = min(self.backoff_base * (2 ** attempt), self.backoff_max)
+                print(f"🔁 경고 신호 재시도 {attempt + 1}/{self.max_retries} ({delay:.1f}s 후)")
+                if self._stop_event.wait(delay): break
+
+        self.failed_count += 1
+        print(f"❌ 경고 신호 '{message}' 전송 최종 실패")
+        return False
@@ -0,0 +1,141 @@
+'''
+    release date: 2026-10-19
+        - ffmpeg 파이프 기반 H.264 인코더 (faststart, CRF/최대 비트레이트 지정)
+        - cv2.VideoWriter와 같은 write()/release() 인터페이스
+        - clip_source = segments: 위반 클립을 원본 세그먼트(lib/segment_recorder.py)에서 재인코딩 없이 추출
+'''
+
+import os
+import shutil
+import subprocess
+import time
+
+import cv2
+
+DEFAULT_ENCODER = 'ffmpeg'
+DEFAULT_PRESET = 'veryfast'      # CPU 부담과 압축률의 절충점
+DEFAULT_CRF = 28
+
+
+def get_encoder_options(config):
+    """farm_config에서 인코더 설정을 추출합니다. (clip_crf는 parse_farm_config에서 형변환)"""
+    config = config or {}
+    crf = config.get('clip_crf')
+    return {
+        'encoder': (config.get('clip_encoder') or DEFAULT_ENCODER).lower(),
+        'preset': config.get('clip_preset') or DEFAULT_PRESET,
+        'crf': DEFAULT_CRF if crf is None or crf == '' else crf,     # 0(무손실)도 유효한 값
+        'max_bitrate': config.get('clip_max_bitrate') or None,      # 예: '800k'
+        'clip_source': (config.get('clip_source') or 'frames').lower(),     # frames | segments
+        'segment_dir': config.get('segment_dir') or None,
+    }
+
+
+class FFmpegVideoWriter:
+    """BGR 프레임을 ffmpeg(libx264) 프로세스 stdin으로 넘겨 MP4로 저장합니다."""
+    def __init__(self, path, fps, size, preset=DEFAULT_PRESET, crf=DEFAULT_CRF, max_bitrate=None, ffmpeg_bin='ffmpeg'):
+        self.path = path
+        self.frames = 0
+        self.start_time = None
+        self.stats = None
+        width, height = size
+
+        cmd = [
+            ffmpeg_bin, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+            '-an', '-c:v', 'libx264', '-preset', preset, '-crf', str(crf),
+            '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+        ]
+        if max_bitrate:
+            # CRF 품질을 유지하되 순간 비트레이트 상한을 둠 (VBV)
+            cmd += ['-maxrate', str(max_bitrate), '-bufsize', _double_rate(max_bitrate)]
+        cmd.append(path)
+
+        try:
+            self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            print(f"❌ ffmpeg 인코더 실행 실패: {e}")
+            self.process = None
+
+    def isOpened(self):
+        return self.process is not None and self.process.poll() is None
+
+    def write(self, frame):
+        if not self.isOpened(): return
+        if self.start_time is None: self.start_time = time.perf_counter()
+        try:
+            self.process.stdin.write(frame.tobytes())
+            self.frames += 1
+        except (BrokenPipeError, OSError) as e:
+            print(f"❌ ffmpeg 인코더 파이프 오류: {e}")
+
+    def release(self):
+        if self.process is None: return self.stats
+        if self.stats is not None: return self.stats
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        _, err = self.process.communicate()
+        if self.process.returncode != 0:
+            print(f"❌ ffmpeg 인코딩 실패 (code {self.process.returncode}): {err.decode(errors='ignore').strip()}")
+        self.stats = _build_stats(self.path, self.frames, self.start_time, 'libx264')
+        return self.stats
+
+
+class OpenCVVideoWriter:
+    """기존 cv2.VideoWriter(mp4v) 경로. ffmpeg가 없는 환경용."""
+    def __init__(self, path, fps, size, fourcc='mp4v'):
+        self.path = path
+        self.frames = 0
+        self.start_time = None
+        self.stats = None
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+
+    def isOpened(self):
+        return self.writer.isOpened()
+
+    def write(self, frame):
+        if self.start_time is None: self.start_time = time.perf_counter()
+        self.writer.write(frame)
+        self.frames += 1
+
+    def release(self):
+        if self.stats is not None: return self.stats
+        self.writer.release()
+        self.stats = _build_stats(self.path, self.frames, self.start_time, 'mp4v')
+        return self.stats
+
+
+def create_video_writer(path, fps, size, options=None):
+    """옵션에 맞는 VideoWriter를 생성합니다. ffmpeg가 없으면 OpenCV로 대체합니다."""
+    options = options or get_encoder_options(None)
+    if options['encoder'] == 'ffmpeg':
+        if shutil.which('ffmpeg'):
+            writer = FFmpegVideoWriter(path, fps, size, options['preset'], options['crf'], options['max_bitrate'])
+            if writer.isOpened(): return writer
+        print("⚠️ ffmpeg를 사용할 수 없어 OpenCV(mp4v) 인코더로 대체합니다.")
+    return OpenCVVideoWriter(path, fps, size)
+
+
+def format_encode_stats(stats):
+    if not stats: return "인코딩 정보 없음"
+    return (f"{stats['codec']} {stats['frames']}프레임, {stats['size_bytes'] / 1024:.0f}KB, "
+            f"{stats['encode_sec']:.2f}s")
+
+
+def _build_stats(path, frames, start_time, codec):
+    return {
+        'codec': codec,
+        'frames': frames,
+        'encode_sec': (time.perf_counter() - start_time) if start_time else 0.0,
+        'size_bytes': os.path.getsize(path) if os.path.exists(path) else 0,
+    }
+
+
+def _double_rate(rate):
+    """'800k' -> '1600k' (VBV 버퍼 크기를 최대 비트레이트의 2배로)"""
+    rate = str(rate).strip()
+    unit = rate[-1] if rate[-1].isalpha() else ''
+    number = float(rate[:-1] if unit else rate)
+    return f"{int(number * 2)}{unit}"
@@ -0,0 +1,199 @@
+'''
+    release date: 2026-10-19
+        - 버전 관리형 DB 마이그레이션 (sql/V<번호>__<설명>.sql 순서대로 적용)
+        - 적용 이력은 dc_schema_version 테이블에 기록
+        - dc_biosec_violation_hist 월 단위 파티셔닝 (선택)
+    사용법:
+        python -m lib.db_migrate status
+        python -m lib.db_migrate migrate [--target 3]
+        python -m lib.db_migrate stamp-farm --farm-code 101
+        python -m lib.db_migrate partition [--months-ahead 3] [--apply]
+'''
+
+import argparse
+import hashlib
+import os
+import re
+from datetime import date
+
+import pymysql
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sql')
+MIGRATION_PATTERN = re.compile(r'^V(\d+)__(.+)\.sql$')
+PARTITION_TABLE = 'dc_biosec_violation_hist'
+
+VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS dc_schema_version (
+        version       INT          NOT NULL PRIMARY KEY,
+        description   VARCHAR(200) NOT NULL,
+        checksum      CHAR(64)     NOT NULL,
+        applied_dttm  DATETIME     NOT NULL
+    )
+"""
+
+
+def find_migrations(sql_dir=SQL_DIR):
+    """[(버전, 설명, 경로)] 를 버전 순으로 반환합니다."""
+    migrations = []
+    for name in os.listdir(sql_dir):
+        m = MIGRATION_PATTERN.match(name)
+        if m:
+            migrations.append((int(m.group(1)), m.group(2).replace('_', ' '), os.path.join(sql_dir, name)))
+    return sorted(migrations)
+
+
+def split_statements(sql_text):
+    """주석(--)을 제거하고 세미콜론 기준으로 문장을 나눕니다. (프로시저 정의는 지원하지 않음)"""
+    lines = [line for line in sql_text.splitlines() if not line.strip().startswith('--')]
+    return [stmt.strip() for stmt in '\n'.join(lines).split(';') if stmt.strip()]
+
+
+def get_applied_versions(db_conn):
+    with db_conn.cursor() as cursor:
+        cursor.execute(VERSION_TABLE_SQL)
+        cursor.execute("SELECT version, checksum FROM dc_schema_version")
+        return {row['version']: row['checksum'] for row in cursor.fetchall()}
+
+
+def migrate(db_conn, target=None, sql_dir=SQL_DIR):
+    """미적용 마이그레이션을 순서대로 적용합니다. 실패 시 해당 버전에서 중단합니다."""
+    applied = get_applied_versions(db_conn)
+    count = 0
+    for version, description, path in find_migrations(sql_dir):
+        if target is not None and version > target: break
+        with open(path, encoding='utf-8') as f:
+            sql_text = f.read()
+        checksum = hashlib.sha256(sql_text.encode('utf-8')).hexdigest()
+
+        if version in applied:
+            if applied[version] != checksum:
+                print(f"⚠️ V{version:03d} 파일이 적용 이후 변경되었습니다. ({os.path.basename(path)})")
+            continue
+
+        print(f"🛠️ V{version:03d} 적용 중: {description}")
+        try:
+            # MySQL DDL은 암묵적으로 커밋되므로 문장 단위로 실행하고 마지막에 이력을 남깁니다.
+            with db_conn.cursor() as cursor:
+                for stmt in split_statements(sql_text):
+                    cursor.execute(stmt)
+                cursor.execute(
+                    "INSERT INTO dc_schema_version (version, description, checksum, applied_dttm) VALUES (%s, %s, %s, NOW())",
+                    (version, description, checksum)
+                )
+            db_conn.commit()
+            count += 1
+        except pymysql.Error as e:
+            db_conn.rollback()
+            print(f"❌ V{version:03d} 적용 실패: {e}")
+            print("   DDL 일부가 이미 반영되었을 수 있으니 스키마를 확인한 뒤 다시 실행하세요.")
+            return count
+    print(f"✅ 마이그레이션 완료: {count}건 적용")
+    return count
+
+
+def print_status(db_conn, sql_dir=SQL_DIR):
+    applied = get_applied_versions(db_conn)
+    for version, description, path in find_migrations(sql_dir):
+        mark = "적용됨" if version in applied else "대기"
+        print(f"V{version:03d} [{mark}] {description}")
+
+
+def stamp_farm(db_conn, farm_cd, camera_id=None):
+    """farm_div_cd가 비어 있는 기존 위반 이력에 농장 코드를 채웁니다. (단일 농장 DB용)"""
+    with db_conn.cursor() as cursor:
+        cursor.execute(
+            "UPDATE dc_biosec_violation_hist SET farm_div_cd = %s, camera_id = COALESCE(camera_id, %s) "
+            "WHERE farm_div_cd IS NULL",
+            (farm_cd, camera_id)
+        )
+        updated = cursor.rowcount
+    db_conn.commit()
+    print(f"✅ 농장 코드 {farm_cd} 기록: {updated}행")
+    return updated
+
+
+def _month_start(d, offset=0):
+    month = d.month - 1 + offset
+    return date(d.year + month // 12, month % 12 + 1, 1)
+
+
+def build_partition_sql(db_conn, months_ahead=3, table=PARTITION_TABLE):
+    """
+    월 단위 RANGE 파티션 SQL을 만듭니다.
+    - 파티션이 없으면: 가장 오래된 이력 월부터 months_ahead 개월 뒤까지 + pmax
+    - 이미 파티션이 있으면: pmax를 나눠 부족한 미래 월을 추가
+    주의: MySQL 파티셔닝은 PK/UNIQUE 키에 event_dttm이 포함되어야 합니다.
+    """
+    with db_conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_NAME AS name FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+            (table,)
+        )
+        existing = {row['name'] for row in cursor.fetchall()}
+        cursor.execute(f"SELECT MIN(event_dttm) AS first_dttm FROM {table}")
+        row = cursor.fetchone()
+
+    today = date.today()
+    first = row['first_dttm'].date() if row and row['first_dttm'] else today
+    last_month = _month_start(today, months_ahead)
+
+    months = []
+    m = _month_start(first)
+    while m <= last_month:
+        months.append(m)
+        m = _month_start(m, 1)
+
+    def partition_def(month):
+        upper = _month_start(month, 1)
+        return f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{upper:%Y-%m-%d}'))"
+
+    if not existing:
+        defs = ",\n    ".join([partition_def(m) for m in months] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+        return f"ALTER TABLE {table} PARTITION BY RANGE (TO_DAYS(event_dttm)) (\n    {defs}\n)"
+
+    missing = [m for m in months if f"p{m:%Y%m}" not in existing]
+    if not missing:
+        return None
+    defs = ",\n    ".join([partition_def(m) for m in missing] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+    return f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO (\n    {defs}\n)"
+
+
+if __name__ == "__main__":
+    from lib.service_manager import get_database_service
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["status", "migrate", "stamp-farm", "partition"])
+    parser.add_argument("--db-config", default="./lib/db_info_config.ini")
+    parser.add_argument("--target", type=int, help="이 버전까지만 적용")
+    parser.add_argument("--farm-code", type=int)
+    parser.add_argument("--camera-id")
+    parser.add_argument("--months-ahead", type=int, default=3)
+    parser.add_argument("--apply", action="store_true", help="partition: SQL을 출력만 하지 않고 실행")
+    args = parser.parse_args()
+
+    conn = get_database_service(args.db_config)
+    if conn is None:
+        raise SystemExit(1)
+    try:
+        if args.command == "status":
+            print_status(conn)
+        elif args.command == "migrate":
+            migrate(conn, args.target)
+        elif args.command == "stamp-farm":
+            if not args.farm_code:
+                parser.error("stamp-farm에는 --farm-code가 필요합니다.")
+            stamp_farm(conn, args.farm_code, args.camera_id)
+        else:
+            sql = build_partition_sql(conn, args.months_ahead)
+            if not sql:
+                print("✅ 추가할 파티션이 없습니다.")
+            elif not args.apply:
+                print(sql + ";")
+                print("-- 실행하려면 --apply 옵션을 추가하세요.")
+            else:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql)
+                print("✅ 파티션 적용 완료")
+    finally:
+        conn.close()
@@ -0,0 +1,240 @@
+'''
+    release date: 2026-10-19
+        - 위반 기록 전용 DB Writer 스레드 (Group Commit)
+        - 큐에 쌓인 레코드를 flush 주기마다 executemany + 단일 트랜잭션으로 저장
+        - 같은 트랜잭션에서 위반 롤업 테이블(lib/violation_rollup.py) 증분 반영
+'''
+
+import os
+import threading
+import time
+from datetime import datetime
+from queue import Queue, Empty, Full
+
+import pymysql
+
+from lib.metrics import RollingStats
+from lib.utils import VIOLATION_INSERT_SQL, insert_violation_to_db
+from lib.violation_rollup import apply_rollup
+
+# 연결 자체가 끊긴 경우(재시도 대상)로 간주할 오류 유형
+CONNECTION_ERRORS = (pymysql.err.OperationalError, pymysql.err.InterfaceError)
+
+
+class ViolationDBWriter:
+    """
+    위반 기록 INSERT를 한 스레드에서 모아 처리합니다.
+
+    - submit(): 호출 스레드는 큐에 넣고 즉시 반환 (업로드 스레드가 DB를 기다리지 않음)
+    - flush 주기마다 큐를 비우고 executemany 한 번 + COMMIT 한 번
+    - 배치 실패 시 행 단위로 재시도하여 문제 행만 db_error_logs에 기록
+    - 연결 오류 시 배치를 보관했다가 다음 주기에 재시도
+    - stop() 호출 시 남은 레코드를 모두 flush 한 뒤 종료
+    """
+    def __init__(self, db_config, farm_cd=None, camera_id=None, flush_interval=2.0, max_batch=200, queue_size=1000):
+        self.db_config = db_config
+        self.farm_cd = farm_cd                          # 위반 행에 기록할 농장 코드 (None이면 롤업 미반영)
+        self.camera_id = camera_id
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.queue = Queue(maxsize=queue_size)
+
+        self._conn = None
+        self._retry_batch = []                          # 연결 오류로 보류된 레코드
+        self._flush_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # 지표
+        self.flush_latency = RollingStats()                                     # ms
+        self.batch_size = RollingStats(buckets=(1, 2, 5, 10, 20, 50, 100, 200))   # 건
+        self.written_count = 0
+        self.failed_count = 0
+        self.retry_count = 0
+
+    # ---------------------------------------------------------
+    # 외부 인터페이스
+    # ---------------------------------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._thread = threading.Thread(target=self._run, name="ViolationDBWriter", daemon=True)
+        self._thread.start()
+        print(f"💾 DB Writer 시작 (flush 주기: {self.flush_interval}s, 최대 배치: {self.max_batch}건)")
+
+    def submit(self, values, on_commit=None):
+        """
+        Args:
+            values (tuple): VIOLATION_INSERT_SQL 순서의 값
+                (event_dttm, div_cd, start_dttm, end_dttm, file_nm, link_addr,
+                 thumbnail_link, contact_sheet_link)
+                농장 코드와 카메라 ID는 writer가 뒤에 덧붙입니다.
+            on_commit (callable): 커밋 결과(bool)를 받는 콜백. writer 스레드에서 호출됩니다.
+        """
+        values = tuple(values) + (self.farm_cd, self.camera_id)
+        record = {'values': values, 'on_commit': on_commit, 'queued_at': time.time()}
+
+        # 종료 이후 도착한 레코드는 호출 스레드에서 바로 기록
+        if self._stop_event.is_set():
+            self._flush([record], final=True)
+            return True
+
+        try:
+            self.queue.put(record, timeout=1)
+            return True
+        except Full:
+            print(f"❌ DB Writer 큐가 가득 찼습니다 ({self.queue.maxsize}건). 즉시 기록을 시도합니다.")
+            self._flush([record])
+            return False
+
+    def get_metrics(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'pending_retry': len(self._retry_batch),
+            'written': self.written_count,
+            'failed': self.failed_count,
+            'retries': self.retry_count,
+            'flush_latency_ms': self.flush_latency.summary(),
+            'batch_size': self.batch_size.summary(),
+        }
+
+    def stop(self, timeout=10):
+        """남은 레코드를 모두 flush 한 뒤 스레드를 종료합니다."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+        # 스레드가 시작되지 않았거나 시간 내 끝나지 않은 경우 대비
+        remaining = self._drain(limit=None)
+        if remaining or self._retry_batch:
+            self._flush(remaining, final=True)
+        self._close_conn()
+        print(f"💾 DB Writer 종료: {self.get_metrics()}")
+
+    # ---------------------------------------------------------
+    # 내부 처리
+    # ---------------------------------------------------------
+    def _run(self):
+        while True:
+            stopping = self._stop_event.wait(self.flush_interval)
+            while True:
+                batch = self._drain(limit=self.max_batch)
+                if not batch and not self._retry_batch: break
+                self._flush(batch, final=stopping)
+                if len(batch) < self.max_batch: break
+            if stopping: break
+
+    def _drain(self, limit):
+        batch = []
+        while limit is None or len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _get_conn(self):
+        if self._conn is None or not self._conn.open:
+            self._conn = pymysql.connect(**self.db_config)
+        else:
+            self._conn.ping(reconnect=True)
+        return self._conn
+
+    def _close_conn(self):
+        if self._conn and self._conn.open:
+            try: self._conn.close()
+            except Exception: pass
+        self._conn = None
+
+    def _flush(self, batch, final=False):
+        with self._flush_lock:
+            if self._retry_batch:
+                batch = self._retry_batch + batch
+                self._retry_batch = []
+                self.retry_count += 1
+            if not batch: return
+
+            t0 = time.perf_counter()
+            conn = None
+            try:
+                conn = self._get_conn()
+                with conn.cursor() as cursor:
+                    cursor.executemany(VIOLATION_INSERT_SQL, [r['values'] for r in batch])
+                    if self.farm_cd:
+                        apply_rollup(cursor, self.farm_cd, [r['values'] for r in batch])
+                conn.commit()
+            except CONNECTION_ERRORS as e:
+                self._hold_batch(batch, e, final)
+                return
+            except pymysql.Error as e:
+                if conn is None or not conn.open:
+                    self._hold_batch(batch, e, final)
+                    return
+                print(f"⚠️ 배치 INSERT 실패 ({len(batch)}건). 행 단위로 재시도합니다: {e}")
+                try: conn.rollback()
+                except Exception: pass
+                self._flush_rows(conn, batch)
+                return
+
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            self.flush_latency.add(elapsed_ms)
+            self.batch_size.add(len(batch))
+            self.written_count += len(batch)
+            print(f"💾 DB 일괄 저장: {len(batch)}건 ({elapsed_ms:.1f}ms)")
+            self._notify(batch, True)
+
+    def _hold_batch(self, batch, err, final):
+        """연결 오류 시 배치를 다음 주기로 보류합니다. 종료 중이면 파일로 남깁니다."""
+        print(f"❌ DB Writer 연결 오류 ({len(batch)}건 보류): {err}")
+        self._close_conn()
+        if final:
+            self._write_error_log(batch, err)
+            self._notify(batch, False)
+        else:
+            self._retry_batch = batch
+
+    def _flush_rows(self, conn, batch):
+        """배치가 데이터 오류로 실패한 경우 행 단위로 기록 (실패 행은 insert_violation_to_db가 로그를 남김)"""
+        written = []
+        for record in batch:
+            ok = insert_violation_to_db(conn, *record['values'])
+            if ok:
+                self.written_count += 1
+                written.append(record['values'])
+            else: self.failed_count += 1
+            self._notify([record], ok)
+
+        if written and self.farm_cd:
+            try:
+                with conn.cursor() as cursor:
+                    apply_rollup(cursor, self.farm_cd, written)
+                conn.commit()
+            except pymysql.Error as e:
+                print(f"⚠️ 롤업 반영 실패 ({len(written)}건). backfill로 재구성이 필요합니다: {e}")
+                try: conn.rollback()
+                except Exception: pass
+
+    def _notify(self, batch, success):
+        for record in batch:
+            callback = record.get('on_commit')
+            if not callback: continue
+            try:
+                callback(success)
+            except Exception as e:
+                print(f"⚠️ DB Writer 콜백 처리 중 오류: {e}")
+
+    def _write_error_log(self, batch, err):
+        """종료 시점까지 기록하지 못한 레코드를 파일로 남깁니다."""
+        self.failed_count += len(batch)
+        error_log_dir = "db_error_logs"
+        os.makedirs(error_log_dir, exist_ok=True)
+        timestamp_err = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        error_log_filename = os.path.join(error_log_dir, f"db_writer_error_{timestamp_err}.txt")
+        with open(error_log_filename, "w", encoding="utf-8") as f:
+            f.write(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')}\n")
+            f.write(f"Error Type: {type(err).__name__}\n")
+            f.write(f"Error Raw: {str(err)}\n\n")
+            f.write("SQL Query:\n")
+            f.write(f"{VIOLATION_INSERT_SQL}\n\n")
+            f.write("Values:\n")
+            for record in batch:
+                f.write(f"{str(record['values'])}\n")
+        print(f"📄 미기록 {len(batch)}건이 '{error_log_filename}' 파일에 저장되었습니다.")
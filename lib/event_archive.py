@@ -0,0 +1,342 @@
+'''
+    release date: 2026-10-19
+        - 이벤트 이력(위반 / 일별 출하량 / 카메라 연결) 로컬 Parquet 보관소
+        - reg_dttm 워터마크 기준 증분 내보내기, 일자(dt=YYYY-MM-DD) 파티션
+        - 운영 DB 없이 기간/농장 필터 + 시간·일자·유형별 집계 조회
+        - pyarrow 필요 (pip install pyarrow), 내보내기/조회 시점에만 import
+    사용법:
+        python -m lib.event_archive export [--dataset violations]
+        python -m lib.event_archive query --dataset violations --from 2026-04-01 --to 2026-10-19 --by hour [--farm-code 101]
+        python -m lib.event_archive compact [--dataset violations]
+'''
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pymysql
+import pymysql.cursors
+
+DEFAULT_ARCHIVE_DIR = 'event_archive'
+WATERMARK_FILE = '_watermarks.json'
+INITIAL_WATERMARK = '1970-01-01 00:00:00'
+
+# 각 데이터셋: 원본 테이블 / 컬럼 타입 / 파티션 기준 컬럼 / 유형 컬럼 / 집계 대상
+#   key가 있으면 upsert 테이블이므로 파티션 단위로 병합(최신 reg_dttm 우선)합니다.
+DATASETS = {
+    'violations': {
+        'table': 'dc_biosec_violation_hist',
+        'columns': [
+            ('event_dttm', 'timestamp'), ('detection_target_div_cd', 'string'),
+            ('record_start_dttm', 'timestamp'), ('record_end_dttm', 'timestamp'),
+            ('snapshot_file_nm', 'string'), ('snapshot_drive_link_addr', 'string'),
+            ('thumbnail_drive_link_addr', 'string'), ('contact_sheet_drive_link_addr', 'string'),
+            ('farm_div_cd', 'int'), ('camera_id', 'string'), ('reg_dttm', 'timestamp'),
+        ],
+        'time_column': 'event_dttm',
+        'type_column': 'detection_target_div_cd',
+        'measure': None,
+        'key': None,
+    },
+    'shipments': {
+        'table': 'dc_piglet_shipment_day_aggr',
+        'columns': [
+            ('farm_div_cd', 'int'), ('shipment_ymd', 'string'),
+            ('shipment_headno', 'int'), ('reg_dttm', 'timestamp'),
+        ],
+        'time_column': 'reg_dttm',
+        'type_column': 'farm_div_cd',
+        'measure': 'shipment_headno',
+        'key': ('farm_div_cd', 'shipment_ymd'),
+    },
+    'camera_connect': {
+        'table': 'dc_camera_connect_hist',
+        'columns': [
+            ('farm_div_cd', 'int'), ('event_dttm', 'timestamp'),
+            ('connect_yn', 'string'), ('reg_dttm', 'timestamp'),
+        ],
+        'time_column': 'event_dttm',
+        'type_column': 'connect_yn',
+        'measure': None,
+        'key': None,
+    },
+}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("이벤트 보관소를 사용하려면 pyarrow 패키지가 필요합니다. (pip install pyarrow)")
+    return pa, pc, ds, pq
+
+
+def _partition_date(dataset, row):
+    """행이 들어갈 dt 파티션(YYYY-MM-DD)을 구합니다."""
+    if dataset == 'shipments':
+        return datetime.strptime(row['shipment_ymd'], '%y%m%d').strftime('%Y-%m-%d')
+    return row[DATASETS[dataset]['time_column']].strftime('%Y-%m-%d')
+
+
+def _normalize(row, columns):
+    """DB 드라이버 타입 차이(Decimal, int 코드 등)를 스키마 타입에 맞춥니다."""
+    out = {}
+    for name, kind in columns:
+        value = row.get(name)
+        if value is not None:
+            if kind == 'string': value = str(value)
+            elif kind == 'int': value = int(value)
+        out[name] = value
+    return out
+
+
+class EventArchive:
+    """
+    root/<dataset>/dt=YYYY-MM-DD/part-*.parquet 구조의 로컬 보관소.
+    내보내기는 파일을 모두 쓴 뒤에만 워터마크를 올리므로, 중간에 실패하면 다음 실행에서 같은 구간을 다시 가져옵니다.
+    """
+    def __init__(self, root_dir=DEFAULT_ARCHIVE_DIR, settle_seconds=60):
+        self.root_dir = root_dir
+        self.settle_seconds = settle_seconds    # 아직 커밋 중일 수 있는 최근 행은 다음 실행으로 미룸
+        os.makedirs(root_dir, exist_ok=True)
+
+    # --- 워터마크 ---
+    def _watermark_path(self):
+        return os.path.join(self.root_dir, WATERMARK_FILE)
+
+    def get_watermarks(self):
+        path = self._watermark_path()
+        if not os.path.exists(path): return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _set_watermark(self, dataset, value):
+        marks = self.get_watermarks()
+        marks[dataset] = value
+        tmp_path = self._watermark_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(marks, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._watermark_path())
+
+    # --- 스키마 / 경로 ---
+    def _schema(self, dataset):
+        pa = _import_pyarrow()[0]
+        types = {'timestamp': pa.timestamp('s'), 'string': pa.string(), 'int': pa.int32()}
+        return pa.schema([(name, types[kind]) for name, kind in DATASETS[dataset]['columns']])
+
+    def _partition_dir(self, dataset, dt):
+        return os.path.join(self.root_dir, dataset, f"dt={dt}")
+
+    # --- 내보내기 ---
+    def export(self, db_conn, dataset, batch_size=5000):
+        """워터마크 이후 행을 가져와 일자 파티션에 추가합니다. 반환값: 내보낸 행 수"""
+        pa, _, _, pq = _import_pyarrow()
+        spec = DATASETS[dataset]
+        schema = self._schema(dataset)
+        column_names = [name for name, _ in spec['columns']]
+        watermark = self.get_watermarks().get(dataset, INITIAL_WATERMARK)
+
+        with db_conn.cursor() as cursor:
+            cursor.execute("SELECT NOW() AS now")
+            cutoff = (cursor.fetchone()['now'] - timedelta(seconds=self.settle_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+        if cutoff <= watermark:
+            return 0
+
+        sql = (f"SELECT {', '.join(column_names)} FROM {spec['table']} "
+               f"WHERE reg_dttm > %s AND reg_dttm <= %s ORDER BY reg_dttm")
+        run_tag = datetime.now().strftime('%Y%m%d%H%M%S')
+        writers = {}            # dt -> (임시 경로, ParquetWriter)
+        merged = {}             # upsert 데이터셋: dt -> {key: row}
+        total = 0
+
+        try:
+            with db_conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+                cursor.execute(sql, (watermark, cutoff))
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows: break
+                    by_partition = {}
+                    for row in rows:
+                        by_partition.setdefault(_partition_date(dataset, row), []).append(_normalize(row, spec['columns']))
+                    total += len(rows)
+
+                    for dt, part_rows in by_partition.items():
+                        if spec['key']:
+                            bucket = merged.setdefault(dt, {})
+                            for r in part_rows:
+                                bucket[tuple(r[k] for k in spec['key'])] = r
+                            continue
+                        if dt not in writers:
+                            part_dir = self._partition_dir(dataset, dt)
+                            os.makedirs(part_dir, exist_ok=True)
+                            tmp_path = os.path.join(part_dir, f"part-{run_tag}.parquet.tmp")
+                            writers[dt] = (tmp_path, pq.ParquetWriter(tmp_path, schema, compression='zstd'))
+                        writers[dt][1].write_table(pa.Table.from_pylist(part_rows, schema=schema))
+
+            for tmp_path, writer in writers.values():
+                writer.close()
+            for tmp_path, _ in writers.values():
+                os.replace(tmp_path, tmp_path[:-len('.tmp')])
+            for dt, bucket in merged.items():
+                self._merge_partition(dataset, dt, bucket)
+        except Exception:
+            for tmp_path, writer in writers.values():
+                try:
+                    writer.close()
+                except Exception:
+                    pass
+                if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+
+        self._set_watermark(dataset, cutoff)
+        print(f"📦 [{dataset}] {total}행 보관 (파티션 {len(writers) or len(merged)}개, ~{cutoff})")
+        return total
+
+    def _merge_partition(self, dataset, dt, new_rows):
+        """upsert 테이블 파티션을 기존 파일과 병합해 단일 파일로 다시 씁니다."""
+        pa, _, _, pq = _import_pyarrow()
+        spec = DATASETS[dataset]
+        part_dir = self._partition_dir(dataset, dt)
+        os.makedirs(part_dir, exist_ok=True)
+        files = [os.path.join(part_dir, f) for f in os.listdir(part_dir) if f.endswith('.parquet')]
+
+        rows = {}
+        for path in files:
+            for r in pq.read_table(path).to_pylist():
+                rows[tuple(r[k] for k in spec['key'])] = r
+        rows.update(new_rows)
+
+        out_path = os.path.join(part_dir, 'part-0.parquet')
+        pq.write_table(pa.Table.from_pylist(list(rows.values()), schema=self._schema(dataset)),
+                       out_path + '.tmp', compression='zstd')
+        os.replace(out_path + '.tmp', out_path)
+        for path in files:
+            if path != out_path: os.remove(path)
+
+    def export_all(self, db_conn, batch_size=5000):
+        results = {}
+        for dataset in DATASETS:
+            try:
+                results[dataset] = self.export(db_conn, dataset, batch_size)
+            except (pymysql.Error, OSError) as e:
+                print(f"❌ [{dataset}] 보관 실패: {e}")
+                results[dataset] = None
+        return results
+
+    def compact(self, dataset):
+        """여러 번의 증분으로 쪼개진 파티션 파일을 파티션당 1개로 합칩니다."""
+        pa, _, _, pq = _import_pyarrow()
+        dataset_dir = os.path.join(self.root_dir, dataset)
+        if not os.path.isdir(dataset_dir): return 0
+        compacted = 0
+        for part in sorted(os.listdir(dataset_dir)):
+            part_dir = os.path.join(dataset_dir, part)
+            files = sorted(os.path.join(part_dir, f) for f in os.listdir(part_dir) if f.endswith('.parquet'))
+            if len(files) < 2: continue
+            table = pa.concat_tables([pq.read_table(f) for f in files])
+            time_column = DATASETS[dataset]['time_column']
+            table = table.sort_by(time_column)
+            out_path = os.path.join(part_dir, 'part-0.parquet')
+            pq.write_table(table, out_path + '.tmp', compression='zstd')
+            os.replace(out_path + '.tmp', out_path)
+            for f in files:
+                if f != out_path: os.remove(f)
+            compacted += 1
+        print(f"🗜️ [{dataset}] 파티션 {compacted}개 병합")
+        return compacted
+
+    # --- 조회 ---
+    def read(self, dataset, start_date=None, end_date=None, columns=None, farm_cd=None):
+        """
+        [start_date, end_date) 구간을 pyarrow Table로 읽습니다. (dt 파티션 단위로 가지치기)
+        columns를 지정하면 해당 컬럼만 읽습니다.
+        """
+        pa, _, ds, _ = _import_pyarrow()
+        dataset_dir = os.path.join(self.root_dir, dataset)
+        if not os.path.isdir(dataset_dir):
+            return self._schema(dataset).empty_table()
+
+        partitioning = ds.partitioning(pa.schema([('dt', pa.string())]), flavor='hive')
+        data = ds.dataset(dataset_dir, format='parquet', partitioning=partitioning, schema=self._schema(dataset).append(pa.field('dt', pa.string())))
+
+        expr = None
+        def _and(e, cond): return cond if e is None else e & cond
+        if start_date: expr = _and(expr, ds.field('dt') >= start_date.strftime('%Y-%m-%d'))
+        if end_date: expr = _and(expr, ds.field('dt') < end_date.strftime('%Y-%m-%d'))
+        if farm_cd: expr = _and(expr, ds.field('farm_div_cd') == farm_cd)
+        return data.to_table(columns=columns, filter=expr)
+
+    def aggregate(self, dataset, start_date, end_date, by='type', farm_cd=None):
+        """
+        기간 내 건수(출하량은 두수 합계)를 집계합니다.
+        by: 'type'(유형별) | 'day'(일자·유형별) | 'hour'(시간대별, 0~23) | 'farm'(농장별)
+        반환값: [{'dt': ..., 'detection_target_div_cd': ..., 'cnt': n}, ...]
+        """
+        pa, pc, _, _ = _import_pyarrow()
+        spec = DATASETS[dataset]
+        time_column, type_column, measure = spec['time_column'], spec['type_column'], spec['measure']
+        needed = {time_column, type_column, 'farm_div_cd', 'dt'} | ({measure} if measure else set())
+        table = self.read(dataset, start_date, end_date, columns=sorted(needed), farm_cd=farm_cd)
+
+        if by == 'hour':
+            table = table.append_column('hour', pc.hour(table[time_column]))
+            keys = ['hour']
+        elif by == 'day':
+            keys = ['dt', type_column]
+        elif by == 'farm':
+            keys = ['farm_div_cd']
+        else:
+            keys = [type_column]
+        keys = list(dict.fromkeys(keys))
+
+        agg_column, agg_func = (measure, 'sum') if measure else (time_column, 'count')
+        result = table.group_by(keys).aggregate([(agg_column, agg_func)])
+        result = result.rename_columns([('cnt' if c == f"{agg_column}_{agg_func}" else c) for c in result.column_names])
+        return result.sort_by([(k, 'ascending') for k in keys]).to_pylist()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["export", "query", "compact"])
+    parser.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR)
+    parser.add_argument("--db-config", default="./lib/db_info_config.ini")
+    parser.add_argument("--dataset", choices=list(DATASETS))
+    parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD (해당 일 포함)")
+    parser.add_argument("--by", choices=["type", "day", "hour", "farm"], default="type")
+    parser.add_argument("--farm-code", type=int)
+    args = parser.parse_args()
+
+    archive = EventArchive(args.archive_dir)
+
+    if args.command == "export":
+        from lib.service_manager import get_database_service
+        conn = get_database_service(args.db_config)
+        if conn is None:
+            raise SystemExit(1)
+        try:
+            if args.dataset:
+                archive.export(conn, args.dataset)
+            else:
+                archive.export_all(conn)
+        finally:
+            conn.close()
+    elif args.command == "compact":
+        for name in ([args.dataset] if args.dataset else DATASETS):
+            archive.compact(name)
+    else:
+        if not args.dataset:
+            parser.error("query에는 --dataset이 필요합니다.")
+        start = datetime.strptime(args.date_from, '%Y-%m-%d') if args.date_from else None
+        end = datetime.strptime(args.date_to, '%Y-%m-%d') + timedelta(days=1) if args.date_to else None
+        t0 = time.perf_counter()
+        rows = archive.aggregate(args.dataset, start, end, args.by, args.farm_code)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        for row in rows:
+            print(" | ".join(str(v) for v in row.values()))
+        print(f"⏱️ {len(rows)}행, {elapsed_ms:.1f} ms")
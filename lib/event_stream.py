@@ -0,0 +1,192 @@
+'''
+    release date: 2026-10-19
+        - 로컬 이벤트 스트림(Server-Sent Events): 출하 카운트 증감 / 위반 / 움직임 감지 on·off / RTSP 연결·끊김
+          대시보드가 DB(dc_piglet_shipment_day_aggr, dc_biosec_violation_hist)를 폴링하지 않고 즉시 수신
+        - EventBus: 최근 replay_size건을 보관해 늦게 연결한 구독자에게 다시 전송 (Last-Event-ID 또는 ?since=)
+        - 표준 라이브러리 http.server만 사용 (추가 패키지 없음)
+    사용법:
+        curl -N http://127.0.0.1:8765/events
+        curl -N "http://127.0.0.1:8765/events?types=violation,count&since=120"
+        curl http://127.0.0.1:8765/events/recent?limit=20
+'''
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue, Full, Empty
+from urllib.parse import urlparse, parse_qs
+
+DEFAULT_PORT = 8765
+DEFAULT_REPLAY_SIZE = 500
+SUBSCRIBER_QUEUE_SIZE = 1000    # 이보다 밀린 구독자는 연결을 끊음 (재연결 시 replay로 복구)
+KEEPALIVE_INTERVAL = 15.0
+
+
+class EventBus:
+    """
+    publish()는 프레임 루프에서 호출되므로 잠금 구간을 짧게 유지하고 네트워크 I/O를 하지 않습니다.
+    event_hook(event_type, data) 형식으로도 호출할 수 있습니다.
+    """
+    def __init__(self, replay_size=DEFAULT_REPLAY_SIZE, source=None):
+        self.replay = deque(maxlen=replay_size)
+        self.source = source            # 이벤트에 함께 싣는 농장/카메라 정보
+        self._seq = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._seq += 1
+            event = {'id': self._seq, 'type': event_type, 'ts': time.time(), 'data': data}
+            if self.source: event['source'] = self.source
+            self.replay.append(event)
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except Full:
+                q.overflowed = True
+        return event
+
+    __call__ = publish
+
+    def subscribe(self, since=None):
+        """(큐, 놓친 이벤트 목록)을 반환합니다. since보다 id가 큰 이벤트를 replay에서 돌려줍니다."""
+        q = Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        q.overflowed = False
+        with self._lock:
+            self._subscribers.add(q)
+            if since is None:
+                backlog = []
+            elif since > self._seq:         # 프로세스 재시작으로 id가 초기화된 경우 전체 replay
+                backlog = list(self.replay)
+            else:
+                backlog = [e for e in self.replay if e['id'] > since]
+        return q, backlog
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def recent(self, limit=50):
+        with self._lock:
+            return list(self.replay)[-limit:]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def _format_sse(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    bus = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, obj, status=200):
+        body = json.dumps(obj, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == '/events':
+            self._stream(params)
+        elif url.path == '/events/recent':
+            try:
+                limit = int(params.get('limit', ['50'])[0])
+            except ValueError:
+                limit = 50
+            self._send_json(self.bus.recent(limit))
+        elif url.path == '/health':
+            self._send_json({'subscribers': self.bus.subscriber_count(), 'buffered': len(self.bus.replay)})
+        else:
+            self._send_json({'error': 'not found'}, 404)
+
+    def _stream(self, params):
+        since = self.headers.get('Last-Event-ID') or params.get('since', [None])[0]
+        try:
+            since = int(since) if since is not None else None
+        except ValueError:
+            since = None
+        types = set(params['types'][0].split(',')) if params.get('types') else None
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'keep-alive')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+
+        q, backlog = self.bus.subscribe(since)
+        try:
+            self.wfile.write(b"retry: 3000\n\n")
+            for event in backlog:
+                if types is None or event['type'] in types: self.wfile.write(_format_sse(event))
+            self.wfile.flush()
+            while not q.overflowed:
+                try:
+                    event = q.get(timeout=KEEPALIVE_INTERVAL)
+                except Empty:
+                    self.wfile.write(b": keepalive\n\n")     # 프록시/방화벽 유휴 연결 끊김 방지
+                    self.wfile.flush()
+                    continue
+                if types is None or event['type'] in types:
+                    self.wfile.write(_format_sse(event))
+                    self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            self.bus.unsubscribe(q)
+            self.close_connection = True
+
+
+class EventStreamServer:
+    def __init__(self, bus, host='127.0.0.1', port=DEFAULT_PORT):
+        handler = type('EventStreamHandler', (_Handler,), {'bus': bus})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="EventStreamServer", daemon=True)
+        self._thread.start()
+        host, port = self.httpd.server_address[:2]
+        print(f"📡 이벤트 스트림: http://{host}:{port}/events")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def create_event_stream(farm_config):
+    """
+    농장 설정 event_stream_port가 있으면 (EventBus, EventStreamServer)를 시작해 반환합니다.
+    포트를 열 수 없으면 서버 없이 (EventBus, None)을 반환합니다. 설정이 없으면 (None, None).
+    """
+    port = farm_config.get('event_stream_port')
+    if not port: return None, None
+    try:
+        replay_size = int(farm_config.get('event_stream_replay') or DEFAULT_REPLAY_SIZE)
+    except ValueError:
+        replay_size = DEFAULT_REPLAY_SIZE
+    bus = EventBus(replay_size, source={'farm_code': farm_config.get('farm_code'), 'camera_id': farm_config.get('camera_id')})
+    try:
+        server = EventStreamServer(bus, farm_config.get('event_stream_host') or '127.0.0.1', int(port)).start()
+    except (OSError, ValueError) as e:
+        print(f"❌ 이벤트 스트림 서버 시작 실패 (port {port}): {e}")
+        server = None
+    return bus, server
@@ -0,0 +1,196 @@
+'''
+    release date: 2026-10-19
+        - farm_config.ini 농장 섹션 파싱/검증 (main.py의 load_farm_config에서 분리)
+        - FarmConfigWatcher: 파일 변경 시 감지 설정(라인/임계값/방향)을 프레임 사이에서 무중단 반영
+          검증에 실패하면 기존 설정을 유지
+'''
+
+import configparser
+import os
+import time
+
+# 실행 중 다시 읽어 바로 반영하는 키 (그 외 키는 재시작해야 적용)
+RELOADABLE_KEYS = (
+    'line_coords', 'worker_conf', 'motion_threshold',
+    'pig_reenter_thresh', 'orientation', 'dirty_zone_location',
+)
+# 바뀌면 작업자/돼지의 구역 판정 기준이 달라지는 키
+GEOMETRY_KEYS = ('line_coords', 'orientation', 'dirty_zone_location')
+
+
+class FarmConfigError(Exception):
+    pass
+
+
+def parse_line_coords(line_str):
+    """'x1,y1,x2,y2' 문자열을 [(x1, y1), (x2, y2)]로 변환합니다. 형식 오류 시 ValueError."""
+    if not line_str: raise ValueError("Empty coordinates")
+    coords = list(map(int, line_str.split(',')))
+    if len(coords) != 4: raise ValueError("Invalid format")
+    if (coords[0], coords[1]) == (coords[2], coords[3]): raise ValueError("Zero-length line")
+    return [(coords[0], coords[1]), (coords[2], coords[3])]
+
+
+def parse_farm_config(config_path, farm_name, strict_keys=()):
+    """
+    농장 섹션을 읽어 형변환한 dict를 반환합니다.
+    파일/섹션/농장 코드가 없으면 FarmConfigError를 발생시킵니다. (프로세스 종료 여부는 호출자가 결정)
+    strict_keys: 형변환 실패 시 기본값으로 대체하지 않고 FarmConfigError를 발생시킬 키 (실행 중 다시 읽기용)
+    """
+    if not os.path.exists(config_path):
+        raise FarmConfigError(f"설정 파일을 찾을 수 없습니다: {config_path}")
+
+    cfg = configparser.ConfigParser()
+    try:
+        cfg.read(config_path, encoding='utf-8')
+    except configparser.Error as e:
+        raise FarmConfigError(f"설정 파일 형식 오류: {e}")
+
+    if farm_name not in cfg:
+        raise FarmConfigError(f"설정 파일에 [{farm_name}] 섹션이 없습니다.")
+
+    farm_config = dict(cfg[farm_name])
+
+    # [DEFAULT] 섹션의 템플릿 상속 확인
+    if 'webhook_template' not in farm_config and 'webhook_template' in cfg['DEFAULT']:
+        farm_config['webhook_template'] = cfg['DEFAULT']['webhook_template']
+
+    def safe_get(key, default, type_func):
+        val = farm_config.get(key)
+        if not val:  # 값이 없거나 빈 문자열('')인 경우
+            return default
+        try:
+            return type_func(val)
+        except (ValueError, TypeError):
+            if key in strict_keys:
+                raise FarmConfigError(f"[{key}] 설정값 오류('{val}')")
+            print(f"⚠️ [{key}] 설정값 오류('{val}'). 기본값 {default}을 사용합니다.")
+            return default
+
+    # 형변환
+    try:
+        farm_config['farm_code'] = safe_get('farm_code', int(farm_config.get('cd', 0)), int)
+    except ValueError:
+        farm_config['farm_code'] = 0
+
+    if farm_config['farm_code'] == 0:
+        raise FarmConfigError("'farm_code' 설정 누락. DB 기록 불가.")
+
+    farm_config['pig_reenter_thresh'] = safe_get('pig_reenter_thresh', 0.35, float)
+    farm_config['worker_conf'] = safe_get('worker_conf', 0.6, float)
+    farm_config['motion_threshold'] = safe_get('motion_threshold', 300, int)
+    farm_config['orientation'] = farm_config.get('orientation') or 'height'
+    farm_config['dirty_zone_location'] = farm_config.get('dirty_zone_location') or 'below'
+    farm_config['camera_id'] = farm_config.get('camera_id') or farm_name
+    farm_config['db_flush_interval'] = safe_get('db_flush_interval', 2.0, float)
+    farm_config['alert_dedup_window'] = safe_get('alert_dedup_window', 10.0, float)
+    farm_config['alert_min_interval'] = safe_get('alert_min_interval', 3.0, float)
+    farm_config['alert_max_retries'] = safe_get('alert_max_retries', 3, int)
+    farm_config['rpi_heartbeat_interval'] = safe_get('rpi_heartbeat_interval', 5.0, float)
+    farm_config['rpi_ack_timeout'] = safe_get('rpi_ack_timeout', 2.0, float)
+    # 비워 두면 하트비트 간격의 3배. 간격 이하이면 매 주기 끊고 재연결하므로 사용하지 않음
+    hb_auto = farm_config['rpi_heartbeat_interval'] * 3
+    farm_config['rpi_heartbeat_timeout'] = safe_get('rpi_heartbeat_timeout', hb_auto, float)
+    if farm_config['rpi_heartbeat_timeout'] <= farm_config['rpi_heartbeat_interval']:
+        print(f"⚠️ [rpi_heartbeat_timeout] {farm_config['rpi_heartbeat_timeout']}s는 하트비트 간격"
+              f"({farm_config['rpi_heartbeat_interval']}s)보다 커야 합니다. {hb_auto}s를 사용합니다.")
+        farm_config['rpi_heartbeat_timeout'] = hb_auto
+    farm_config['webhook_timeout'] = safe_get('webhook_timeout', 5.0, float)
+    farm_config['webhook_retries'] = safe_get('webhook_retries', 0, int)
+    farm_config['webhook_keepalive'] = safe_get('webhook_keepalive', 0, float)
+    farm_config['config_reload_interval'] = safe_get('config_reload_interval', 2.0, float)
+    farm_config['state_snapshot_max_age'] = safe_get('state_snapshot_max_age', 600.0, float)
+    farm_config['clip_crf'] = safe_get('clip_crf', 28, int)      # clip_encoder.DEFAULT_CRF
+    # utils.UNSENT_* 기본값 (cv2를 불러오지 않도록 값으로 적음)
+    farm_config['unsent_max_attempts'] = safe_get('unsent_max_attempts', 5, int)
+    farm_config['unsent_retry_interval'] = safe_get('unsent_retry_interval', 600.0, float)
+    farm_config['unsent_retry_backoff_max'] = safe_get('unsent_retry_backoff_max', 21600.0, float)
+    farm_config['unsent_dead_letter_dir'] = farm_config.get('unsent_dead_letter_dir') or 'unsent_dead_letter'
+
+    return farm_config
+
+
+def validate_reloadable(farm_config):
+    """
+    실행 중 반영할 값들을 엄격하게 검사합니다. (시작 시와 달리 기본값으로 대체하지 않음)
+    문제 목록을 반환하며, 비어 있으면 반영 가능합니다.
+    """
+    errors = []
+    raw = farm_config.get('line_coords', '')
+    if raw:
+        try:
+            parse_line_coords(raw)
+        except ValueError:
+            errors.append(f"line_coords 형식 오류('{raw}')")
+    if farm_config.get('orientation') not in ('height', 'width'):
+        errors.append(f"orientation은 height | width ('{farm_config.get('orientation')}')")
+    if farm_config.get('dirty_zone_location') not in ('below', 'above'):
+        errors.append(f"dirty_zone_location은 below | above ('{farm_config.get('dirty_zone_location')}')")
+    if not 0.0 < farm_config.get('worker_conf', 0) <= 1.0:
+        errors.append(f"worker_conf 범위 오류({farm_config.get('worker_conf')})")
+    if not 0.0 < farm_config.get('pig_reenter_thresh', 0) < 1.0:
+        errors.append(f"pig_reenter_thresh 범위 오류({farm_config.get('pig_reenter_thresh')})")
+    if farm_config.get('motion_threshold', 0) <= 0:
+        errors.append(f"motion_threshold 범위 오류({farm_config.get('motion_threshold')})")
+    return errors
+
+
+class FarmConfigWatcher:
+    """
+    설정 파일의 변경을 poll()에서 확인합니다. (프레임 루프에서 호출, 별도 스레드 없음)
+    변경이 유효하면 farm_config dict의 RELOADABLE_KEYS 값을 제자리에서 갱신하므로,
+    같은 dict를 참조하는 Pig/Worker/재연결 후의 process_video도 새 값을 보게 됩니다.
+    """
+    def __init__(self, config_path, farm_name, farm_config, poll_interval=None):
+        self.config_path = config_path
+        self.farm_name = farm_name
+        self.config = farm_config
+        self.poll_interval = poll_interval or farm_config.get('config_reload_interval', 2.0)
+        self._mtime = self._get_mtime()
+        self._next_check = time.time() + self.poll_interval
+        self.reload_count = 0
+
+    def _get_mtime(self):
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self, now=None):
+        """
+        변경된 설정 키 목록을 반환합니다. (변경 없음/검증 실패 시 빈 목록)
+        """
+        now = now or time.time()
+        if now < self._next_check: return []
+        self._next_check = now + self.poll_interval
+
+        mtime = self._get_mtime()
+        if mtime is None or mtime == self._mtime: return []
+        self._mtime = mtime
+
+        try:
+            # 반영 대상 키는 기본값으로 대체되면 잘못된 값이 검증을 통과하므로 엄격하게 형변환
+            new_config = parse_farm_config(self.config_path, self.farm_name, strict_keys=RELOADABLE_KEYS)
+        except (FarmConfigError, OSError, UnicodeDecodeError, configparser.Error) as e:
+            print(f"⚠️ 설정 다시 읽기 실패, 기존 설정 유지: {e}")
+            return []
+
+        errors = validate_reloadable(new_config)
+        if errors:
+            print(f"⚠️ 설정 검증 실패, 기존 설정 유지: {'; '.join(errors)}")
+            return []
+
+        changed = [k for k in RELOADABLE_KEYS if new_config.get(k) != self.config.get(k)]
+        restart_needed = [
+            k for k, v in new_config.items()
+            if k not in RELOADABLE_KEYS and k != 'config_reload_interval' and self.config.get(k) != v
+        ]
+        for k in changed:
+            self.config[k] = new_config[k]
+
+        if changed:
+            self.reload_count += 1
+            print(f"🔁 [{self.config.get('farm_code')}] 설정 반영: " + ", ".join(f"{k}={new_config[k]}" for k in changed))
+        if restart_needed:
+            print(f"ℹ️ 재시작 후 적용되는 설정 변경: {', '.join(restart_needed)}")
+        return changed
@@ -0,0 +1,251 @@
+'''
+    release date: 2026-10-19
+        - RTSP 프레임 입력을 교체 가능한 FrameSource로 분리 (농장 설정 frame_source = ffmpeg | pyav)
+        - FFmpegPipeSource: 기존 방식 (ffmpeg 하위 프로세스 → stdout rawvideo BGR 파이프)
+        - PyAVSource: libav(PyAV)로 프로세스 안에서 디코딩, 멀티스레드 디코더, numpy 배열로 바로 변환, 프레임별 PTS
+          입력이 밀리면 오래된 프레임부터 버려 지연이 쌓이지 않음
+        - 오류/종료는 FrameSourceError(RuntimeError)와 on_event("stream", {...}) 이벤트로 전달 → main_rtsp가 재연결
+'''
+
+import subprocess
+import threading
+import time
+from queue import Queue, Empty, Full
+
+import numpy as np
+
+FIRST_FRAME_TIMEOUT = 10        # 연결 후 첫 프레임 대기 상한(초)
+READ_TIMEOUT = 3                # 이 시간 동안 프레임이 없으면 스트림 끊김으로 판단
+QUEUE_SIZE = 30
+
+
+class FrameSourceError(RuntimeError):
+    """연결 실패/스트림 끊김. main_rtsp는 RuntimeError를 재연결 대상으로 처리합니다."""
+    pass
+
+
+class FrameSource:
+    """
+    open(): 첫 프레임이 들어올 때까지 대기 (실패 시 FrameSourceError)
+    read(): BGR 프레임 (height, width, 3) 또는 None(끊김/종료)
+    pts: 마지막으로 읽은 프레임의 스트림 시각(초, 없으면 None). 참고용(벤치마크/진단)입니다.
+         카메라마다 기준점이 다르고 재연결 시 초기화되므로 process_video의 타임스탬프(위반 시각, DB 기록,
+         만료 계산)는 계속 벽시계(time.time())를 사용합니다.
+    """
+    name = "base"
+
+    def __init__(self, url, width, height, on_event=None):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.on_event = on_event
+        self.pts = None
+        self.frames = 0
+        self.dropped = 0
+        self.queue = Queue(maxsize=QUEUE_SIZE)
+        self._stop_event = threading.Event()
+        self._error = None
+        self._thread = None
+        self._first = None          # open()에서 받은 첫 프레임 (pts, frame)
+
+    def _emit(self, status, **data):
+        if self.on_event: self.on_event("stream", {"source": self.name, "status": status, **data})
+
+    def _fail(self, message):
+        self._error = message
+        self._emit("error", error=message)
+        raise FrameSourceError(message)
+
+    def backlog(self):
+        return self.queue.qsize()
+
+    def _wait_first(self, timeout, alive):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                item = self.queue.get(timeout=0.2)
+            except Empty:
+                if self._error: self._fail(self._error)
+                if not alive(): self._fail(f"{self.name} 시작 실패")
+                continue
+            if item is None: self._fail(self._error or "스트림 종료")
+            self._emit("opened")
+            return item
+        self._fail("No Frame")
+
+    def read(self):
+        if self._first is not None:
+            item, self._first = self._first, None
+            self.pts, frame = item
+            self.frames += 1
+            return frame
+        try:
+            item = self.queue.get(timeout=READ_TIMEOUT)
+        except Empty:
+            self._emit("stalled", timeout=READ_TIMEOUT)
+            return None
+        if item is None:
+            self._emit("ended", error=self._error)
+            return None
+        self.pts, frame = item
+        self.frames += 1
+        return frame
+
+    def close(self):
+        self._stop_event.set()
+        if self._thread: self._thread.join(2)
+
+    def get_metrics(self):
+        return {'source': self.name, 'frames': self.frames, 'dropped': self.dropped, 'backlog': self.backlog()}
+
+
+class FFmpegPipeSource(FrameSource):
+    name = "ffmpeg"
+
+    def __init__(self, url, width, height, on_event=None, ffmpeg_bin='ffmpeg'):
+        super().__init__(url, width, height, on_event)
+        self.ffmpeg_bin = ffmpeg_bin
+        self.frame_size = width * height * 3
+        self.process = None
+
+    def open(self, timeout=FIRST_FRAME_TIMEOUT):
+        try:
+            self.process = subprocess.Popen([
+                self.ffmpeg_bin, "-rtsp_transport", "tcp", "-i", self.url, "-vf", f"scale={self.width}:{self.height}",
+                "-f", "rawvideo", "-pix_fmt", "bgr24", "-vcodec", "rawvideo", "-loglevel", "warning", "-"
+            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=10**8)
+        except OSError as e:
+            self._fail(f"FFmpeg Start Fail: {e}")
+        self._thread = threading.Thread(target=self._reader, name="FFmpegPipeReader", daemon=True)
+        self._thread.start()
+        self._first = self._wait_first(timeout, lambda: self.process.poll() is None)
+        return self._first[1]
+
+    def _reader(self):
+        stdout = self.process.stdout
+        while not self._stop_event.is_set():
+            try:
+                raw = stdout.read(self.frame_size)
+            except (OSError, ValueError):
+                break
+            if len(raw) != self.frame_size:
+                try:
+                    self._error = f"ffmpeg 종료 (code {self.process.wait(1)})"
+                except subprocess.TimeoutExpired:
+                    self._error = "ffmpeg 출력 끊김"
+                break
+            frame = np.frombuffer(raw, dtype=np.uint8).reshape((self.height, self.width, 3)).copy()
+            self.queue.put((None, frame))       # 파이프 방식은 PTS 없음, 가득 차면 대기(기존 동작)
+        self.queue.put(None)
+
+    def close(self):
+        self._stop_event.set()
+        if self.process and self.process.poll() is None: self.process.terminate()
+        # 가득 찬 큐에 막힌 reader가 빠져나오도록 비움
+        while True:
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                break
+        if self._thread: self._thread.join(2)
+
+
+class PyAVSource(FrameSource):
+    name = "pyav"
+
+    def __init__(self, url, width, height, on_event=None, threads=0, open_timeout=5.0):
+        super().__init__(url, width, height, on_event)
+        self.threads = threads              # 0: libav 자동
+        self.open_timeout = open_timeout
+        self.container = None
+
+    def open(self, timeout=FIRST_FRAME_TIMEOUT):
+        try:
+            import av
+        except ImportError:
+            raise RuntimeError("PyAV가 설치되어 있지 않습니다. pip install av")
+        try:
+            self.container = av.open(
+                self.url,
+                options={'rtsp_transport': 'tcp', 'fflags': 'nobuffer', 'flags': 'low_delay'},
+                timeout=(self.open_timeout, READ_TIMEOUT),
+            )
+            stream = self.container.streams.video[0]
+        except (av.error.FFmpegError, IndexError, OSError) as e:
+            self._fail(f"PyAV 연결 실패: {e}")
+        stream.thread_type = 'AUTO'         # 프레임/슬라이스 멀티스레드 디코딩
+        if self.threads: stream.codec_context.thread_count = self.threads
+        self._thread = threading.Thread(target=self._decode, args=(stream,), name="PyAVDecoder", daemon=True)
+        self._thread.start()
+        self._first = self._wait_first(timeout, self._thread.is_alive)
+        return self._first[1]
+
+    def _decode(self, stream):
+        import av
+        time_base = float(stream.time_base) if stream.time_base else None
+        try:
+            for frame in self.container.decode(stream):
+                if self._stop_event.is_set(): break
+                # 스케일과 BGR 변환을 libswscale에서 한 번에 처리해 numpy 배열로 받음
+                image = frame.to_ndarray(width=self.width, height=self.height, format='bgr24')
+                pts = frame.pts * time_base if frame.pts is not None and time_base else None
+                try:
+                    self.queue.put_nowait((pts, image))
+                except Full:
+                    # 처리가 밀리면 가장 오래된 프레임을 버리고 최신 프레임 유지 (지연 누적 방지)
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except Empty:
+                        pass
+                    self.queue.put_nowait((pts, image))
+        except av.error.FFmpegError as e:
+            self._error = f"PyAV 디코딩 오류: {e}"
+        except Exception as e:
+            self._error = f"PyAV 오류: {type(e).__name__}: {e}"
+        finally:
+            # libav 컨테이너는 스레드 안전하지 않으므로 decode()를 호출한 이 스레드에서 닫음
+            self._close_container()
+            try:
+                self.queue.put_nowait(None)
+            except Full:
+                self.queue.get_nowait(); self.queue.put_nowait(None)
+
+    def _close_container(self):
+        container, self.container = self.container, None
+        if container:
+            try:
+                container.close()
+            except Exception:
+                pass
+
+    def close(self):
+        self._stop_event.set()
+        if self._thread is None:
+            self._close_container()         # 디코더 시작 전 실패 (스트림 없음 등)
+            return
+        # decode()는 READ_TIMEOUT까지 블록될 수 있으므로 그보다 길게 대기 후, 종료는 디코더 스레드가 컨테이너를 닫음
+        self._thread.join(READ_TIMEOUT + 2)
+        if self._thread.is_alive():
+            print("⚠️ PyAV 디코더 스레드가 아직 종료되지 않았습니다. (종료 시 스스로 연결을 닫음)")
+
+
+FRAME_SOURCES = {'ffmpeg': FFmpegPipeSource, 'pyav': PyAVSource}
+
+
+def create_frame_source(farm_config, url, width, height, on_event=None):
+    """농장 설정 frame_source(ffmpeg 기본 | pyav)에 맞는 FrameSource를 만듭니다. PyAV가 없으면 ffmpeg로 대체."""
+    kind = (farm_config.get('frame_source') or 'ffmpeg').lower()
+    if kind == 'pyav':
+        try:
+            import av  # noqa: F401
+            threads = int(farm_config.get('frame_source_threads') or 0)
+            return PyAVSource(url, width, height, on_event, threads=threads)
+        except ImportError:
+            print("⚠️ PyAV(av)가 설치되어 있지 않아 ffmpeg 파이프 입력으로 대체합니다.")
+        except ValueError:
+            print(f"⚠️ [frame_source_threads] 설정값 오류('{farm_config.get('frame_source_threads')}'). 자동으로 설정합니다.")
+            return PyAVSource(url, width, height, on_event)
+    elif kind != 'ffmpeg':
+        print(f"⚠️ 알 수 없는 frame_source '{kind}', ffmpeg를 사용합니다.")
+    return FFmpegPipeSource(url, width, height, on_event)
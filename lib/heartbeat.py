@@ -0,0 +1,73 @@
+'''
+    release date: 2026-10-19
+        - 파이프라인 생존 신호 파일 (supervisor.py가 읽어 정지/저속 여부 판단)
+        - 프레임을 읽을 때마다 카운트하고 interval 초마다 {ts, pid, state, frames, fps}를 기록
+        - add_source(name, func): 추가 지표(QoS 단계 등)를 함께 기록
+'''
+
+import json
+import os
+import time
+
+
+class Heartbeat:
+    def __init__(self, path, interval=2.0):
+        self.path = path
+        self.interval = interval
+        self.frames = 0
+        self._window_start = time.time()
+        self._window_frames = 0
+        self._last_write = 0.0
+        self.fps = 0.0
+        self.sources = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.beat('starting')
+
+    def wrap(self, read_frame_func):
+        """프레임 읽기 함수를 감싸 읽은 프레임 수로 처리 속도를 측정합니다."""
+        def read_frame():
+            frame = read_frame_func()
+            if frame is not None:
+                self.frames += 1
+                self._window_frames += 1
+                now = time.time()
+                if now - self._last_write >= self.interval:
+                    self.fps = self._window_frames / max(now - self._window_start, 1e-6)
+                    self._window_start, self._window_frames = now, 0
+                    self.beat('running', now)
+            return frame
+        return read_frame
+
+    def add_source(self, name, func):
+        """beat()마다 func()의 반환값을 data[name]으로 함께 기록합니다."""
+        self.sources[name] = func
+
+    def beat(self, state, now=None):
+        """상태를 즉시 기록합니다. (재연결 대기 등 프레임이 없는 구간에서도 호출)"""
+        now = now or time.time()
+        self._last_write = now
+        if state != 'running':
+            # 재연결 대기 시간이 다음 처리 속도 계산에 섞이지 않도록 구간 초기화
+            self._window_start, self._window_frames, self.fps = now, 0, 0.0
+        data = {'ts': now, 'pid': os.getpid(), 'state': state, 'frames': self.frames, 'fps': round(self.fps, 2)}
+        for name, func in self.sources.items():
+            try:
+                data[name] = func()
+            except Exception as e:
+                print(f"⚠️ 하트비트 지표 수집 실패 ({name}): {e}")
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ 하트비트 기록 실패: {e}")
+
+
+def read_heartbeat(path):
+    """하트비트 파일을 읽습니다. 없거나 쓰는 중이면 None."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,56 @@
+'''
+    release date: 2026-10-19
+        - 지연시간/배치 크기 등 수치 지표 집계용 공용 클래스
+'''
+
+import threading
+from collections import deque
+
+DEFAULT_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class RollingStats:
+    """최근 N개 샘플 기준의 수치 통계 (평균, p50, p95, 최대값, 누적 히스토그램)"""
+    def __init__(self, window=500, buckets=DEFAULT_BUCKETS):
+        self.samples = deque(maxlen=window)
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)      # 마지막 칸은 +Inf
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, value):
+        with self.lock:
+            self.samples.append(value)
+            self.total_count += 1
+            self.total_sum += value
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    self.bucket_counts[i] += 1
+                    break
+            else:
+                self.bucket_counts[-1] += 1
+
+    def histogram(self):
+        """누적이 아닌 구간별 카운트를 {'<=5': n, ..., '+Inf': n} 형태로 반환합니다."""
+        with self.lock:
+            labels = [f"<={b}" for b in self.buckets] + ["+Inf"]
+            return dict(zip(labels, self.bucket_counts))
+
+    def summary(self):
+        with self.lock:
+            values = sorted(self.samples)
+            total_count, total_sum = self.total_count, self.total_sum
+        if not values:
+            return {'count': total_count, 'avg': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+
+        def pct(p):
+            return values[min(len(values) - 1, int(round(p * (len(values) - 1))))]
+
+        return {
+            'count': total_count,
+            'avg': round(total_sum / total_count, 2),
+            'p50': round(pct(0.50), 2),
+            'p95': round(pct(0.95), 2),
+            'max': round(values[-1], 2),
+        }
@@ -0,0 +1,214 @@
+'''
+    release date: 2026-10-19
+        - 모델 레지스트리: lib/model_registry.ini에 모델 id / 버전 / 경로 / sha256 등록
+        - 농장 설정 model = <id> 또는 <이름>(최신 버전) 또는 <이름>@<버전> 으로 선택 (코드 수정 없이 배포/롤백)
+        - 최초 사용 시 로드(해시 검증), 같은 모델은 프로세스 안에서 하나의 인스턴스를 공유(참조 카운트)
+        - 사용하지 않는 모델은 max_idle 개까지만 메모리에 남기고 오래된 것부터 해제(LRU)
+    사용법:
+        python -m lib.model_registry list
+        python -m lib.model_registry hash lib/model/251120_s_best.pt
+'''
+
+import argparse
+import configparser
+import gc
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+REGISTRY_PATH = './lib/model_registry.ini'
+FALLBACK_MODEL_PATH = 'lib/model/251120_s_best.pt'      # 레지스트리 파일이 없을 때 (기존 OUR_MODEL)
+
+
+class ModelRegistryError(Exception):
+    pass
+
+
+class ModelHashError(ModelRegistryError):
+    pass
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_yolo(path):
+    from ultralytics import YOLO
+    import torch
+    model = YOLO(path)
+    if torch.cuda.is_available(): model.to('cuda')
+    return model
+
+
+class ModelEntry:
+    def __init__(self, model_id, path, sha256=None, name=None, version=None, description=''):
+        self.model_id = model_id
+        self.path = path
+        self.sha256 = (sha256 or '').lower() or None
+        self.name = name or model_id
+        self.version = version or ''
+        self.description = description
+
+
+class ModelRegistry:
+    """
+    acquire()/release() 쌍으로 사용합니다.
+    주의: 같은 인스턴스를 공유하므로 model.track(persist=True)의 추적 상태도 공유됩니다.
+          한 프로세스에서 여러 스트림이 같은 모델을 쓸 때는 tracker = builtin을 사용하세요.
+    """
+    def __init__(self, registry_path=REGISTRY_PATH, max_idle=1, loader=_load_yolo):
+        self.registry_path = registry_path
+        self.max_idle = max_idle
+        self.loader = loader
+        self.entries = {}
+        self.default_id = None
+        self._models = {}               # model_id -> 모델 인스턴스
+        self._refs = {}                 # model_id -> 참조 수
+        self._idle = OrderedDict()      # 참조 0인 모델 (LRU 순서)
+        self._verified = {}             # path -> (size, mtime_ns) 검증 완료 기록
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.reload()
+
+    def reload(self):
+        """레지스트리 파일을 다시 읽습니다. (이미 로드된 모델은 그대로 유지)"""
+        entries = {}
+        default_id = None
+        if os.path.exists(self.registry_path):
+            cfg = configparser.ConfigParser()
+            cfg.read(self.registry_path, encoding='utf-8')
+            for section in cfg.sections():
+                if section == 'registry': continue
+                s = cfg[section]
+                if not s.get('path'):
+                    print(f"⚠️ 모델 [{section}] path 누락, 건너뜁니다.")
+                    continue
+                entries[section] = ModelEntry(
+                    section, s['path'], s.get('sha256'), s.get('name'), s.get('version'), s.get('description', '')
+                )
+            default_id = cfg.get('registry', 'default', fallback=None)
+        else:
+            print(f"⚠️ 모델 레지스트리 파일이 없습니다: {self.registry_path} (기본 모델 {FALLBACK_MODEL_PATH} 사용, 해시 검증 없음)")
+            entries['default'] = ModelEntry('default', FALLBACK_MODEL_PATH)
+            default_id = 'default'
+        self.entries = entries
+        self.default_id = default_id or (next(iter(entries)) if entries else None)
+
+    def resolve(self, model_ref=None):
+        """model 설정값을 등록된 모델 id로 변환합니다."""
+        if not model_ref:
+            if not self.default_id: raise ModelRegistryError("등록된 모델이 없습니다.")
+            return self.default_id
+        if model_ref in self.entries: return model_ref
+
+        name, _, version = model_ref.partition('@')
+        candidates = [e for e in self.entries.values() if e.name == name and (not version or e.version == version)]
+        if not candidates:
+            raise ModelRegistryError(f"등록되지 않은 모델: {model_ref}")
+        # 버전 미지정 시 가장 높은 버전 (YYMMDD 형식 권장)
+        return max(candidates, key=lambda e: e.version).model_id
+
+    def verify(self, model_id):
+        entry = self.entries[model_id]
+        if not os.path.exists(entry.path):
+            raise ModelRegistryError(f"모델 파일이 없습니다: {entry.path}")
+        if not entry.sha256:
+            print(f"⚠️ 모델 [{model_id}] sha256 미등록, 해시 검증을 건너뜁니다.")
+            return
+        st = os.stat(entry.path)
+        signature = (st.st_size, st.st_mtime_ns)
+        if self._verified.get(entry.path) == signature: return
+        actual = file_sha256(entry.path)
+        if actual != entry.sha256:
+            raise ModelHashError(f"모델 [{model_id}] 해시 불일치: 기대 {entry.sha256[:12]}…, 실제 {actual[:12]}…")
+        self._verified[entry.path] = signature
+
+    def acquire(self, model_ref=None):
+        """모델 인스턴스를 반환합니다. (처음이면 검증 후 로드, 이미 있으면 공유)"""
+        model_id = self.resolve(model_ref)
+        with self._lock:
+            load_lock = self._load_locks.setdefault(model_id, threading.Lock())
+
+        with load_lock:         # 같은 모델을 동시에 두 번 로드하지 않도록
+            with self._lock:
+                if model_id in self._models:
+                    self._refs[model_id] = self._refs.get(model_id, 0) + 1
+                    self._idle.pop(model_id, None)
+                    return self._models[model_id]
+
+            self.verify(model_id)
+            entry = self.entries[model_id]
+            model = self.loader(entry.path)
+            print(f"🧠 모델 로드: [{model_id}] {entry.path}")
+
+            with self._lock:
+                self._models[model_id] = model
+                self._refs[model_id] = 1
+            return model
+
+    def release(self, model_ref=None):
+        model_id = self.resolve(model_ref)
+        with self._lock:
+            if model_id not in self._refs: return
+            self._refs[model_id] -= 1
+            if self._refs[model_id] > 0: return
+            self._idle[model_id] = True
+            self._idle.move_to_end(model_id)
+            evicted = []
+            while len(self._idle) > self.max_idle:
+                old_id, _ = self._idle.popitem(last=False)
+                self._models.pop(old_id, None)
+                self._refs.pop(old_id, None)
+                evicted.append(old_id)
+        if evicted:
+            gc.collect()
+            try:
+                import torch
+                if torch.cuda.is_available(): torch.cuda.empty_cache()
+            except ImportError:
+                pass
+            print(f"🧹 사용하지 않는 모델 해제: {', '.join(evicted)}")
+
+    def loaded(self):
+        with self._lock:
+            return {mid: self._refs.get(mid, 0) for mid in self._models}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry(registry_path=REGISTRY_PATH):
+    """프로세스 공용 레지스트리 (여러 파이프라인이 같은 모델을 공유하도록)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(registry_path)
+        return _registry
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["list", "hash"])
+    parser.add_argument("path", nargs="?")
+    parser.add_argument("--registry", default=REGISTRY_PATH)
+    args = parser.parse_args()
+
+    if args.command == "hash":
+        if not args.path: parser.error("hash에는 모델 파일 경로가 필요합니다.")
+        print(file_sha256(args.path))
+    else:
+        registry = ModelRegistry(args.registry, loader=None)
+        for model_id, entry in registry.entries.items():
+            try:
+                registry.verify(model_id)
+                status = "OK" if entry.sha256 else "해시 미등록"
+            except ModelRegistryError as e:
+                status = str(e)
+            mark = " (기본)" if model_id == registry.default_id else ""
+            print(f"{model_id}{mark} | {entry.name}@{entry.version or '-'} | {entry.path} | {status}")
@@ -0,0 +1,176 @@
+'''
+    release date: 2026-10-19
+        - 재연결/재시작 간 파이프라인 상태 유지 (warm restart)
+          돼지/작업자 상태표, 위반 처리 ID, 움직임 감지 상태, MOG2 배경 모델
+        - 같은 프로세스 안에서는 객체를 그대로 넘겨 재사용하고,
+          종료 시 디스크에 스냅샷(pickle + 배경 이미지 PNG)을 남겨 다음 실행에서 복원
+        - 끊긴 동안의 시간은 만료 계산에서 제외하고, 재연결 직후 새 ID로 잡힌 객체는
+          끊기기 전 마지막 위치와 겹치면 기존 상태를 이어받음 (출하 카운트 중복/누락 방지)
+        - 스냅샷에서 복원한 객체는 음수 ID로 바꿔 보관 (새 프로세스의 추적기가 1부터 다시 매기는 ID와 겹치지 않도록)
+'''
+
+import os
+import pickle
+import time
+
+import cv2
+
+SNAPSHOT_VERSION = 1
+REBIND_WINDOW_SECONDS = 10      # 재연결 후 이 시간 안에 나타난 새 ID만 기존 상태와 연결
+REBIND_IOU = 0.3
+
+
+def _box_iou(a, b):
+    iw = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def create_background_subtractor():
+    return cv2.createBackgroundSubtractorMOG2(history=300, varThreshold=16, detectShadows=False)
+
+
+class PipelineState:
+    def __init__(self):
+        self.pigs = {}
+        self.workers = {}
+        self.reentered_ids = set()
+        self.detecting = False
+        self.idle_start_time = None
+        self.prev_small_gray = None
+        self.bg_sub = create_background_subtractor()
+        self.paused_at = None
+        self.resumed_at = None
+        self._orphans = {}          # 재연결 전 마지막 위치가 있는 객체 {track_id: 'pig'|'worker'}
+
+    # --- 재연결 ---
+    def pause(self, now=None):
+        """스트림이 끊긴 시점을 기록합니다. (process_video 종료 시 호출)"""
+        self.paused_at = now or time.time()
+
+    def resume(self, now=None):
+        """끊긴 시간만큼 last_seen을 밀어 만료를 막고, 새 ID 연결 대상 목록을 만듭니다."""
+        now = now or time.time()
+        if self.paused_at is not None:
+            gap = max(0.0, now - self.paused_at)
+            for obj in list(self.pigs.values()) + list(self.workers.values()):
+                obj.last_seen += gap
+            self.idle_start_time = None
+            if self.pigs or self.workers:
+                print(f"♻️ 상태 복원: 돼지 {len(self.pigs)} / 작업자 {len(self.workers)} (중단 {gap:.1f}s)")
+        self._orphans = {tid: 'pig' for tid, p in self.pigs.items() if getattr(p, 'last_box', None)}
+        self._orphans.update({tid: 'worker' for tid, w in self.workers.items() if getattr(w, 'last_box', None)})
+        self.paused_at = None
+        self.resumed_at = now
+
+    def rebind(self, label, track_id, box, now):
+        """
+        재연결 직후 처음 보는 ID가 끊기기 전 같은 종류 객체의 마지막 위치와 겹치면 그 상태를 넘겨받습니다.
+        반환값: 이어받았으면 이전 ID, 아니면 None
+        """
+        if not self._orphans or self.resumed_at is None: return None
+        if now - self.resumed_at > REBIND_WINDOW_SECONDS:
+            self._orphans = {}
+            return None
+
+        table = self.pigs if label == 'pig' else self.workers
+        if track_id in table: return None
+        best_id, best_iou = None, REBIND_IOU
+        for old_id, kind in self._orphans.items():
+            if kind != label or old_id not in table: continue
+            iou = _box_iou(table[old_id].last_box, box)
+            if iou >= best_iou: best_id, best_iou = old_id, iou
+        if best_id is None: return None
+
+        obj = table.pop(best_id)
+        obj.id = track_id
+        table[track_id] = obj
+        if best_id in self.reentered_ids:
+            self.reentered_ids.discard(best_id)
+            self.reentered_ids.add(track_id)
+        del self._orphans[best_id]
+        return best_id
+
+    def mark_seen(self, track_id):
+        self._orphans.pop(track_id, None)
+
+    # --- 디스크 스냅샷 ---
+    def save(self, path):
+        self.pause()
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'saved_at': time.time(),
+            'pigs': self.pigs,
+            'workers': self.workers,
+            'reentered_ids': self.reentered_ids,
+            'detecting': self.detecting,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        try:
+            bg = self.bg_sub.getBackgroundImage()
+            if bg is not None: cv2.imwrite(path + '.bg.png', bg)
+            elif os.path.exists(path + '.bg.png'): os.remove(path + '.bg.png')     # 이전 실행의 배경이 섞이지 않도록
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+            print(f"💾 파이프라인 상태 저장: {path} (돼지 {len(self.pigs)}, 작업자 {len(self.workers)})")
+        except (OSError, pickle.PicklingError) as e:
+            print(f"⚠️ 파이프라인 상태 저장 실패: {e}")
+
+    @classmethod
+    def load(cls, path, farm_config, max_age=600):
+        """스냅샷이 max_age초 이내면 복원, 아니면 새 상태를 반환합니다."""
+        state = cls()
+        if not os.path.exists(path): return state
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, AttributeError, EOFError) as e:
+            print(f"⚠️ 파이프라인 상태 스냅샷 읽기 실패, 새로 시작합니다: {e}")
+            return state
+
+        age = time.time() - data.get('saved_at', 0)
+        if data.get('version') != SNAPSHOT_VERSION or age > max_age:
+            print(f"ℹ️ 파이프라인 상태 스냅샷이 오래되어 사용하지 않습니다. ({age:.0f}s)")
+            return state
+
+        state.pigs = data['pigs']
+        state.workers = data['workers']
+        state.reentered_ids = data['reentered_ids']
+        state.detecting = data['detecting']
+        for obj in list(state.pigs.values()) + list(state.workers.values()):
+            obj.apply_config(farm_config)       # 스냅샷 안의 설정 사본 대신 현재 설정을 참조
+            if hasattr(obj, 'config'): obj.config = farm_config
+        state.paused_at = data['saved_at']
+        state._rekey_restored()
+
+        bg = cv2.imread(path + '.bg.png', cv2.IMREAD_UNCHANGED)
+        if bg is not None:
+            # 학습률 1로 한 번 적용하면 배경 모델이 저장된 배경으로 초기화됨 (300프레임 재학습 불필요)
+            state.bg_sub.apply(bg, learningRate=1.0)
+        print(f"♻️ 파이프라인 상태 스냅샷 복원 ({age:.0f}s 전, 배경 {'복원' if bg is not None else '없음'})")
+        return state
+
+
+    def _rekey_restored(self):
+        """
+        새 프로세스의 추적기(Ultralytics/ByteTracker)는 ID를 1부터 다시 매기므로, 복원한 ID를 그대로 두면
+        관계없는 새 객체가 이전 객체의 상태(선 통과 여부/이력)를 물려받습니다.
+        추적기가 만들 수 없는 음수 ID로 바꿔 두면 rebind()의 위치(IoU) 비교로만 실제 트랙에 이어집니다.
+        """
+        mapping = {}
+        for table in (self.pigs, self.workers):
+            restored = list(table.items())
+            table.clear()
+            for old_id, obj in restored:
+                mapping[old_id] = obj.id = -(len(mapping) + 1)
+                table[obj.id] = obj
+        # 이미 만료된 객체의 위반 처리 기록은 다시 연결될 대상이 없으므로 버림
+        self.reentered_ids = {mapping[tid] for tid in self.reentered_ids if tid in mapping}
+
+
+def get_snapshot_path(farm_config):
+    snapshot_dir = farm_config.get('state_snapshot_dir') or 'state'
+    return os.path.join(snapshot_dir, f"{farm_config.get('farm_code')}_{farm_config.get('camera_id')}.pkl")
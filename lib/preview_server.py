@@ -0,0 +1,226 @@
+'''
+    release date: 2026-10-19
+        - 헤드리스 실행 시 결과 화면 확인용 MJPEG 미리보기 (http://<host>:<port>/)
+        - 보는 사람이 있을 때만 JPEG 인코딩, 최대 max_fps / 가로 width로 축소해 프레임 루프 부담 최소화
+        - /stream.mjpg (실시간), /snapshot.jpg (현재 화면), POST /quit (기존 화면의 q 종료와 동일, 로컬 접속만 허용)
+          /quit은 실행마다 새로 만드는 토큰(미리보기 페이지에 포함)이 맞아야 처리 (다른 웹 페이지의 요청 위조 방지)
+        - 표준 라이브러리 http.server만 사용
+'''
+
+import hmac
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import cv2
+
+DEFAULT_PORT = 8766
+BOUNDARY = b'frame'
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+MAX_POST_BYTES = 1024
+
+INDEX_HTML = '''<!doctype html>
+<html><head><meta charset="utf-8"><title>Biosecurity Preview</title></head>
+<body style="margin:0;background:#111;color:#eee;font-family:sans-serif">
+<img src="/stream.mjpg" style="max-width:100%;display:block">
+<form method="post" action="/quit" onsubmit="return confirm('파이프라인을 종료할까요?')">
+<input type="hidden" name="token" value="{token}">
+<button type="submit" style="margin:8px">종료 (q)</button></form>
+</body></html>'''
+
+
+class PreviewHub:
+    """
+    프레임 루프: wants_frame()이 True일 때만 submit(frame)
+    인코딩 스레드: 최신 프레임 1장만 JPEG로 변환해 모든 시청자에게 공유
+    """
+    def __init__(self, max_fps=5.0, width=480, quality=70):
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.width = width
+        self.quality = quality
+        self.viewers = 0
+        self.jpeg = None
+        self.seq = 0
+        self.encoded_frames = 0
+        self._frame = None
+        self._last_submit = 0.0
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._encode_loop, name="PreviewEncoder", daemon=True)
+        self._thread.start()
+
+    def wants_frame(self, now=None):
+        if self.viewers <= 0: return False
+        now = now or time.monotonic()
+        return now - self._last_submit >= self.min_interval
+
+    def submit(self, frame):
+        """프레임 참조만 넘기고 바로 반환합니다. (인코딩은 별도 스레드)"""
+        with self._cond:
+            self._frame = frame
+            self._last_submit = time.monotonic()
+            self._cond.notify_all()
+
+    def _encode_loop(self):
+        while True:
+            with self._cond:
+                while self._frame is None and not self._stop:
+                    self._cond.wait()
+                if self._stop: return
+                frame, self._frame = self._frame, None
+
+            h, w = frame.shape[:2]
+            if self.width and w > self.width:
+                frame = cv2.resize(frame, (self.width, int(h * self.width / w)), interpolation=cv2.INTER_AREA)
+            ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok: continue
+            with self._cond:
+                self.jpeg = buf.tobytes()
+                self.seq += 1
+                self.encoded_frames += 1
+                self._cond.notify_all()
+
+    def wait_jpeg(self, last_seq, timeout=5.0):
+        """last_seq 이후의 새 JPEG를 기다립니다. (seq, jpeg) 또는 시간 초과 시 (last_seq, None)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq != last_seq or self._stop, timeout)
+            if self.seq == last_seq: return last_seq, None
+            return self.seq, self.jpeg
+
+    def add_viewer(self):
+        with self._cond:
+            self.viewers += 1
+            self._last_submit = 0.0     # 첫 화면을 바로 받도록
+
+    def remove_viewer(self):
+        with self._cond:
+            self.viewers -= 1
+
+    @property
+    def closed(self):
+        return self._stop
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hub = None
+    shutdown = None
+    token = ''
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='text/plain; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/':
+            self._send(200, INDEX_HTML.format(token=self.token).encode('utf-8'), 'text/html; charset=utf-8')
+        elif path == '/stream.mjpg':
+            self._stream()
+        elif path == '/snapshot.jpg':
+            self.hub.add_viewer()
+            try:
+                _, jpeg = self.hub.wait_jpeg(self.hub.seq)
+            finally:
+                self.hub.remove_viewer()
+            if jpeg: self._send(200, jpeg, 'image/jpeg')
+            else: self._send(503, "프레임 없음".encode('utf-8'))
+        else:
+            self._send(404, b'not found')
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/quit':
+            return self._send(404, b'not found')
+        if self.client_address[0] not in LOCAL_ADDRESSES:
+            return self._send(403, "로컬 접속에서만 종료할 수 있습니다.".encode('utf-8'))
+        # 로컬 브라우저에 열린 다른 페이지도 127.0.0.1로 폼을 보낼 수 있으므로 미리보기 페이지의 토큰을 확인
+        try:
+            length = min(int(self.headers.get('Content-Length') or 0), MAX_POST_BYTES)
+        except ValueError:
+            length = 0
+        body = self.rfile.read(length).decode('utf-8', 'replace') if length > 0 else ''
+        token = (parse_qs(body).get('token') or [''])[0]
+        if not hmac.compare_digest(token.encode(), self.token.encode()):
+            return self._send(403, "미리보기 화면에서만 종료할 수 있습니다.".encode('utf-8'))
+        print("🛑 미리보기 화면에서 종료 요청")
+        self.shutdown['manual_quit'] = True
+        self._send(200, "종료 요청을 받았습니다.".encode('utf-8'))
+
+    def _stream(self):
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY.decode()}')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.hub.add_viewer()
+        seq = -1
+        try:
+            while not self.shutdown.get('manual_quit') and not self.hub.closed:
+                seq, jpeg = self.hub.wait_jpeg(seq)
+                if jpeg is None: continue       # 프레임이 멈춘 동안(재연결 등) 연결 유지
+                self.wfile.write(b'--' + BOUNDARY + b'\r\nContent-Type: image/jpeg\r\nContent-Length: '
+                                 + str(len(jpeg)).encode() + b'\r\n\r\n' + jpeg + b'\r\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            self.hub.remove_viewer()
+            self.close_connection = True
+
+
+class PreviewServer:
+    def __init__(self, shutdown, host='127.0.0.1', port=DEFAULT_PORT, max_fps=5.0, width=480, quality=70):
+        self.hub = PreviewHub(max_fps, width, quality)
+        handler = type('PreviewHandler', (_Handler,),
+                       {'hub': self.hub, 'shutdown': shutdown, 'token': secrets.token_urlsafe(16)})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="PreviewServer", daemon=True)
+        self._thread.start()
+        host, port = self.httpd.server_address[:2]
+        print(f"🖥️ 미리보기: http://{host}:{port}/ (시청 중일 때만 인코딩, 최대 {1 / self.hub.min_interval if self.hub.min_interval else 0:.0f}fps)")
+        return self
+
+    def stop(self):
+        self.hub.close()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def create_preview_server(farm_config, shutdown):
+    """농장 설정 preview_port가 있으면 PreviewServer를 시작해 반환합니다. (없거나 실패 시 None)"""
+    port = farm_config.get('preview_port')
+    if not port: return None
+
+    def _num(key, default):
+        try:
+            return type(default)(farm_config.get(key) or default)
+        except (ValueError, TypeError):
+            print(f"⚠️ [{key}] 설정값 오류('{farm_config.get(key)}'). 기본값 {default}을 사용합니다.")
+            return default
+    try:
+        return PreviewServer(
+            shutdown, farm_config.get('preview_host') or '127.0.0.1', int(port),
+            max_fps=_num('preview_max_fps', 5.0), width=_num('preview_width', 480), quality=_num('preview_quality', 70),
+        ).start()
+    except (OSError, ValueError) as e:
+        print(f"❌ 미리보기 서버 시작 실패 (port {port}): {e}")
+        return None
@@ -0,0 +1,114 @@
+'''
+    release date: 2026-10-19
+        - CPU 과부하 시 단계적 품질 조정(QoS): 프레임 처리 시간이 스트림 프레임 간격을 넘으면 한 단계씩 낮추고
+          여유가 생기면 다시 올림 (추론 해상도 → 추론 간격 → 움직임 판정 간격 → 화면 주석 생략)
+        - 처리가 밀려 지연이 계속 쌓이는 대신 경고/위반 판정이 제때 나가도록 함
+        - 현재 단계는 get_metrics()로 조회 (하트비트 파일에 함께 기록)
+'''
+
+import time
+
+# 단계별 설정 (0 = 최고 품질)
+#   imgsz: 추론 입력 크기 (None이면 모델 기본값)
+#   stride: N 프레임마다 검출/추적 1회
+#   motion_every: N 프레임마다 움직임 판정 1회
+#   annotate: 박스/궤적/라인 그리기 여부 (끄면 위반 클립에도 주석 없음)
+QOS_LEVELS = (
+    {'imgsz': None, 'stride': 1, 'motion_every': 1, 'annotate': True},
+    {'imgsz': 480, 'stride': 1, 'motion_every': 1, 'annotate': True},
+    {'imgsz': 416, 'stride': 2, 'motion_every': 1, 'annotate': True},
+    {'imgsz': 416, 'stride': 2, 'motion_every': 2, 'annotate': True},
+    {'imgsz': 320, 'stride': 3, 'motion_every': 2, 'annotate': False},
+)
+
+
+class QoSController:
+    """
+    프레임마다 update(처리 시간 ms)를 호출합니다.
+    처리 시간 EWMA가 프레임 간격(1000/fps)의 high_ratio를 down_after초 동안 넘거나 입력 큐가 쌓이면 한 단계 낮추고,
+    low_ratio 아래로 up_after초 유지되면 한 단계 올립니다. 단계 변경 직후 cooldown초 동안은 다시 바꾸지 않습니다.
+    검출을 건너뛴 프레임도 함께 평균하므로 stride 단계에서는 프레임당 평균 부담으로 판단합니다.
+    움직임이 없어 검출하지 않는 동안(detecting=False)은 단계를 유지합니다. 대기 중의 가벼운 프레임으로
+    품질을 올려 두면 다음 움직임 시작 때 다시 내려가기까지 지연이 쌓이기 때문입니다.
+    """
+    def __init__(self, fps, levels=QOS_LEVELS, min_level=0, max_level=None, high_ratio=0.9, low_ratio=0.5,
+                 down_after=3.0, up_after=20.0, cooldown=5.0, backlog_limit=5, alpha=0.1, clock=time.time):
+        self.budget_ms = 1000.0 / (fps or 15.0)
+        self.levels = levels
+        self.min_level = min_level
+        self.max_level = len(levels) - 1 if max_level is None else min(max_level, len(levels) - 1)
+        self.high_ratio = high_ratio
+        self.low_ratio = low_ratio
+        self.down_after = down_after
+        self.up_after = up_after
+        self.cooldown = cooldown
+        self.backlog_limit = backlog_limit
+        self.alpha = alpha
+        self.clock = clock
+        self.backlog_func = None        # 입력 큐 길이 함수 (main_rtsp에서 연결)
+
+        self.level = min_level
+        self.load_ms = 0.0              # 프레임당 평균 처리 시간 EWMA
+        self.frame_idx = 0
+        self.changes = 0
+        self._over_since = None
+        self._under_since = None
+        self._last_change = 0.0
+
+    @property
+    def params(self):
+        return self.levels[self.level]
+
+    def should_detect(self):
+        return self.frame_idx % self.params['stride'] == 0
+
+    def should_check_motion(self):
+        return self.frame_idx % self.params['motion_every'] == 0
+
+    def update(self, frame_ms, detecting=True):
+        """이번 프레임 처리 시간을 반영하고 단계가 바뀌었으면 True"""
+        self.frame_idx += 1
+        if not detecting:
+            # 대기 프레임은 평균/타이머에 넣지 않음 (움직임 재개 시 직전 검출 구간의 부하에서 이어서 판단)
+            self._over_since = self._under_since = None
+            return False
+        self.load_ms = frame_ms if self.load_ms == 0.0 else (1 - self.alpha) * self.load_ms + self.alpha * frame_ms
+        now = self.clock()
+        backlog = self.backlog_func() if self.backlog_func else 0
+
+        overloaded = self.load_ms > self.budget_ms * self.high_ratio or backlog > self.backlog_limit
+        idle = self.load_ms < self.budget_ms * self.low_ratio and backlog <= 1
+        self._over_since = (self._over_since or now) if overloaded else None
+        self._under_since = (self._under_since or now) if idle else None
+        if now - self._last_change < self.cooldown: return False
+
+        if overloaded and self.level < self.max_level and now - self._over_since >= self.down_after:
+            return self._set_level(self.level + 1, now, f"과부하 {self.load_ms:.0f}ms/{self.budget_ms:.0f}ms, 대기 {backlog}")
+        if idle and self.level > self.min_level and now - self._under_since >= self.up_after:
+            return self._set_level(self.level - 1, now, f"여유 {self.load_ms:.0f}ms/{self.budget_ms:.0f}ms")
+        return False
+
+    def _set_level(self, level, now, reason):
+        direction = "▼" if level > self.level else "▲"
+        self.level = level
+        self.changes += 1
+        self._last_change = now
+        self._over_since = self._under_since = None
+        print(f"⚙️ QoS {direction} 단계 {level} {self.params} ({reason})")
+        return True
+
+    def get_metrics(self):
+        return {'level': self.level, 'load_ms': round(self.load_ms, 1), 'budget_ms': round(self.budget_ms, 1),
+                'changes': self.changes}
+
+
+def create_qos_controller(farm_config, fps):
+    """농장 설정(qos_*)으로 QoSController를 만듭니다. qos_enabled = no면 None."""
+    if str(farm_config.get('qos_enabled', 'yes')).lower() in ('no', 'false', '0'):
+        return None
+    try:
+        max_level = int(farm_config.get('qos_max_level') or len(QOS_LEVELS) - 1)
+    except ValueError:
+        print(f"⚠️ [qos_max_level] 설정값 오류('{farm_config.get('qos_max_level')}'). 기본값 {len(QOS_LEVELS) - 1}을 사용합니다.")
+        max_level = len(QOS_LEVELS) - 1
+    return QoSController(fps, max_level=max_level)
@@ -0,0 +1,292 @@
+'''
+    release date: 2026-10-19
+        - 로컬 디렉터리(temp_clips / recorded_videos / db_error_logs 등) 용량·보관 기간 관리
+        - 디렉터리별 용량 한도(MB) / 보관 일수, 디스크 최소 여유 공간을 백그라운드 스레드에서 주기 점검
+        - 삭제 순서: evict_first 패턴(미리보기 이미지 등) → 오래된 파일
+        - 업로드/DB 커밋 중인 클립과 최근 수정된 파일(녹화 중)은 삭제하지 않음
+        - 업로드/DB 기록에 실패한 미전송 클립(.unsent 표시)은 재전송될 때까지 삭제하지 않고 별도 지표로 집계
+        - 재전송을 포기한 클립의 보류 디렉터리(unsent_dead_letter)는 자체 용량/보관 한도로 관리하고 지표에 표시
+        - 미전송 클립 때문에 디스크 최소 여유 공간을 확보하지 못하면 경고
+    사용법:
+        python -m lib.retention_manager --farm-name FARM_A [--dry-run]
+'''
+
+import argparse
+import fnmatch
+import os
+import shutil
+import threading
+import time
+
+from lib.utils import is_pending_clip, is_unsent_clip, UNSENT_DEAD_LETTER_DIR
+
+MB = 1024 * 1024
+
+# retention_dirs 설정이 없을 때 기본 정책: (경로, 용량 MB, 보관 일수, 우선 삭제 패턴)
+DEFAULT_POLICIES = (
+    ('temp_clips', 20480, 30, ('*_key.jpg', '*_sheet.jpg')),
+    ('recorded_videos', 51200, 14, ()),
+    ('db_error_logs', 100, 90, ()),
+    (UNSENT_DEAD_LETTER_DIR, 5120, 90, ()),
+)
+
+
+class RetentionPolicy:
+    def __init__(self, directory, max_bytes=None, max_age_days=None, evict_first=()):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.evict_first = tuple(evict_first)
+
+    def rank(self, path):
+        """낮을수록 먼저 삭제"""
+        name = os.path.basename(path)
+        return 0 if any(fnmatch.fnmatch(name, p) for p in self.evict_first) else 1
+
+
+def parse_retention_dirs(spec):
+    """
+    여러 줄 설정을 정책 목록으로 변환합니다. 한 줄: 경로 | 용량MB | 보관일수 | 우선삭제패턴(쉼표)
+    예) temp_clips | 20480 | 30 | *_key.jpg,*_sheet.jpg
+    """
+    if not spec:
+        return [RetentionPolicy(d, mb * MB, days, pats) for d, mb, days, pats in DEFAULT_POLICIES]
+    policies = []
+    for line in spec.strip().splitlines():
+        parts = [p.strip() for p in line.split('|')]
+        if not parts[0]: continue
+        try:
+            max_bytes = int(float(parts[1]) * MB) if len(parts) > 1 and parts[1] else None
+            max_age = float(parts[2]) if len(parts) > 2 and parts[2] else None
+        except ValueError:
+            print(f"⚠️ retention_dirs 형식 오류, 건너뜁니다: {line}")
+            continue
+        patterns = [p.strip() for p in parts[3].split(',') if p.strip()] if len(parts) > 3 else []
+        policies.append(RetentionPolicy(parts[0], max_bytes, max_age, patterns))
+    return policies
+
+
+class RetentionManager:
+    """
+    Args:
+        min_free_bytes: 디스크 여유 공간이 이보다 작으면 정책 한도와 무관하게 오래된 파일부터 추가 삭제
+        grace_seconds: 이 시간 안에 수정된 파일은 쓰는 중일 수 있으므로 제외
+        dead_letter_dir: 재전송을 포기한 클립 디렉터리 (지표 dead_letter_*로 집계, 삭제는 해당 정책을 따름)
+    """
+    def __init__(self, policies, interval=300, min_free_bytes=None, grace_seconds=120, dry_run=False,
+                 dead_letter_dir=UNSENT_DEAD_LETTER_DIR):
+        self.policies = policies
+        self.dead_letter_dir = dead_letter_dir
+        self.interval = interval
+        self.min_free_bytes = min_free_bytes
+        self.grace_seconds = grace_seconds
+        self.dry_run = dry_run
+        self.metrics = {
+            'runs': 0, 'evicted_files': 0, 'evicted_bytes': 0, 'protected_files': 0,
+            'unsent_files': 0, 'unsent_bytes': 0, 'dead_letter_files': 0, 'dead_letter_bytes': 0,
+            'free_shortfall_bytes': 0,
+            'last_run': None, 'last_duration_ms': 0.0, 'directories': {}, 'disk': {},
+        }
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="RetentionManager", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread: self._thread.join(5)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ 보관 정책 점검 중 오류: {e}")
+            self._stop_event.wait(self.interval)
+
+    def _scan(self, policy, now):
+        """반환값: ([(경로, 크기, 수정 시각, 삭제 가능)], 보호 파일 수, (미전송 파일 수, 미전송 바이트))"""
+        files, protected, unsent, unsent_bytes = [], 0, 0, 0
+        for root, _, names in os.walk(policy.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if is_unsent_clip(path):
+                    unsent += 1; unsent_bytes += st.st_size
+                    files.append((path, st.st_size, st.st_mtime, False))
+                elif now - st.st_mtime < self.grace_seconds or is_pending_clip(path):
+                    protected += 1
+                    files.append((path, st.st_size, st.st_mtime, False))
+                else:
+                    files.append((path, st.st_size, st.st_mtime, True))
+        return files, protected, (unsent, unsent_bytes)
+
+    def _remove(self, path, size, reason, stats):
+        if not self.dry_run:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"⚠️ 삭제 실패: {path} ({e})")
+                return False
+        stats['files'] += 1
+        stats['bytes'] += size
+        print(f"🧹 {'[dry-run] ' if self.dry_run else ''}{reason}: {path} ({size / MB:.1f}MB)")
+        return True
+
+    def run_once(self):
+        t0 = time.perf_counter()
+        now = time.time()
+        stats = {'files': 0, 'bytes': 0}
+        dir_metrics, protected_total = {}, 0
+        unsent_total, unsent_bytes = 0, 0
+        candidates_all = []         # 디스크 여유 공간 부족 시 전체 대상 (rank, mtime, path, size)
+
+        for policy in self.policies:
+            if not os.path.isdir(policy.directory):
+                continue
+            files, protected, (unsent, unsent_size) = self._scan(policy, now)
+            protected_total += protected
+            unsent_total += unsent; unsent_bytes += unsent_size
+            total = sum(size for _, size, _, _ in files)
+            removable = [(policy.rank(p), mtime, p, size) for p, size, mtime, ok in files if ok]
+            removed = set()
+
+            # 1) 보관 기간 초과
+            if policy.max_age_days:
+                cutoff = now - policy.max_age_days * 86400
+                for _, mtime, path, size in removable:
+                    if mtime < cutoff and self._remove(path, size, f"보관 기간({policy.max_age_days:g}일) 초과", stats):
+                        removed.add(path); total -= size
+
+            # 2) 용량 한도 초과: 우선 삭제 패턴 → 오래된 순
+            if policy.max_bytes and total > policy.max_bytes:
+                for _, _, path, size in sorted(removable):
+                    if total <= policy.max_bytes: break
+                    if path in removed: continue
+                    if self._remove(path, size, f"용량 한도({policy.max_bytes / MB:.0f}MB) 초과", stats):
+                        removed.add(path); total -= size
+
+            candidates_all.extend(c for c in removable if c[2] not in removed)
+            dir_metrics[policy.directory] = {
+                'bytes': total, 'files': len(files) - len(removed), 'protected': protected, 'unsent': unsent,
+                'max_bytes': policy.max_bytes, 'max_age_days': policy.max_age_days,
+            }
+
+        # 3) 디스크 여유 공간 확보
+        disk = self._disk_usage()
+        shortfall = 0
+        if self.min_free_bytes and disk and disk['free'] < self.min_free_bytes:
+            need = self.min_free_bytes - disk['free']
+            print(f"⚠️ 디스크 여유 공간 부족 ({disk['free'] / MB:.0f}MB < {self.min_free_bytes / MB:.0f}MB)")
+            for _, _, path, size in sorted(candidates_all):
+                if need <= 0: break
+                if self._remove(path, size, "디스크 여유 공간 부족", stats):
+                    need -= size
+            disk = self._disk_usage()
+            shortfall = max(0, need)
+            if shortfall and unsent_bytes:
+                print(f"🚨 미전송 클립 {unsent_total}개({unsent_bytes / MB:.1f}MB)는 삭제하지 않으므로 "
+                      f"여유 공간 {shortfall / MB:.0f}MB를 확보하지 못했습니다. 저장소/DB 연결과 "
+                      f"{self.dead_letter_dir or '보류 디렉터리'}를 확인하세요.")
+
+        dead_files, dead_bytes = self._count_dir(self.dead_letter_dir)
+
+        with self._lock:
+            m = self.metrics
+            m['runs'] += 1
+            m['evicted_files'] += stats['files']
+            m['evicted_bytes'] += stats['bytes']
+            m['protected_files'] = protected_total
+            m['unsent_files'] = unsent_total
+            m['unsent_bytes'] = unsent_bytes
+            m['dead_letter_files'] = dead_files
+            m['dead_letter_bytes'] = dead_bytes
+            m['free_shortfall_bytes'] = shortfall
+            m['last_run'] = now
+            m['last_duration_ms'] = round((time.perf_counter() - t0) * 1000, 1)
+            m['directories'] = dir_metrics
+            m['disk'] = disk or {}
+        if unsent_total:
+            print(f"📌 미전송 클립 보관 중: {unsent_total}개 파일, {unsent_bytes / MB:.1f}MB (재전송 전까지 삭제하지 않음)")
+        if dead_files:
+            print(f"🚨 재전송 보류 클립: {dead_files}개 파일, {dead_bytes / MB:.1f}MB ({self.dead_letter_dir})")
+        if stats['files']:
+            print(f"🧹 보관 정책 적용: {stats['files']}개 파일, {stats['bytes'] / MB:.1f}MB 정리")
+        return stats
+
+    @staticmethod
+    def _count_dir(directory):
+        files = size = 0
+        if directory and os.path.isdir(directory):
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    try:
+                        size += os.path.getsize(os.path.join(root, name)); files += 1
+                    except OSError:
+                        continue
+        return files, size
+
+    def _disk_usage(self):
+        for policy in self.policies:
+            path = policy.directory if os.path.isdir(policy.directory) else '.'
+            usage = shutil.disk_usage(path)
+            return {'total': usage.total, 'used': usage.used, 'free': usage.free}
+        return None
+
+    def get_metrics(self):
+        with self._lock:
+            return {**self.metrics, 'directories': dict(self.metrics['directories'])}
+
+
+def create_retention_manager(farm_config, dry_run=False):
+    """농장 설정(retention_*)으로 RetentionManager를 만듭니다. retention_enabled = no면 None."""
+    if str(farm_config.get('retention_enabled', 'yes')).lower() in ('no', 'false', '0'):
+        return None
+    def _num(key, default):
+        try:
+            return float(farm_config.get(key) or default)
+        except (ValueError, TypeError):
+            print(f"⚠️ [{key}] 설정값 오류('{farm_config.get(key)}'). 기본값 {default}을 사용합니다.")
+            return default
+    policies = parse_retention_dirs(farm_config.get('retention_dirs'))
+    dead_letter_dir = farm_config.get('unsent_dead_letter_dir') or UNSENT_DEAD_LETTER_DIR
+    if not any(os.path.abspath(p.directory) == os.path.abspath(dead_letter_dir) for p in policies):
+        # retention_dirs에 없으면 기본 한도로 관리 (재전송 보류 클립이 디스크를 채우지 않도록)
+        _, mb, days, pats = DEFAULT_POLICIES[-1]
+        policies.append(RetentionPolicy(dead_letter_dir, mb * MB, days, pats))
+    return RetentionManager(
+        policies,
+        interval=_num('retention_interval', 300),
+        min_free_bytes=int(_num('retention_min_free_mb', 2048) * MB),
+        dry_run=dry_run,
+        dead_letter_dir=dead_letter_dir,
+    )
+
+
+if __name__ == "__main__":
+    from lib.farm_config import parse_farm_config
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="./lib/farm_config.ini")
+    parser.add_argument("--farm-name", required=True)
+    parser.add_argument("--dry-run", action="store_true", help="삭제하지 않고 대상만 출력")
+    args = parser.parse_args()
+
+    manager = create_retention_manager(parse_farm_config(args.config, args.farm_name), dry_run=args.dry_run)
+    if manager is None:
+        print("ℹ️ retention_enabled = no")
+    else:
+        manager.run_once()
+        m = manager.get_metrics()
+        print(f"미전송 {m['unsent_files']}개 ({m['unsent_bytes'] / MB:.1f}MB) | "
+              f"재전송 보류 {m['dead_letter_files']}개 ({m['dead_letter_bytes'] / MB:.1f}MB, {manager.dead_letter_dir})")
+        for directory, m in manager.get_metrics()['directories'].items():
+            limit = f"{m['max_bytes'] / MB:.0f}MB" if m['max_bytes'] else '-'
+            print(f"{directory} | {m['bytes'] / MB:.1f}MB / {limit} | 파일 {m['files']} (보호 {m['protected']}, 미전송 {m['unsent']})")
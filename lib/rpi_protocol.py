@@ -0,0 +1,55 @@
+'''
+    release date: 2026-10-19
+        - RPI 경고 링크 프레임 프로토콜
+        - [4바이트 big-endian 길이][UTF-8 JSON 본문]
+        - 본문: {"type": SIGNAL|ACK|PING|PONG, "id": 메시지 번호, "msg": 신호 문자열, "ts": 송신 시각}
+        - ACK/PONG은 요청의 id를 그대로 돌려주며, PONG은 PING의 ts를 echo_ts로 돌려줍니다.
+'''
+
+import json
+import struct
+import time
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 64 * 1024
+
+TYPE_SIGNAL = 'SIGNAL'
+TYPE_ACK = 'ACK'
+TYPE_PING = 'PING'
+TYPE_PONG = 'PONG'
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_frame(msg_type, msg_id, message=None, **extra):
+    body = {'type': msg_type, 'id': msg_id, 'ts': time.time()}
+    if message is not None:
+        body['msg'] = message
+    body.update(extra)
+    payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+    return HEADER.pack(len(payload)) + payload
+
+
+class FrameReader:
+    """스트림 소켓에서 받은 바이트를 누적하여 완성된 프레임(dict)을 돌려줍니다."""
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        self.buffer.extend(data)
+        frames = []
+        while len(self.buffer) >= HEADER.size:
+            (length,) = HEADER.unpack_from(self.buffer)
+            if length > MAX_FRAME_SIZE:
+                raise ProtocolError(f"프레임 크기 초과: {length} bytes")
+            if len(self.buffer) < HEADER.size + length:
+                break
+            payload = bytes(self.buffer[HEADER.size:HEADER.size + length])
+            del self.buffer[:HEADER.size + length]
+            try:
+                frames.append(json.loads(payload.decode('utf-8')))
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise ProtocolError(f"프레임 해석 실패: {e}")
+        return frames
@@ -0,0 +1,128 @@
+'''
+    release date: 2026-10-19
+        - 테스트/부하 측정용 RPI 경고 서버 대역
+        - framed 모드: lib/rpi_protocol.py 프레임에 ACK/PONG 응답
+        - raw 모드: 기존 RPI처럼 UTF-8 문자열만 수신
+    사용법:
+        python -m lib.rpi_standin_server --port 5000 [--raw] [--ack-delay 0.05] [--drop-rate 0.1]
+'''
+
+import argparse
+import random
+import socket
+import socketserver
+import threading
+import time
+
+from lib.rpi_protocol import (
+    encode_frame, FrameReader, ProtocolError,
+    TYPE_SIGNAL, TYPE_ACK, TYPE_PING, TYPE_PONG
+)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        peer = f"{self.client_address[0]}:{self.client_address[1]}"
+        print(f"🔌 [stand-in] 연결: {peer}")
+        server.connections += 1
+        reader = FrameReader()
+        self.request.settimeout(1.0)
+        try:
+            while not server.stopping.is_set():
+                try:
+                    data = self.request.recv(4096)
+                except socket.timeout:
+                    continue
+                if not data: break
+
+                if server.raw:
+                    server.record(data.decode('utf-8', errors='replace'))
+                    continue
+
+                for frame in reader.feed(data):
+                    self._handle_frame(frame)
+        except (ProtocolError, socket.error) as e:
+            print(f"⚠️ [stand-in] {peer} 연결 오류: {e}")
+        finally:
+            print(f"🔌 [stand-in] 연결 종료: {peer}")
+
+    def _handle_frame(self, frame):
+        server = self.server
+        f_type = frame.get('type')
+        if f_type == TYPE_PING:
+            if server.answer_heartbeat:
+                self.request.sendall(encode_frame(TYPE_PONG, frame.get('id'), echo_ts=frame.get('ts')))
+        elif f_type == TYPE_SIGNAL:
+            server.record(frame.get('msg'))
+            if random.random() < server.drop_rate:
+                return          # ACK 유실 시뮬레이션
+            if server.ack_delay:
+                time.sleep(server.ack_delay)
+            self.request.sendall(encode_frame(TYPE_ACK, frame.get('id')))
+
+
+class StandInRPIServer(socketserver.ThreadingTCPServer):
+    """
+    RPI 경고 장치 대역 서버. 수신한 신호는 received 목록에 (수신 시각, 메시지)로 남깁니다.
+
+    Args:
+        raw: True면 프레임 없이 문자열만 수신 (기존 RPIClient용)
+        ack_delay: ACK 응답 전 지연(초) - 느린 장치 시뮬레이션
+        drop_rate: ACK를 보내지 않을 확률 - 유실 시뮬레이션
+        answer_heartbeat: False면 PING에 응답하지 않음 - 링크 단절 시뮬레이션
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, raw=False, ack_delay=0.0, drop_rate=0.0, answer_heartbeat=True):
+        super().__init__((host, port), _Handler)
+        self.raw = raw
+        self.ack_delay = ack_delay
+        self.drop_rate = drop_rate
+        self.answer_heartbeat = answer_heartbeat
+        self.received = []
+        self.connections = 0
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record(self, message):
+        with self._lock:
+            self.received.append((time.time(), message))
+        print(f"💡 [stand-in] 신호 수신: {message}")
+
+    def start(self):
+        """백그라운드 스레드에서 서버를 실행합니다. (테스트 코드용)"""
+        self._thread = threading.Thread(target=self.serve_forever, name="StandInRPIServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--raw", action="store_true", help="프레임 없이 문자열 수신 (기존 RPI 방식)")
+    parser.add_argument("--ack-delay", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StandInRPIServer(args.host, args.port, raw=args.raw, ack_delay=args.ack_delay, drop_rate=args.drop_rate)
+    print(f"🚀 RPI 대역 서버 시작 ({args.host}:{server.port}, {'raw' if args.raw else 'framed'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"수신 신호 {len(server.received)}건, 연결 {server.connections}회")
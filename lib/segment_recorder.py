@@ -0,0 +1,234 @@
+'''
+    release date: 2026-10-19
+        - RTSP 원본 스트림 무재인코딩 녹화: ffmpeg -c copy로 고정 길이 .ts 세그먼트 저장 (CPU 거의 사용 안 함)
+        - 세그먼트 목록(segments_<시작시각>.csv)으로 시각 → 세그먼트 색인
+        - extract_clip: 지정 시각 구간을 재인코딩 없이 잘라 MP4로 저장 (위반 클립 / 감사 요청)
+        - ffmpeg가 종료되면 지수 백오프로 재시작
+    사용법:
+        python -m lib.segment_recorder record --rtsp rtsp://... --dir recorded_videos/segments/cam1
+        python -m lib.segment_recorder list --dir recorded_videos/segments/cam1
+        python -m lib.segment_recorder extract --dir recorded_videos/segments/cam1 \
+            --start "2026-10-19 13:05:00" --end "2026-10-19 13:06:30" --out audit.mp4
+'''
+
+import argparse
+import bisect
+import csv
+import glob
+import os
+import shutil
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+SEGMENT_PREFIX = 'seg_'
+SEGMENT_TIME_FORMAT = '%Y%m%d_%H%M%S'
+SEGMENT_EXT = '.ts'             # MPEG-TS: 비정상 종료에도 마지막 세그먼트까지 재생 가능, 이어 붙이기 쉬움
+LIST_PATTERN = 'segments_*.csv'
+DEFAULT_SEGMENT_SECONDS = 60
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+
+def get_segment_dir(farm_config):
+    return farm_config.get('segment_dir') or os.path.join('recorded_videos', 'segments', str(farm_config.get('camera_id')))
+
+
+def parse_segment_time(filename):
+    """seg_YYYYmmdd_HHMMSS.ts -> epoch 초 (형식이 다르면 None)"""
+    name = os.path.basename(filename)
+    if not name.startswith(SEGMENT_PREFIX): return None
+    try:
+        return datetime.strptime(os.path.splitext(name)[0][len(SEGMENT_PREFIX):], SEGMENT_TIME_FORMAT).timestamp()
+    except ValueError:
+        return None
+
+
+class SegmentRecorder:
+    """
+    ffmpeg 프로세스 하나가 카메라에 별도 연결해 세그먼트를 기록합니다.
+    파이프라인(process_video)의 프레임 루프와 독립적이라 검출이 멈춰도 녹화는 계속됩니다.
+    """
+    def __init__(self, rtsp_url, segment_dir, segment_seconds=DEFAULT_SEGMENT_SECONDS, ffmpeg_bin='ffmpeg'):
+        self.rtsp_url = rtsp_url
+        self.segment_dir = segment_dir
+        self.segment_seconds = segment_seconds
+        self.ffmpeg_bin = ffmpeg_bin
+        self.process = None
+        self.restarts = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _build_cmd(self):
+        run_stamp = datetime.now().strftime(SEGMENT_TIME_FORMAT)
+        return [
+            self.ffmpeg_bin, '-hide_banner', '-loglevel', 'error',
+            '-rtsp_transport', 'tcp', '-i', self.rtsp_url,
+            '-map', '0:v', '-map', '0:a?', '-c', 'copy',
+            '-f', 'segment', '-segment_time', str(self.segment_seconds), '-segment_format', 'mpegts',
+            '-segment_list', os.path.join(self.segment_dir, f'segments_{run_stamp}.csv'),
+            '-segment_list_type', 'csv', '-strftime', '1',
+            os.path.join(self.segment_dir, f'{SEGMENT_PREFIX}{SEGMENT_TIME_FORMAT}{SEGMENT_EXT}'),
+        ]
+
+    def start(self):
+        if not shutil.which(self.ffmpeg_bin):
+            print("⚠️ ffmpeg를 찾을 수 없어 원본 스트림 녹화를 시작하지 않습니다.")
+            return None
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="SegmentRecorder", daemon=True)
+        self._thread.start()
+        print(f"📼 원본 스트림 녹화 시작: {self.segment_dir} ({self.segment_seconds}초 세그먼트, 재인코딩 없음)")
+        return self
+
+    def _run(self):
+        failures = 0
+        while not self._stop_event.is_set():
+            started = time.time()
+            try:
+                self.process = subprocess.Popen(self._build_cmd(), stdin=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                _, err = self.process.communicate()
+            except OSError as e:
+                err = str(e).encode()
+            if self._stop_event.is_set(): break
+
+            # 정상적으로 한동안 녹화했다면 백오프 초기화
+            failures = 0 if time.time() - started > self.segment_seconds * 2 else failures + 1
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** failures))
+            self.restarts += 1
+            print(f"⚠️ 원본 녹화 ffmpeg 종료 ({(err or b'').decode(errors='ignore').strip()[-200:]}), {delay:.0f}초 후 재시작")
+            self._stop_event.wait(delay)
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        proc = self.process
+        if proc and proc.poll() is None:
+            proc.terminate()        # SIGTERM: 현재 세그먼트를 닫고 종료
+            try:
+                proc.wait(timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if self._thread: self._thread.join(timeout)
+        print("📼 원본 스트림 녹화 종료")
+
+
+class SegmentIndex:
+    """
+    세그먼트 목록 CSV(ffmpeg가 세그먼트를 닫을 때마다 갱신)를 읽어 (시작, 끝, 경로)를 시각순으로 보관합니다.
+    목록에 아직 없는 가장 최근 세그먼트는 녹화 중으로 보고 파일 수정 시각까지를 구간으로 봅니다.
+    """
+    def __init__(self, segment_dir):
+        self.segment_dir = segment_dir
+        self.starts = []
+        self.segments = []      # (start, end, path)
+        self.refresh()
+
+    def refresh(self):
+        closed = {}
+        for list_path in glob.glob(os.path.join(self.segment_dir, LIST_PATTERN)):
+            try:
+                with open(list_path, newline='') as f:
+                    for row in csv.reader(f):
+                        if len(row) < 3: continue
+                        start = parse_segment_time(row[0])
+                        if start is None: continue
+                        closed[row[0]] = (start, start + float(row[2]) - float(row[1]))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 세그먼트 목록 읽기 실패: {list_path} ({e})")
+
+        segments = []
+        for path in glob.glob(os.path.join(self.segment_dir, f'{SEGMENT_PREFIX}*{SEGMENT_EXT}')):
+            name = os.path.basename(path)
+            if name in closed:
+                start, end = closed[name]
+            else:
+                start = parse_segment_time(name)
+                if start is None: continue
+                try:
+                    end = os.path.getmtime(path)
+                except OSError:
+                    continue        # 보관 정책으로 방금 삭제됨
+            segments.append((start, end, path))
+        segments.sort()
+        self.segments = segments
+        self.starts = [s for s, _, _ in segments]
+        return self
+
+    def covered_until(self):
+        return self.segments[-1][1] if self.segments else 0.0
+
+    def find(self, start, end):
+        """[start, end]와 겹치는 세그먼트 목록 (시각순)"""
+        i = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        result = []
+        for seg in self.segments[i:]:
+            if seg[0] > end: break
+            if seg[1] >= start: result.append(seg)
+        return result
+
+
+def extract_clip(segment_dir, start, end, out_path, wait=5.0, ffmpeg_bin='ffmpeg'):
+    """
+    start~end(epoch 초) 구간을 재인코딩 없이 잘라 out_path(MP4)로 저장합니다.
+    끝 시각이 아직 기록되지 않았으면 최대 wait초 기다립니다. 성공 시 True.
+    -c copy이므로 시작점은 직전 키프레임으로 맞춰집니다. (카메라 GOP 만큼 앞당겨질 수 있음)
+    """
+    index = SegmentIndex(segment_dir)
+    deadline = time.time() + wait
+    while index.covered_until() < end and time.time() < deadline:
+        time.sleep(0.5)
+        index.refresh()
+
+    segments = index.find(start, end)
+    if not segments:
+        print(f"⚠️ 해당 시각의 원본 세그먼트가 없습니다: {datetime.fromtimestamp(start)} ~ {datetime.fromtimestamp(end)}")
+        return False
+
+    offset = max(start - segments[0][0], 0.0)
+    cmd = [
+        ffmpeg_bin, '-y', '-hide_banner', '-loglevel', 'error',
+        '-ss', f'{offset:.3f}', '-i', 'concat:' + '|'.join(path for _, _, path in segments),
+        '-t', f'{end - start:.3f}', '-map', '0', '-c', 'copy', '-movflags', '+faststart', out_path,
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=60)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"❌ 원본 구간 추출 실패: {e}")
+        return False
+    if result.returncode != 0 or not os.path.exists(out_path):
+        print(f"❌ 원본 구간 추출 실패 (code {result.returncode}): {result.stderr.decode(errors='ignore').strip()}")
+        return False
+    return True
+
+
+def _parse_time_arg(value):
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["record", "list", "extract"])
+    parser.add_argument("--dir", required=True, help="세그먼트 디렉터리")
+    parser.add_argument("--rtsp")
+    parser.add_argument("--segment-seconds", type=int, default=DEFAULT_SEGMENT_SECONDS)
+    parser.add_argument("--start", help="YYYY-mm-dd HH:MM:SS")
+    parser.add_argument("--end", help="YYYY-mm-dd HH:MM:SS")
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        if not args.rtsp: parser.error("record에는 --rtsp가 필요합니다.")
+        recorder = SegmentRecorder(args.rtsp, args.dir, args.segment_seconds).start()
+        try:
+            while recorder: time.sleep(1)
+        except KeyboardInterrupt:
+            recorder.stop()
+    elif args.command == "list":
+        for start, end, path in SegmentIndex(args.dir).segments:
+            print(f"{datetime.fromtimestamp(start)} ~ {datetime.fromtimestamp(end).time()} | {end - start:6.1f}s | {os.path.basename(path)}")
+    else:
+        if not (args.start and args.end and args.out): parser.error("extract에는 --start, --end, --out이 필요합니다.")
+        t0 = time.perf_counter()
+        if extract_clip(args.dir, _parse_time_arg(args.start), _parse_time_arg(args.end), args.out, wait=0):
+            print(f"✅ 저장: {args.out} ({time.perf_counter() - t0:.2f}s)")
@@ -0,0 +1,131 @@
+'''
+    release date: 2026-10-19
+        - 테스트용 SMTP 서버 대역 (평문, 인증은 형식만 확인)
+        - 수신한 메일은 messages 목록에 보관
+    사용법:
+        python -m lib.smtp_standin_server --port 2525 [--fail-every 3]
+        gmail_config.ini [smtp] host = 127.0.0.1, port = 2525, security = none
+'''
+
+import argparse
+import socketserver
+import threading
+import time
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode('utf-8'))
+
+    def handle(self):
+        server = self.server
+        server.sessions += 1
+        mail_from, rcpt_to = None, []
+        self._reply("220 stand-in ESMTP ready")
+
+        while True:
+            raw = self.rfile.readline()
+            if not raw: break
+            line = raw.decode('utf-8', errors='replace').rstrip("\r\n")
+            cmd = line[:4].upper()
+
+            if cmd in ("EHLO", "HELO"):
+                self.wfile.write(b"250-stand-in\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif cmd == "AUTH":
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].upper() == "LOGIN":
+                    self._reply("334 VXNlcm5hbWU6")      # Username:
+                    self.rfile.readline()
+                    self._reply("334 UGFzc3dvcmQ6")      # Password:
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self._reply("334 ")
+                    self.rfile.readline()
+                server.logins += 1
+                self._reply("235 Authentication successful")
+            elif cmd == "MAIL":
+                mail_from, rcpt_to = line.split(":", 1)[1].strip(), []
+                self._reply("250 OK")
+            elif cmd == "RCPT":
+                rcpt_to.append(line.split(":", 1)[1].strip())
+                self._reply("250 OK")
+            elif cmd == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"): break
+                    body.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                if server.should_fail():
+                    self._reply("451 Temporary failure (stand-in)")
+                else:
+                    server.store(mail_from, rcpt_to, b"".join(body))
+                    self._reply("250 OK queued")
+            elif cmd == "RSET":
+                mail_from, rcpt_to = None, []
+                self._reply("250 OK")
+            elif cmd == "NOOP":
+                self._reply("250 OK")
+            elif cmd == "QUIT":
+                self._reply("221 Bye")
+                break
+            else:
+                self._reply("502 Command not implemented")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Args:
+        fail_every: N번째 DATA마다 451 임시 오류를 응답 (재시도 동작 확인용, 0이면 사용 안 함)
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, fail_every=0):
+        super().__init__((host, port), _SMTPHandler)
+        self.fail_every = fail_every
+        self.messages = []          # (수신 시각, from, [to], 원문 bytes)
+        self.sessions = 0
+        self.logins = 0
+        self._data_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def should_fail(self):
+        with self._lock:
+            self._data_count += 1
+            return bool(self.fail_every) and self._data_count % self.fail_every == 0
+
+    def store(self, mail_from, rcpt_to, data):
+        with self._lock:
+            self.messages.append((time.time(), mail_from, list(rcpt_to), data))
+        print(f"📨 [stand-in] 메일 수신: {mail_from} -> {', '.join(rcpt_to)} ({len(data)} bytes)")
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="StandInSMTPServer", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StandInSMTPServer(args.host, args.port, args.fail_every)
+    print(f"🚀 SMTP 대역 서버 시작 ({args.host}:{server.port})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"수신 메일 {len(server.messages)}건, 세션 {server.sessions}회, 로그인 {server.logins}회")
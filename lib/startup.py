@@ -0,0 +1,96 @@
+'''
+    release date: 2026-10-19
+        - 시작 단계별 소요 시간 측정 (설정 / 모델 로드 / 저장소 인증 / 카운트 조회 / 스트림 연결 / 첫 프레임 / 첫 검출)
+        - 서로 독립적인 단계는 스레드로 동시에 실행 (run_parallel / background)
+'''
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, start=PROCESS_START):
+        self.start = start
+        self.phases = {}        # 이름 -> 소요 시간(초)
+        self.marks = {}         # 이름 -> 시작 후 경과 시간(초)
+        self._lock = threading.Lock()
+        self.futures = {}
+        self._executor = None
+        self._reported = False
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases[name] = seconds
+
+    def phase(self, name, func, *args, **kwargs):
+        """func를 실행하고 소요 시간을 기록합니다."""
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def run_parallel(self, tasks):
+        """{이름: 함수}를 동시에 실행하고 {이름: 결과}를 반환합니다. 예외는 그대로 전달합니다."""
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="startup") as pool:
+            futures = {name: pool.submit(self.phase, name, func) for name, func in tasks.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def background(self, name, func, *args, **kwargs):
+        """기다리지 않고 시작합니다. 결과가 필요한 쪽에서 future.result()로 대기합니다."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup-bg")
+        self.futures[name] = self._executor.submit(self.phase, name, func, *args, **kwargs)
+        return self.futures[name]
+
+    def wait(self, name):
+        """background 단계가 끝날 때까지 기다립니다. 실패했으면 None (오류는 호출자가 다시 시도하며 드러남)"""
+        future = self.futures.get(name)
+        if future is None: return None
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"❌ 시작 단계 [{name}] 실패: {e}")
+            return None
+
+    def mark(self, name):
+        """처음 한 번만 기록합니다. 새로 기록했으면 True."""
+        with self._lock:
+            if name in self.marks: return False
+            self.marks[name] = self.elapsed()
+            return True
+
+    def report(self):
+        """단계별 시간을 한 번 출력합니다."""
+        if self._reported: return
+        self._reported = True
+        with self._lock:
+            phases = " | ".join(f"{k} {v:.2f}s" for k, v in self.phases.items())
+            marks = " | ".join(f"{k} {v:.2f}s" for k, v in self.marks.items())
+        print(f"⏱️ 시작 단계: {phases}")
+        print(f"⏱️ 시작 후 경과: {marks}")
+
+    def wrap_tracker(self, tracker):
+        """첫 검출(tracker.update 완료) 시각을 기록하는 얇은 래퍼를 반환합니다."""
+        return _FirstDetectionProbe(tracker, self)
+
+
+class _FirstDetectionProbe:
+    def __init__(self, tracker, timer):
+        self._tracker = tracker
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._tracker, name)
+
+    def update(self, *args, **kwargs):
+        result = self._tracker.update(*args, **kwargs)
+        if self._timer.mark('first_detection'):
+            print(f"⏱️ 첫 검출까지 {self._timer.marks['first_detection']:.2f}s")
+        return result
@@ -0,0 +1,351 @@
+'''
+    release date: 2026-10-19
+        - 클립 저장소 인터페이스 분리 (put / share_link / list)
+        - Google Drive, 로컬/NAS 디렉토리, S3 호환 엔드포인트 구현
+        - 로컬 적재분 sync 시 위반 이력의 클립/미리보기 링크를 원격 저장소 링크로 교체
+'''
+
+import argparse
+import configparser
+import os
+import shutil
+import threading
+from datetime import datetime
+
+from lib.utils import find_or_create_folder, put_file_to_drive, get_drive_share_link
+
+DEFAULT_DRIVE_PARENT_FOLDER_ID = "0AE8IjXvFrukSUk9PVA"         # folder ID 개인 계정:     1ymI94ojlsHxDIi3OHFA13VYTVWNVImVK
+LINK_COLUMNS = ('snapshot_drive_link_addr', 'thumbnail_drive_link_addr', 'contact_sheet_drive_link_addr')
+
+
+class StorageBackend:
+    """
+    클립 저장소 공통 인터페이스.
+    key는 '<yymmdd>/<파일명>' 형태의 백엔드 내부 식별자입니다. (Drive는 파일 ID)
+    """
+    name = "base"
+
+    def put(self, local_path, folder_name=None):
+        """파일을 저장하고 key를 반환합니다. 실패 시 None."""
+        raise NotImplementedError
+
+    def share_link(self, key):
+        """리뷰어가 열람할 수 있는 링크를 반환합니다. 실패 시 None."""
+        raise NotImplementedError
+
+    def list(self, prefix=""):
+        """prefix(보통 날짜 폴더명)에 해당하는 파일명 목록을 반환합니다."""
+        raise NotImplementedError
+
+    def find(self, key):
+        """'<폴더>/<파일명>'으로 이미 저장된 파일의 key를 찾습니다. 없으면 None."""
+        folder_name, filename = key.split('/', 1)
+        return key if filename in self.list(folder_name) else None
+
+    def upload(self, local_path):
+        """put + share_link. 기존 upload_video_to_drive와 같은 반환값(공유 링크)을 갖습니다."""
+        key = self.put(local_path)
+        if not key:
+            return None
+        return self.share_link(key)
+
+
+class GoogleDriveStorage(StorageBackend):
+    name = "gdrive"
+
+    def __init__(self, drive_mgr, parent_folder_id=DEFAULT_DRIVE_PARENT_FOLDER_ID):
+        self.drive_mgr = drive_mgr
+        self.parent_folder_id = parent_folder_id
+        self.lock = threading.Lock()        # 업로드 스레드 간 토큰 갱신 경합 방지
+
+    def _get_drive(self):
+        with self.lock:
+            return self.drive_mgr.get_drive()
+
+    def put(self, local_path, folder_name=None):
+        gdrive = self._get_drive()
+        if not gdrive:
+            print(f"[FAIL] gdrive 객체가 유효하지 않아 업로드를 건너뜁니다: {local_path}")
+            return None
+        return put_file_to_drive(gdrive, local_path, self.parent_folder_id, folder_name)
+
+    def share_link(self, key):
+        gdrive = self._get_drive()
+        if not gdrive: return None
+        return get_drive_share_link(gdrive, key)
+
+    def list(self, prefix=""):
+        gdrive = self._get_drive()
+        if not gdrive: return []
+        folder_id = find_or_create_folder(gdrive, self.parent_folder_id, prefix) if prefix else self.parent_folder_id
+        if not folder_id: return []
+        try:
+            query = f"'{folder_id}' in parents and trashed=false"
+            files = gdrive.ListFile({'q': query, 'supportsAllDrives': True, 'includeItemsFromAllDrives': True}).GetList()
+            return sorted(f['title'] for f in files)
+        except Exception as e:
+            print(f"Drive 목록 조회 중 오류 발생: {e}")
+            return []
+
+    def find(self, key):
+        folder_name, filename = key.split('/', 1)
+        gdrive = self._get_drive()
+        if not gdrive: return None
+        folder_id = find_or_create_folder(gdrive, self.parent_folder_id, folder_name)
+        if not folder_id: return None
+        try:
+            query = f"'{folder_id}' in parents and title='{filename}' and trashed=false"
+            files = gdrive.ListFile({'q': query, 'supportsAllDrives': True, 'includeItemsFromAllDrives': True}).GetList()
+            return files[0]['id'] if files else None
+        except Exception as e:
+            print(f"Drive 파일 조회 중 오류 발생: {e}")
+            return None
+
+
+class LocalStorage(StorageBackend):
+    """
+    로컬 디스크 또는 NAS 마운트 디렉토리.
+    업로드 회선이 느린 현장은 여기에 먼저 적재한 뒤 sync()로 원격 저장소에 옮깁니다.
+    """
+    name = "local"
+
+    def __init__(self, root_dir, base_url=None):
+        self.root_dir = os.path.abspath(root_dir)
+        self.base_url = base_url.rstrip('/') if base_url else None
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def put(self, local_path, folder_name=None):
+        if not os.path.exists(local_path):
+            print(f"오류: 파일 '{local_path}'을 찾을 수 없습니다.")
+            return None
+        folder_name = folder_name or datetime.now().strftime("%y%m%d")
+        key = f"{folder_name}/{os.path.basename(local_path)}"
+        try:
+            dst = os.path.join(self.root_dir, folder_name)
+            os.makedirs(dst, exist_ok=True)
+            shutil.copy2(local_path, os.path.join(dst, os.path.basename(local_path)))
+            print(f"파일 '{os.path.basename(local_path)}'이 로컬 저장소에 저장되었습니다. ({key})")
+            return key
+        except OSError as e:
+            print(f"로컬 저장 중 오류 발생: {e}")
+            return None
+
+    def share_link(self, key):
+        if self.base_url:
+            return f"{self.base_url}/{key}"
+        return "file://" + os.path.join(self.root_dir, key)
+
+    def list(self, prefix=""):
+        target = os.path.join(self.root_dir, prefix) if prefix else self.root_dir
+        if not os.path.isdir(target): return []
+        if prefix:
+            return sorted(f for f in os.listdir(target) if os.path.isfile(os.path.join(target, f)))
+        return sorted(
+            f"{d}/{f}" for d in os.listdir(target) if os.path.isdir(os.path.join(target, d))
+            for f in os.listdir(os.path.join(target, d))
+        )
+
+    def sync(self, target, prefix="", db_conn=None):
+        """
+        target 저장소에 없는 파일을 올립니다. 반환값: 업로드한 파일 수
+        db_conn이 있으면 아직 로컬 링크를 가리키는 위반 이력 행의 링크를 target 링크로 바꿉니다.
+        (이미 올라가 있지만 링크가 바뀌지 않은 파일도 다시 찾아 교체)
+        """
+        uploaded = 0
+        keys = [f"{prefix}/{f}" for f in self.list(prefix)] if prefix else self.list()
+        stale = find_linked(db_conn, self.share_link("")) if db_conn else set()
+        relinks = {}
+        existing = {}
+        for key in keys:
+            folder_name, filename = key.split('/', 1)
+            if folder_name not in existing:
+                existing[folder_name] = set(target.list(folder_name))
+            local_link = self.share_link(key)
+            if filename in existing[folder_name]:
+                target_key = target.find(key) if local_link in stale else None
+            else:
+                target_key = target.put(os.path.join(self.root_dir, key), folder_name)
+                if target_key: uploaded += 1
+            if target_key and local_link in stale:
+                new_link = target.share_link(target_key)
+                if new_link: relinks[local_link] = new_link
+        print(f"🔁 동기화 완료: {uploaded}건 업로드 ({self.name} → {target.name})")
+        if db_conn and relinks:
+            relink_violations(db_conn, relinks)
+        return uploaded
+
+
+def find_linked(db_conn, link_prefix):
+    """link_prefix로 시작하는 위반 이력 링크(클립/미리보기)를 모두 반환합니다."""
+    links = set()
+    try:
+        with db_conn.cursor() as cursor:
+            for column in LINK_COLUMNS:
+                cursor.execute(
+                    f"SELECT DISTINCT {column} AS link FROM dc_biosec_violation_hist WHERE {column} LIKE %s",
+                    (link_prefix.replace('%', r'\%').replace('_', r'\_') + '%',)
+                )
+                links.update(row['link'] for row in cursor.fetchall())
+    except Exception as e:
+        print(f"❌ 위반 이력 링크 조회 실패: {e}")
+    return links
+
+
+def relink_violations(db_conn, relinks):
+    """{이전 링크: 새 링크}로 위반 이력의 링크 컬럼을 교체합니다. 반환값: 변경된 행 수"""
+    updated = 0
+    try:
+        with db_conn.cursor() as cursor:
+            for old_link, new_link in relinks.items():
+                for column in LINK_COLUMNS:
+                    cursor.execute(
+                        f"UPDATE dc_biosec_violation_hist SET {column} = %s WHERE {column} = %s",
+                        (new_link, old_link)
+                    )
+                    updated += cursor.rowcount
+        db_conn.commit()
+        print(f"🔗 위반 이력 링크 교체: {len(relinks)}개 파일, {updated}건")
+    except Exception as e:
+        db_conn.rollback()
+        print(f"❌ 위반 이력 링크 교체 실패 (다음 동기화 때 다시 시도): {e}")
+    return updated
+
+
+class S3Storage(StorageBackend):
+    """S3 호환 엔드포인트 (AWS S3, MinIO, NAS 내장 S3 등). boto3 필요."""
+    name = "s3"
+
+    def __init__(self, bucket, endpoint_url=None, access_key=None, secret_key=None,
+                 region=None, prefix="", public_base_url=None, link_expiry=7 * 24 * 3600):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("S3 저장소를 사용하려면 boto3 패키지가 필요합니다. (pip install boto3)")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.public_base_url = public_base_url.rstrip('/') if public_base_url else None
+        self.link_expiry = link_expiry
+        self.client = boto3.client(
+            's3', endpoint_url=endpoint_url, region_name=region,
+            aws_access_key_id=access_key, aws_secret_access_key=secret_key
+        )
+
+    def _object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, local_path, folder_name=None):
+        if not os.path.exists(local_path):
+            print(f"오류: 파일 '{local_path}'을 찾을 수 없습니다.")
+            return None
+        folder_name = folder_name or datetime.now().strftime("%y%m%d")
+        key = f"{folder_name}/{os.path.basename(local_path)}"
+        try:
+            self.client.upload_file(local_path, self.bucket, self._object_key(key))
+            print(f"파일 '{os.path.basename(local_path)}'이 S3({self.bucket})에 업로드되었습니다. ({key})")
+            return key
+        except Exception as e:
+            print(f"S3 업로드 중 오류 발생: {e}")
+            return None
+
+    def share_link(self, key):
+        if self.public_base_url:
+            return f"{self.public_base_url}/{self._object_key(key)}"
+        try:
+            return self.client.generate_presigned_url(
+                'get_object', Params={'Bucket': self.bucket, 'Key': self._object_key(key)},
+                ExpiresIn=self.link_expiry
+            )
+        except Exception as e:
+            print(f"S3 링크 생성 중 오류 발생: {e}")
+            return None
+
+    def list(self, prefix=""):
+        base = self._object_key(prefix) if prefix else self.prefix
+        names = []
+        try:
+            paginator = self.client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{base}/" if base else ""):
+                for obj in page.get('Contents', []):
+                    names.append(obj['Key'][len(base) + 1:] if base else obj['Key'])
+        except Exception as e:
+            print(f"S3 목록 조회 중 오류 발생: {e}")
+        return sorted(names)
+
+
+def create_storage_backend(config, drive_mgr=None, prefix="storage"):
+    """
+    설정(dict)으로 저장소를 생성합니다. 키 이름은 '<prefix>_type' 형태입니다.
+        storage_type            : gdrive(기본) | local | s3 | none
+        storage_drive_folder_id : Drive 상위 폴더 ID
+        storage_local_dir       : 로컬/NAS 경로
+        storage_base_url        : 로컬 저장소를 웹으로 공개하는 경우 링크 prefix
+        storage_s3_*            : bucket, endpoint, access_key, secret_key, region, prefix, public_url
+    """
+    def get(key, default=None):
+        return config.get(f"{prefix}_{key}") or default
+
+    s_type = get('type', 'gdrive').lower()
+    farm_code = config.get('farm_code')
+
+    if s_type == 'gdrive':
+        if drive_mgr is None:
+            from lib.service_manager import DriveManager
+            drive_mgr = DriveManager()
+        print(f"☁️ [{farm_code}] 클립 저장소: Google Drive")
+        return GoogleDriveStorage(drive_mgr, get('drive_folder_id', DEFAULT_DRIVE_PARENT_FOLDER_ID))
+
+    elif s_type == 'local':
+        root_dir = get('local_dir', './stored_clips')
+        print(f"📁 [{farm_code}] 클립 저장소: 로컬 디렉토리 ({root_dir})")
+        return LocalStorage(root_dir, get('base_url'))
+
+    elif s_type == 's3':
+        bucket = get('s3_bucket')
+        if not bucket:
+            print("❌ S3 설정 오류: storage_s3_bucket 누락")
+            return None
+        print(f"🪣 [{farm_code}] 클립 저장소: S3 ({get('s3_endpoint', 'aws')}/{bucket})")
+        return S3Storage(
+            bucket, endpoint_url=get('s3_endpoint'), access_key=get('s3_access_key'),
+            secret_key=get('s3_secret_key'), region=get('s3_region'), prefix=get('s3_prefix', ''),
+            public_base_url=get('s3_public_url')
+        )
+
+    print(f"🚫 [{farm_code}] 클립 저장소 미사용")
+    return None
+
+
+if __name__ == "__main__":
+    # 로컬(NAS)에 적재된 클립을 원격 저장소로 동기화
+    #   python -m lib.storage_backend --farm-name FARM_A [--date 251120] [--no-relink]
+    #   동기화 대상은 sync_type / sync_* 키로 지정합니다. (storage_* 와 같은 형식)
+    #   DB에 기록된 로컬 링크는 원격 저장소 링크로 교체합니다. (--db-config)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="./lib/farm_config.ini")
+    parser.add_argument("--farm-name", required=True)
+    parser.add_argument("--date", default="", help="yymmdd (미지정 시 전체)")
+    parser.add_argument("--db-config", default="./lib/db_info_config.ini")
+    parser.add_argument("--no-relink", action="store_true", help="DB 링크를 교체하지 않고 파일만 동기화")
+    args = parser.parse_args()
+
+    cfg = configparser.ConfigParser()
+    cfg.read(args.config, encoding='utf-8')
+    section = dict(cfg[args.farm_name])
+
+    source = create_storage_backend(section)
+    if not isinstance(source, LocalStorage):
+        print("❌ storage_type이 local인 농장만 동기화할 수 있습니다.")
+    else:
+        target = create_storage_backend(section, prefix="sync")
+        if target:
+            conn = None
+            if not args.no_relink:
+                from lib.service_manager import get_database_service
+                conn = get_database_service(args.db_config)
+                if conn is None:
+                    print("⚠️ DB 연결 실패: 파일만 동기화하고 링크는 다음 동기화 때 교체합니다.")
+            try:
+                source.sync(target, args.date, db_conn=conn)
+            finally:
+                if conn: conn.close()
@@ -0,0 +1,86 @@
+'''
+    release date: 2026-10-19
+        - 위반 이벤트 키프레임 JPEG / 컨택트 시트(다중 프레임 요약 이미지) 생성
+'''
+
+import os
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+KEY_FRAME_WIDTH = 480
+SHEET_TILE_WIDTH = 240
+SHEET_TILES = 6
+SHEET_COLS = 3
+JPEG_QUALITY = 80
+
+
+def find_key_index(frame_times, event_time):
+    """이벤트(라인 통과) 시각에 가장 가까운 프레임 인덱스"""
+    if not frame_times: return 0
+    return min(range(len(frame_times)), key=lambda i: abs(frame_times[i] - event_time))
+
+
+def _resize_to_width(frame, width):
+    h, w = frame.shape[:2]
+    if w <= width: return frame
+    return cv2.resize(frame, (width, int(h * width / w)), interpolation=cv2.INTER_AREA)
+
+
+def _write_jpeg(path, image):
+    ok = cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    return path if ok else None
+
+
+def save_key_frame(frame, out_path, width=KEY_FRAME_WIDTH):
+    return _write_jpeg(out_path, _resize_to_width(frame, width))
+
+
+def save_contact_sheet(frames, frame_times, key_index, out_path,
+                       tiles=SHEET_TILES, cols=SHEET_COLS, tile_width=SHEET_TILE_WIDTH):
+    """
+    이벤트 이전 버퍼(0 ~ key_index)에서 균등 간격으로 프레임을 골라 격자로 배치합니다.
+    마지막 칸이 라인 통과 시점이며, 각 칸에 이벤트 기준 상대 시간(-2.0s 등)을 표시합니다.
+    """
+    if not frames: return None
+    key_index = max(0, min(key_index, len(frames) - 1))
+    count = min(tiles, key_index + 1)
+    if count == 1:
+        picks = [key_index]
+    else:
+        picks = [round(i * key_index / (count - 1)) for i in range(count)]
+
+    tile_list = []
+    for idx in picks:
+        tile = _resize_to_width(frames[idx], tile_width).copy()
+        if frame_times:
+            label = f"{frame_times[idx] - frame_times[key_index]:+.1f}s"
+            cv2.putText(tile, label, (6, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+        tile_list.append(tile)
+
+    tile_h, tile_w = tile_list[0].shape[:2]
+    rows = (len(tile_list) + cols - 1) // cols
+    sheet = np.zeros((rows * tile_h, min(cols, len(tile_list)) * tile_w, 3), dtype=np.uint8)
+    for i, tile in enumerate(tile_list):
+        r, c = divmod(i, cols)
+        sheet[r * tile_h:r * tile_h + tile.shape[0], c * tile_w:c * tile_w + tile.shape[1]] = tile
+    return _write_jpeg(out_path, sheet)
+
+
+def create_violation_previews(frames, frame_times, event_time, clip_path):
+    """
+    클립과 같은 이름으로 '<이름>_key.jpg', '<이름>_sheet.jpg'를 생성합니다.
+    반환값: {'thumbnail': 경로 또는 None, 'contact_sheet': 경로 또는 None}
+    """
+    base = os.path.splitext(clip_path)[0]
+    key_index = find_key_index(frame_times, event_time)
+    previews = {'thumbnail': None, 'contact_sheet': None}
+    try:
+        previews['thumbnail'] = save_key_frame(frames[key_index], f"{base}_key.jpg")
+        previews['contact_sheet'] = save_contact_sheet(frames, frame_times, key_index, f"{base}_sheet.jpg")
+        print(f"🖼️ 미리보기 생성: 키프레임 #{key_index} "
+              f"({datetime.fromtimestamp(event_time).strftime('%H:%M:%S')})")
+    except Exception as e:
+        print(f"⚠️ 미리보기 이미지 생성 중 오류 발생: {e}")
+    return previews
@@ -0,0 +1,262 @@
+'''
+    release date: 2026-10-19
+        - 검출(YOLO predict)과 추적(ID 부여)을 분리
+        - BuiltinTracker: ByteTrack 방식 2단계 매칭 (고/저 신뢰도), 벡터화 IoU + 선형 할당
+          고정 천장 카메라 기준이라 칼만 필터/전역 움직임 보정 없이 등속 예측만 사용
+        - UltralyticsTracker: 기존 model.track() + lib/tracker_custom.yaml
+        - 농장 설정 tracker = ultralytics(기본) | builtin
+        - update(frame, imgsz): QoS 단계별 추론 해상도 지정 (None이면 모델 기본값)
+'''
+
+import os
+import numpy as np
+
+_linear_sum_assignment = False     # 첫 사용 시 import (시작 시간 단축), 없으면 None
+
+
+def _get_linear_sum_assignment():
+    global _linear_sum_assignment
+    if _linear_sum_assignment is False:
+        try:
+            from scipy.optimize import linear_sum_assignment
+            _linear_sum_assignment = linear_sum_assignment
+        except ImportError:         # scipy가 없으면 탐욕(greedy) 매칭으로 대체
+            _linear_sum_assignment = None
+    return _linear_sum_assignment
+
+TRACKER_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tracker_custom.yaml')
+
+
+class TrackedBox:
+    """process_video가 사용하는 추적 결과 1건 (트래커 종류와 무관한 공통 형식)"""
+    __slots__ = ('track_id', 'cls', 'conf', 'xyxy')
+
+    def __init__(self, track_id, cls, conf, xyxy):
+        self.track_id = track_id
+        self.cls = cls
+        self.conf = conf
+        self.xyxy = xyxy        # (x1, y1, x2, y2) int
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """(N,4) x (M,4) xyxy 박스의 IoU 행렬 (N,M)"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def linear_assignment(cost, max_cost):
+    """
+    비용 행렬에서 max_cost 이하인 쌍을 1:1로 매칭합니다.
+    반환값: (matches [(row, col)], 미매칭 row 목록, 미매칭 col 목록)
+    """
+    n_rows, n_cols = cost.shape
+    if n_rows == 0 or n_cols == 0:
+        return [], list(range(n_rows)), list(range(n_cols))
+
+    linear_sum_assignment = _get_linear_sum_assignment()
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(cost)
+        pairs = [(r, c) for r, c in zip(rows, cols) if cost[r, c] <= max_cost]
+    else:
+        pairs = []
+        used_r, used_c = set(), set()
+        for idx in np.argsort(cost, axis=None):
+            r, c = divmod(int(idx), n_cols)
+            if cost[r, c] > max_cost: break
+            if r in used_r or c in used_c: continue
+            pairs.append((r, c)); used_r.add(r); used_c.add(c)
+
+    matched_r = {r for r, _ in pairs}
+    matched_c = {c for _, c in pairs}
+    return (pairs, [r for r in range(n_rows) if r not in matched_r],
+            [c for c in range(n_cols) if c not in matched_c])
+
+
+class _Track:
+    __slots__ = ('track_id', 'box', 'velocity', 'cls', 'score', 'hits', 'last_frame')
+
+    def __init__(self, track_id, box, cls, score, frame_id):
+        self.track_id = track_id
+        self.box = box.astype(np.float32)
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.cls = cls
+        self.score = score
+        self.hits = 1
+        self.last_frame = frame_id
+
+    def predict(self, frame_id):
+        return self.box + self.velocity * (frame_id - self.last_frame)
+
+    def update(self, box, score, frame_id):
+        gap = max(frame_id - self.last_frame, 1)
+        # 등속 모델: 관측 이동량을 지수 평활해 다음 위치를 예측
+        self.velocity = 0.6 * self.velocity + 0.4 * (box - self.box) / gap
+        self.box = box.astype(np.float32)
+        self.score = score
+        self.hits += 1
+        self.last_frame = frame_id
+
+
+class ByteTracker:
+    """
+    ByteTrack 방식 연관:
+      1) 고신뢰 검출 ↔ 전체 트랙 (IoU)
+      2) 남은 트랙 ↔ 저신뢰 검출 (가려짐/흐림 구간 유지)
+      3) 매칭되지 않은 고신뢰 검출 중 new_track_thresh 이상만 새 트랙
+    클래스가 다른 트랙/검출은 매칭하지 않습니다. (돼지 ↔ 작업자 ID 교차 방지)
+    """
+    def __init__(self, high_thresh=0.5, low_thresh=0.1, new_track_thresh=0.6,
+                 match_thresh=0.8, track_buffer=30):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.new_track_thresh = new_track_thresh
+        self.match_thresh = match_thresh        # 1 - IoU 비용 상한
+        self.track_buffer = track_buffer        # 미검출 트랙 유지 프레임 수
+        self.tracks = []
+        self.frame_id = 0
+        self.next_id = 1
+
+    def reset(self):
+        self.tracks = []
+        self.frame_id = 0
+
+    def _cost(self, tracks, boxes, classes):
+        if not tracks or len(boxes) == 0:
+            return np.ones((len(tracks), len(boxes)), dtype=np.float32)
+        predicted = np.stack([t.predict(self.frame_id) for t in tracks])
+        cost = 1.0 - iou_matrix(predicted, boxes)
+        track_cls = np.array([t.cls for t in tracks])
+        cost[track_cls[:, None] != classes[None, :]] = 1.0
+        return cost
+
+    def update(self, boxes, scores, classes):
+        """
+        boxes: (N,4) xyxy, scores: (N,), classes: (N,)
+        반환값: 이번 프레임에 매칭/생성된 트랙 [(track_id, cls, score, box), ...]
+        """
+        self.frame_id += 1
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        classes = np.asarray(classes).reshape(-1).astype(int)
+
+        high = scores >= self.high_thresh
+        low = (scores >= self.low_thresh) & ~high
+        hi_idx, lo_idx = np.where(high)[0], np.where(low)[0]
+        output = []
+
+        # 1단계: 고신뢰 검출
+        pairs, unmatched_t, unmatched_hi = linear_assignment(
+            self._cost(self.tracks, boxes[hi_idx], classes[hi_idx]), self.match_thresh)
+        for t, d in pairs:
+            det = hi_idx[d]
+            self.tracks[t].update(boxes[det], float(scores[det]), self.frame_id)
+            output.append(self.tracks[t])
+
+        # 2단계: 남은 트랙 ↔ 저신뢰 검출 (조금 더 엄격한 IoU 0.5)
+        remaining = [self.tracks[t] for t in unmatched_t]
+        pairs, _, _ = linear_assignment(self._cost(remaining, boxes[lo_idx], classes[lo_idx]), 0.5)
+        for t, d in pairs:
+            det = lo_idx[d]
+            remaining[t].update(boxes[det], float(scores[det]), self.frame_id)
+            output.append(remaining[t])
+
+        # 3단계: 새 트랙
+        for d in unmatched_hi:
+            det = hi_idx[d]
+            if scores[det] < self.new_track_thresh: continue
+            track = _Track(self.next_id, boxes[det], int(classes[det]), float(scores[det]), self.frame_id)
+            self.next_id += 1
+            self.tracks.append(track)
+            output.append(track)
+
+        self.tracks = [t for t in self.tracks if self.frame_id - t.last_frame <= self.track_buffer]
+        return [(t.track_id, t.cls, t.score, t.box.copy()) for t in output]
+
+
+def _to_tracked_boxes(items):
+    result = []
+    for track_id, cls, conf, box in items:
+        x1, y1, x2, y2 = map(int, box)
+        result.append(TrackedBox(int(track_id), int(cls), float(conf), (x1, y1, x2, y2)))
+    return result
+
+
+class UltralyticsTracker:
+    """기존 방식: model.track(persist=True). tracker_custom.yaml 설정을 사용합니다."""
+    name = "ultralytics"
+
+    def __init__(self, model, tracker_config=TRACKER_CONFIG_PATH):
+        self.model = model
+        self.names = model.names
+        self.tracker_config = tracker_config
+
+    def reset(self):
+        """모델에 붙어 있는 persist 추적 상태를 비웁니다. (다른 영상/스트림을 처음부터 처리할 때)"""
+        predictor = getattr(self.model, 'predictor', None)
+        for tracker in getattr(predictor, 'trackers', None) or []:
+            tracker.reset()
+
+    def update(self, frame, imgsz=None):
+        kwargs = {'imgsz': imgsz} if imgsz else {}
+        results = self.model.track(frame, persist=True, verbose=False, tracker=self.tracker_config, **kwargs)[0]
+        items = []
+        for box in results.boxes:
+            if box.id is None: continue
+            items.append((box.id.item(), box.cls.item(), box.conf.item(), box.xyxy[0].cpu().numpy()))
+        return _to_tracked_boxes(items)
+
+
+class BuiltinTracker:
+    """model.predict()로 검출만 수행하고 ID는 ByteTracker가 부여합니다."""
+    name = "builtin"
+
+    def __init__(self, model, **params):
+        self.model = model
+        self.names = model.names
+        self.tracker = ByteTracker(**params)
+
+    def reset(self):
+        self.tracker.reset()
+
+    def update(self, frame, imgsz=None):
+        kwargs = {'imgsz': imgsz} if imgsz else {}
+        results = self.model.predict(frame, verbose=False, conf=self.tracker.low_thresh, **kwargs)[0]
+        boxes = results.boxes
+        if len(boxes) == 0:
+            return _to_tracked_boxes(self.tracker.update(np.zeros((0, 4)), [], []))
+        return _to_tracked_boxes(self.tracker.update(
+            boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy()
+        ))
+
+
+def create_tracker(model, farm_config):
+    """농장 설정 tracker 값에 따라 트래커를 생성합니다. (기본 ultralytics)"""
+    kind = (farm_config.get('tracker') or 'ultralytics').lower()
+    if kind == 'builtin':
+        def _get(key, default):
+            try:
+                return type(default)(farm_config.get(key) or default)
+            except (ValueError, TypeError):
+                print(f"⚠️ [{key}] 설정값 오류('{farm_config.get(key)}'). 기본값 {default}을 사용합니다.")
+                return default
+        params = {
+            'high_thresh': _get('track_high_thresh', 0.5),
+            'low_thresh': _get('track_low_thresh', 0.1),
+            'new_track_thresh': _get('track_new_thresh', 0.6),
+            'match_thresh': _get('track_match_thresh', 0.8),
+            'track_buffer': _get('track_buffer', 30),
+        }
+        print(f"🧭 [{farm_config.get('farm_code')}] 추적기: builtin {params}")
+        return BuiltinTracker(model, **params)
+
+    tracker_config = farm_config.get('tracker_config') or TRACKER_CONFIG_PATH
+    print(f"🧭 [{farm_config.get('farm_code')}] 추적기: ultralytics ({tracker_config})")
+    return UltralyticsTracker(model, tracker_config)
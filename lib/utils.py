@@ -1,13 +1,28 @@
 '''
     release date: 2025-06-09
+    release date: 2026-10-19
+        - 위반 기록 INSERT를 ViolationDBWriter(lib/db_writer.py) 큐로 일괄 처리
+        - 업로드 대상을 StorageBackend(lib/storage_backend.py)로 일반화
+        - 클립 인코딩을 ffmpeg H.264(lib/clip_encoder.py)로 변경하고 업로드 스레드로 이동
+        - 위반별 키프레임/컨택트 시트(lib/thumbnail.py)를 클립과 함께 업로드
+        - 인코딩~DB 커밋 중인 클립 표시 (RetentionManager가 삭제하지 않음)
+        - clip_source = segments면 원본 세그먼트에서 재인코딩 없이 클립 추출 (실패 시 프레임 인코딩)
+        - 업로드/DB 기록에 실패한 클립은 <클립명>.unsent 표시 파일을 남겨 삭제 대상에서 제외하고, 다음 시작 시 재전송
+        - 미전송 클립은 실행 중에도 백오프 간격으로 재전송, 최대 횟수를 넘기면 보류 디렉터리(dead letter)로 이동
 '''
 import cv2
+import json
 import numpy as np
 import os
+import shutil
 import threading
+import time
 from datetime import datetime, timedelta
 import pymysql
 
+from lib.clip_encoder import create_video_writer, format_encode_stats
+from lib.thumbnail import create_violation_previews
+
 def find_or_create_folder(gdrive, parent_folder_id, folder_name):
     """Google Drive에서 폴더를 찾거나 생성하며, 예외 발생 시 None을 반환합니다."""
     try:
@@ -44,13 +59,13 @@ def find_or_create_folder(gdrive, parent_folder_id, folder_name):
         print(f"폴더 처리 중 오류 발생: {e}")
         return None
 
-def upload_video_to_drive(gdrive, file_path, parent_folder_id=None):
+def put_file_to_drive(gdrive, file_path, parent_folder_id=None, folder_name=None):
+    """날짜 폴더(yymmdd)에 파일을 업로드하고 파일 ID를 반환합니다. 실패 시 None."""
     if not os.path.exists(file_path):
         print(f"오류: 파일 '{file_path}'을 찾을 수 없습니다.")
         return None
 
-    now = datetime.now()
-    date_folder_name = now.strftime("%y%m%d")
+    date_folder_name = folder_name or datetime.now().strftime("%y%m%d")
 
     target_folder_id = find_or_create_folder(gdrive, parent_folder_id, date_folder_name)
 
@@ -68,37 +83,50 @@ def upload_video_to_drive(gdrive, file_path, parent_folder_id=None):
         # file.Upload()
         file.Upload({'supportsAllDrives': True})
         print(f"파일 '{title}'이 '{date_folder_name}' 폴더에 업로드되었습니다. (ID: {file['id']})")
+        return file['id']
+    except Exception as e:
+        print(f"파일 업로드 중 오류 발생: {e}")
+        return None
 
-
+def get_drive_share_link(gdrive, file_id):
+    """'링크가 있는 모든 사용자' 읽기 권한을 부여하고 공유 링크를 반환합니다."""
+    try:
         permission_body = {'type': 'anyone', 'role': 'reader'}
         gdrive.auth.service.permissions().insert(
-            fileId=file['id'],
+            fileId=file_id,
             body=permission_body,
             supportsAllDrives=True
         ).execute()
         
         updated_file_info = gdrive.auth.service.files().get(
-            fileId=file['id'],
+            fileId=file_id,
             fields='alternateLink', # 필요한 필드만 요청 (공유 링크)
             supportsAllDrives=True
         ).execute()
-        share_url = updated_file_info.get('alternateLink')
-        
-        # file.InsertPermission({
-        #     'type': 'anyone',  # '링크가 있는 모든 사용자'
-        #     'role': 'reader'   # '뷰어' (읽기) 권한
-        # })
-                
-        # file.FetchMetadata(fetch_all=True)  # 전체 메타데이터를 다시 가져옵니다.
-        # share_url = file['alternateLink']
-        return share_url
+        return updated_file_info.get('alternateLink')
     except Exception as e:
-        print(f"파일 업로드 중 오류 발생: {e}")
+        print(f"공유 링크 생성 중 오류 발생: {e}")
+        return None
+
+def upload_video_to_drive(gdrive, file_path, parent_folder_id=None):
+    file_id = put_file_to_drive(gdrive, file_path, parent_folder_id)
+    if not file_id:
         return None
+    return get_drive_share_link(gdrive, file_id)
 
 
 #   ---   위반 내역 DB 기록  ---
-def insert_violation_to_db(db_conn, event_dttm, div_cd, start_dttm, end_dttm, file_nm, link_addr):
+VIOLATION_INSERT_SQL = """
+        INSERT INTO dc_biosec_violation_hist
+        (event_dttm, detection_target_div_cd, record_start_dttm, record_end_dttm,
+         snapshot_file_nm, snapshot_drive_link_addr,
+         thumbnail_drive_link_addr, contact_sheet_drive_link_addr,
+         farm_div_cd, camera_id, reg_dttm)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+    """
+
+def insert_violation_to_db(db_conn, event_dttm, div_cd, start_dttm, end_dttm, file_nm, link_addr,
+                           thumbnail_link=None, contact_sheet_link=None, farm_cd=None, camera_id=None):
     """데이터베이스에 위반 기록을 삽입하고, 실패 시 에러 로그를 파일로 저장합니다."""
     if not db_conn or not db_conn.open: # 연결이 없거나 닫힌 경우 확인
         print("❌ DB 연결이 유효하지 않아 저장을 건너뜁니다.")
@@ -115,13 +143,9 @@ def insert_violation_to_db(db_conn, event_dttm, div_cd, start_dttm, end_dttm, fi
         print(f"📄 DB 연결 오류 로그가 '{error_log_filename}' 파일에 저장되었습니다.")
         return False
 
-    sql = """
-        INSERT INTO dc_biosec_violation_hist
-        (event_dttm, detection_target_div_cd, record_start_dttm, record_end_dttm,
-         snapshot_file_nm, snapshot_drive_link_addr, reg_dttm)
-        VALUES (%s, %s, %s, %s, %s, %s, NOW())
-    """
-    values = (event_dttm, div_cd, start_dttm, end_dttm, file_nm, link_addr)
+    sql = VIOLATION_INSERT_SQL
+    values = (event_dttm, div_cd, start_dttm, end_dttm, file_nm, link_addr, thumbnail_link, contact_sheet_link,
+              farm_cd, camera_id)
     cursor = None
     try:
         cursor = db_conn.cursor()
@@ -188,20 +212,50 @@ def insert_violation_to_db(db_conn, event_dttm, div_cd, start_dttm, end_dttm, fi
             except Exception as cur_close_err:
                 print(f"⚠️ 커서 닫기 중 오류: {cur_close_err}")
 
-def upload_and_cleanup(gdrive, file_path, db_config, parent_folder_id, start_time, event_counter):
+def get_detection_div_cd(event_counter):
+    """이벤트 카운터로 detection_target_div_cd 값을 결정합니다."""
+    people = event_counter.get("worker", 0)
+    pig = event_counter.get("pig", 0)
+
+    if people > 0 and pig > 0:
+        return 0 # 복합
+    elif people > 0:
+        return 1 # 사람
+    elif pig > 0:
+        return 2 # 돼지
+    return 9 # 알 수 없음
+
+def cleanup_local_clip(file_path, db_success, extra_paths=()):
+    """DB 커밋 결과에 따라 로컬 클립(및 미리보기 이미지)을 삭제하거나 유지합니다."""
+    if not db_success:
+        print(f"⚠️ DB 저장 실패로 로컬 파일 유지: {file_path}")
+        return
+    if os.path.exists(file_path):
+        os.remove(file_path)
+        print(f"🗑️ 업로드 후 로컬 클립 삭제 완료: {file_path}")
+        clear_unsent_clip(file_path)
+    else:
+        print(f"⚠️ 로컬 클립 파일이 이미 삭제되었거나 찾을 수 없음: {file_path}")
+    for path in extra_paths:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+def upload_and_cleanup(storage, file_path, db_writer, start_time, event_counter, previews=None):
     """
-    파일을 Google Drive에 업로드하고, DB에 기록한 후 로컬 파일을 정리합니다.
-    DB 연결은 이 함수 내에서 스레드별로 생성 및 관리됩니다.
+    파일을 클립 저장소에 업로드하고, DB 기록을 db_writer 큐에 넘깁니다.
+    로컬 파일은 DB 커밋이 확인된 뒤 (writer 스레드에서) 삭제됩니다.
+    previews: create_violation_previews() 결과. 클립과 같은 날짜 폴더에 함께 올립니다.
     """
-    db_conn_thread = None
+    previews = previews or {}
     try:
-        # 스레드별 DB 연결 생성
-        print(f"🧵 [{threading.get_ident()}] DB 연결 시도 중...")
-        db_conn_thread = pymysql.connect(**db_config)
-        print(f"🧵 [{threading.get_ident()}] DB 연결 성공.")
-
-        share_url = upload_video_to_drive(gdrive, file_path, parent_folder_id)
+        share_url = storage.upload(file_path)
         if share_url:
+            preview_links = {
+                kind: storage.upload(path) if path else None
+                for kind, path in (('thumbnail', previews.get('thumbnail')),
+                                   ('contact_sheet', previews.get('contact_sheet')))
+            }
+
             filename = os.path.basename(file_path)
             event_dt = datetime.fromtimestamp(start_time)
             # 시간 계산 시 시간대(timezone) 고려가 필요할 수 있습니다.
@@ -213,58 +267,249 @@ def upload_and_cleanup(gdrive, file_path, db_config, parent_folder_id, start_tim
             record_start_str = start_dt.strftime('%Y-%m-%d %H:%M:%S')
             record_end_str = end_dt.strftime('%Y-%m-%d %H:%M:%S')
 
-            people = event_counter.get("worker", 0)
-            pig = event_counter.get("pig", 0)
-
-            if people > 0 and pig > 0:
-                div_cd = 0 # 복합
-            elif people > 0:
-                div_cd = 1 # 사람
-            elif pig > 0:
-                div_cd = 2 # 돼지
-            else:
-                div_cd = 9 # 알 수 없음
-
-            db_success = insert_violation_to_db(
-                db_conn_thread, event_dttm_str, div_cd, record_start_str,
-                record_end_str, filename, share_url
-            )
+            div_cd = get_detection_div_cd(event_counter)
 
-            if db_success:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    print(f"🗑️ 업로드 후 로컬 클립 삭제 완료: {file_path}")
-                else:
-                    print(f"⚠️ 로컬 클립 파일이 이미 삭제되었거나 찾을 수 없음: {file_path}")
-            else:
-                print(f"⚠️ DB 저장 실패로 로컬 파일 유지: {file_path}")
+            def on_commit(ok):
+                cleanup_local_clip(file_path, ok, previews.values())
+                if not ok: mark_unsent_clip(file_path, start_time, event_counter, "DB 기록 실패")
+                release_pending_clip(file_path)
+
+            db_writer.submit(
+                (event_dttm_str, div_cd, record_start_str, record_end_str, filename, share_url,
+                 preview_links['thumbnail'], preview_links['contact_sheet']),
+                on_commit=on_commit
+            )
+            return True
         else:
             print(f"파일 업로드 실패 (또는 정보 부족)로 인해 DB 저장 및 로컬 삭제를 건너뜀: {file_path}")
 
-    except pymysql.Error as db_e: # DB 연결 생성 실패 등 pymysql 관련 오류
-        print(f"❌ 업로드/정리 중 DB 관련 오류(pymysql.Error) 발생 - 스레드 [{threading.get_ident()}]")
-        print(f"  - Raw: {db_e}")
-        print(f"  - Repr: {repr(db_e)}")
-        print(f"  - Args: {db_e.args}")
-        print(f"  - Type: {type(db_e).__name__}")
-        # 여기에 대한 에러 로그 파일 생성을 고려할 수 있습니다.
     except Exception as e:
-        # 기타 모든 예외 (파일 업로드, os.remove 등 포함)
-        print(f"❌ 업로드 또는 삭제 중 일반 예외 발생 - 스레드 [{threading.get_ident()}]")
+        # 기타 모든 예외 (파일 업로드 등 포함)
+        print(f"❌ 업로드 또는 DB 전달 중 일반 예외 발생 - 스레드 [{threading.get_ident()}]")
         print(f"  - Raw: {e}")
         print(f"  - Repr: {repr(e)}")
         print(f"  - Args: {e.args}")
         print(f"  - Type: {type(e).__name__}")
-        # 여기에 대한 에러 로그 파일 생성을 고려할 수 있습니다.
-    finally:
-        if db_conn_thread and db_conn_thread.open:
+    return False
+
+_upload_threads = set()
+
+# 인코딩/업로드/DB 커밋이 끝나지 않은 클립 (RetentionManager가 삭제하지 않도록)
+_pending_clips = set()
+_pending_lock = threading.Lock()
+
+def mark_pending_clip(file_path):
+    with _pending_lock:
+        _pending_clips.add(os.path.abspath(file_path))
+
+def release_pending_clip(file_path):
+    with _pending_lock:
+        _pending_clips.discard(os.path.abspath(file_path))
+
+def is_pending_clip(file_path):
+    """클립 또는 그 미리보기(<클립명>_key.jpg 등)가 처리 중인지 확인합니다."""
+    base = os.path.splitext(os.path.abspath(file_path))[0]
+    with _pending_lock:
+        return any(base == os.path.splitext(p)[0] or base.startswith(os.path.splitext(p)[0] + '_')
+                   for p in _pending_clips)
+
+# 업로드/DB 기록에 실패해 재전송을 기다리는 클립 (DB 행이 없는 유일한 위반 증거이므로 삭제하지 않음)
+UNSENT_SUFFIX = '.unsent'
+# 재전송 최대 횟수를 넘긴 클립의 표시 파일 (보류 디렉터리에서는 보관 정책에 따라 삭제될 수 있음)
+DEAD_LETTER_SUFFIX = '.dead'
+UNSENT_MAX_ATTEMPTS = 5
+UNSENT_RETRY_INTERVAL = 600.0       # 재전송 점검 주기이자 백오프 기본 간격(초): 600s, 1200s, 2400s ...
+UNSENT_RETRY_BACKOFF_MAX = 21600.0
+UNSENT_DEAD_LETTER_DIR = 'unsent_dead_letter'
+
+def _unsent_marker_path(file_path):
+    return os.path.splitext(file_path)[0] + UNSENT_SUFFIX
+
+def mark_unsent_clip(file_path, start_time, event_counter, reason):
+    """재전송에 필요한 정보와 함께 표시 파일을 남깁니다. (재시도 횟수 누적)"""
+    marker = _unsent_marker_path(file_path)
+    attempts = 0
+    if os.path.exists(marker):
+        try:
+            with open(marker, encoding='utf-8') as f:
+                attempts = json.load(f).get('attempts', 0)
+        except (OSError, ValueError):
+            pass
+    try:
+        with open(marker, 'w', encoding='utf-8') as f:
+            json.dump({'clip': os.path.basename(file_path), 'start_time': start_time,
+                       'event_counter': event_counter, 'reason': reason,
+                       'failed_at': time.time(), 'attempts': attempts + 1}, f, ensure_ascii=False)
+        print(f"📌 미전송 클립으로 보관 ({reason}): {file_path}")
+    except OSError as e:
+        print(f"⚠️ 미전송 표시 파일 저장 실패: {marker} ({e})")
+
+def clear_unsent_clip(file_path):
+    marker = _unsent_marker_path(file_path)
+    if os.path.exists(marker): os.remove(marker)
+
+def is_unsent_clip(file_path):
+    """클립, 그 미리보기(<클립명>_key.jpg 등), 표시 파일 자체가 미전송 클립에 속하는지 확인합니다."""
+    base = os.path.splitext(file_path)[0]
+    if os.path.exists(base + UNSENT_SUFFIX): return True
+    for suffix in ('_key', '_sheet'):
+        if base.endswith(suffix) and os.path.exists(base[:-len(suffix)] + UNSENT_SUFFIX): return True
+    return False
+
+def _unsent_retry_due(info, now, backoff_base, backoff_max):
+    attempts = max(1, int(info.get('attempts', 1)))
+    delay = min(backoff_base * (2 ** (attempts - 1)), backoff_max)
+    return now - float(info.get('failed_at', 0)) >= delay
+
+def move_to_dead_letter(clip_path, marker, info, dead_letter_dir):
+    """재전송을 포기한 클립과 미리보기를 보류 디렉터리로 옮기고 표시 파일을 .dead로 바꿉니다."""
+    os.makedirs(dead_letter_dir, exist_ok=True)
+    base = os.path.splitext(clip_path)[0]
+    for path in (clip_path, base + '_key.jpg', base + '_sheet.jpg'):
+        if os.path.exists(path):
+            shutil.move(path, os.path.join(dead_letter_dir, os.path.basename(path)))
+    dead_marker = os.path.join(dead_letter_dir, os.path.basename(base) + DEAD_LETTER_SUFFIX)
+    with open(dead_marker, 'w', encoding='utf-8') as f:
+        json.dump({**info, 'dead_at': time.time()}, f, ensure_ascii=False)
+    os.remove(marker)
+    print(f"🚨 미전송 클립 재전송 {info.get('attempts')}회 실패 → 보류 디렉터리로 이동 (수동 확인 필요): "
+          f"{os.path.join(dead_letter_dir, os.path.basename(clip_path))} (마지막 사유: {info.get('reason')})")
+
+def retry_unsent_clips(storage, db_writer, temp_dir="temp_clips", max_attempts=UNSENT_MAX_ATTEMPTS,
+                       backoff_base=UNSENT_RETRY_INTERVAL, backoff_max=UNSENT_RETRY_BACKOFF_MAX,
+                       dead_letter_dir=UNSENT_DEAD_LETTER_DIR):
+    """
+    미전송 클립 중 백오프 간격(backoff_base * 2^(실패 횟수-1))이 지난 클립을 업로드 스레드에서 다시 보냅니다.
+    max_attempts회 실패한 클립은 dead_letter_dir로 옮깁니다. 반환값: 재시도 건수
+    """
+    if not storage or not os.path.isdir(temp_dir): return 0
+    jobs = []
+    now = time.time()
+    for name in sorted(os.listdir(temp_dir)):
+        if not name.endswith(UNSENT_SUFFIX): continue
+        marker = os.path.join(temp_dir, name)
+        try:
+            with open(marker, encoding='utf-8') as f:
+                info = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 미전송 표시 파일 읽기 실패: {marker} ({e})")
+            continue
+        clip_path = os.path.join(temp_dir, info.get('clip', ''))
+        if not info.get('clip') or not os.path.exists(clip_path):
+            print(f"⚠️ 미전송 클립 파일이 없습니다: {clip_path}")
+            continue
+        if is_pending_clip(clip_path): continue         # 이전 재전송이 아직 진행 중
+        if info.get('attempts', 0) >= max_attempts:
+            try:
+                move_to_dead_letter(clip_path, marker, info, dead_letter_dir)
+            except OSError as e:
+                print(f"⚠️ 보류 디렉터리 이동 실패: {clip_path} ({e})")
+            continue
+        if not _unsent_retry_due(info, now, backoff_base, backoff_max): continue
+        base = os.path.splitext(clip_path)[0]
+        previews = {kind: path for kind, path in (('thumbnail', base + '_key.jpg'), ('contact_sheet', base + '_sheet.jpg'))
+                    if os.path.exists(path)}
+        mark_pending_clip(clip_path)
+        jobs.append((clip_path, info, previews))
+    if not jobs: return 0
+
+    def _retry():
+        for clip_path, info, previews in jobs:
+            handed_off = False
+            try:
+                handed_off = upload_and_cleanup(storage, clip_path, db_writer, info['start_time'],
+                                                info['event_counter'], previews)
+            finally:
+                if not handed_off:
+                    mark_unsent_clip(clip_path, info['start_time'], info['event_counter'], "재전송 실패")
+                    release_pending_clip(clip_path)
+
+    print(f"🔁 미전송 클립 {len(jobs)}건 재전송 시작")
+    thread = threading.Thread(target=_retry, name="UnsentClipRetry", daemon=True)
+    _upload_threads.difference_update([t for t in list(_upload_threads) if not t.is_alive()])
+    _upload_threads.add(thread)
+    thread.start()
+    return len(jobs)
+
+def start_unsent_retry(storage, db_writer, interval=UNSENT_RETRY_INTERVAL, **options):
+    """
+    시작 시 1회, 이후 interval마다 retry_unsent_clips를 실행하는 스레드를 띄웁니다.
+    반환값: 종료용 threading.Event (set()하면 다음 점검 전에 멈춤)
+    """
+    stop_event = threading.Event()
+    if not storage: return stop_event
+
+    def _loop():
+        while not stop_event.is_set():
+            try:
+                retry_unsent_clips(storage, db_writer, backoff_base=interval, **options)
+            except Exception as e:
+                print(f"❌ 미전송 클립 재전송 점검 중 오류: {e}")
+            stop_event.wait(interval)
+
+    threading.Thread(target=_loop, name="UnsentClipRetryLoop", daemon=True).start()
+    return stop_event
+
+def wait_for_pending_uploads(timeout=30):
+    """종료 전 진행 중인 업로드 스레드가 DB Writer에 레코드를 넘길 때까지 대기합니다."""
+    deadline = time.time() + timeout
+    for t in list(_upload_threads):
+        t.join(max(0, deadline - time.time()))
+    _upload_threads.difference_update([t for t in _upload_threads if not t.is_alive()])
+    pending = sum(1 for t in _upload_threads if t.is_alive())
+    if pending:
+        print(f"⚠️ 종료 대기 시간 초과: 업로드 {pending}건이 아직 진행 중입니다.")
+
+def encode_clip(frames, out_path, fps=15.0, encoder_opts=None):
+    """프레임 목록을 클립 파일로 인코딩하고 인코딩 시간/용량 정보를 반환합니다."""
+    height, width = frames[0].shape[:2]
+    writer = create_video_writer(out_path, fps, (width, height), encoder_opts)
+    for f in frames:
+        writer.write(f)
+    stats = writer.release()
+    print(f"🎬 클립 인코딩: {os.path.basename(out_path)} | {format_encode_stats(stats)}")
+    return stats
+
+def extract_clip_from_segments(out_path, encoder_opts, frame_times):
+    """원본 세그먼트 녹화 중이면 위반 구간을 그대로 잘라 저장합니다. (재인코딩 없음, 원본 화질)"""
+    if not encoder_opts or encoder_opts.get('clip_source') != 'segments' or not frame_times:
+        return False
+    if not encoder_opts.get('segment_dir'):
+        return False
+    from lib.segment_recorder import extract_clip
+    t0 = time.perf_counter()
+    if not extract_clip(encoder_opts['segment_dir'], frame_times[0], frame_times[-1], out_path):
+        print("⚠️ 원본 구간 추출 실패, 프레임 인코딩으로 대체합니다.")
+        return False
+    print(f"🎬 원본 구간 추출: {os.path.basename(out_path)} | {time.perf_counter() - t0:.2f}s")
+    return True
+
+def encode_and_upload(frames, out_path, fps, encoder_opts, storage, db_writer, start_time, event_counter,
+                      frame_times=None):
+    """인코딩부터 미리보기 생성, 업로드/DB 전달까지 백그라운드 스레드에서 처리합니다."""
+    handed_off = False      # DB Writer에 넘긴 경우 커밋 콜백에서 처리 중 표시를 해제
+    encoded = False
+    try:
+        if not extract_clip_from_segments(out_path, encoder_opts, frame_times):
             try:
-                db_conn_thread.close()
-                print(f"🧵 [{threading.get_ident()}] DB 연결 닫힘.")
-            except Exception as close_err:
-                print(f"⚠️ [{threading.get_ident()}] DB 연결 닫기 중 오류: {close_err}")
+                encode_clip(frames, out_path, fps, encoder_opts)
+            except Exception as e:
+                print(f"❌ 클립 인코딩 중 오류 발생: {e}")
+                return
+        encoded = True
+        previews = create_violation_previews(frames, frame_times, start_time, out_path)
+        if storage:
+            handed_off = upload_and_cleanup(storage, out_path, db_writer, start_time, event_counter, previews)
+        else:
+            print(f"[FAIL] 클립 저장소가 설정되지 않아 업로드 및 DB 저장을 건너뜁니다: {os.path.basename(out_path)}")
+    finally:
+        if not handed_off:
+            # 저장소 미사용(storage_type = none) 농장의 클립은 원래 로컬 보관 대상이므로 표시하지 않음
+            if encoded and storage and os.path.exists(out_path):
+                mark_unsent_clip(out_path, start_time, event_counter, "업로드 실패")
+            release_pending_clip(out_path)
 
-def save_infos(frames, start_time, event_counter, gdrive, db_config):                # , parent_folder_id=None
+def save_infos(frames, start_time, event_counter, storage, db_writer, fps=15.0, encoder_opts=None, frame_times=None):
     if not frames:
         return
     # filename = datetime.fromtimestamp(start_time).strftime("%Y%m%d_%H%M%S") + ".mp4"
@@ -272,25 +517,19 @@ def save_infos(frames, start_time, event_counter, gdrive, db_config):
     temp_dir = "temp_clips"
     os.makedirs(temp_dir, exist_ok=True)
     out_path = os.path.join(temp_dir, filename)
-
-    height, width = frames[0].shape[:2]
-    out = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*"mp4v"), 15.0, (width, height))
-    for f in frames:
-        out.write(f)
-    out.release()
-
-    print(f"🎞️ 저장된 클립: {out_path} | 작업자: {event_counter['worker']} 명, 돼지: {event_counter['pig']} 마리")
-    
-    if gdrive:
-        parent_folder_id = "0AE8IjXvFrukSUk9PVA"              # folder ID 개인 계정:     1ymI94ojlsHxDIi3OHFA13VYTVWNVImVK
-        upload_thread = threading.Thread(
-            target=upload_and_cleanup,
-            args=(gdrive, out_path, db_config, parent_folder_id, start_time, event_counter),
-            daemon=True
-        )
-        upload_thread.start()
-    else:
-        print(f"[FAIL] gdrive 객체가 유효하지 않아 Google Drive 업로드 및 DB 저장을 건너뜁니다: {filename}")
+    mark_pending_clip(out_path)
+
+    print(f"🎞️ 클립 저장 시작: {out_path} | 작업자: {event_counter['worker']} 명, 돼지: {event_counter['pig']} 마리")
+
+    # 인코딩(수 초)이 프레임 루프를 막지 않도록 업로드 스레드에서 함께 처리
+    upload_thread = threading.Thread(
+        target=encode_and_upload,
+        args=(frames, out_path, fps, encoder_opts, storage, db_writer, start_time, event_counter, frame_times),
+        daemon=True
+    )
+    _upload_threads.difference_update([t for t in list(_upload_threads) if not t.is_alive()])
+    _upload_threads.add(upload_thread)
+    upload_thread.start()
 
 def format_timestamp(ts):
     return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
@@ -5,6 +5,9 @@ from lib.utils import (
     format_timestamp, motion_detected_background, draw_line,
     draw_detection_box, save_infos, is_above_line
 )
+from lib.clip_encoder import create_video_writer, get_encoder_options, format_encode_stats
+from lib.farm_config import parse_line_coords, GEOMETRY_KEYS
+from lib.pipeline_state import PipelineState
 
 # 기본 상수
 DEFAULT_PIG_THRESH = 0.35
@@ -40,6 +43,7 @@ class Worker:
         self.id = track_id
         self.state = "unknown"  # unknown, clean, dirty
         self.last_seen = time.time()
+        self.last_box = None
         
         # 설정에서 dirty_zone 위치를 가져옴 (기본값: below)
         # 천장 수직 촬영 시 화면 아래쪽이 입구(더러운 곳)인 경우가 많음
@@ -49,8 +53,15 @@ class Worker:
     def is_expired(self, current_time):
         return current_time - self.last_seen > OBJECT_TIMEOUT_SECONDS
 
+    def apply_config(self, config, geometry_changed=False):
+        self.dirty_zone = config.get('dirty_zone_location', 'below')
+        self.orientation = config.get('orientation', 'height')
+        # 라인/구역이 바뀌면 이전 구역 판정이 무의미하므로 다음 프레임에서 다시 판정 (오탐 방지)
+        if geometry_changed: self.state = "unknown"
+
     def update(self, box, line_info, timestamp):
         self.last_seen = timestamp
+        self.last_box = box
         x1, y1, x2, y2 = box
         
         # [핵심 변경] 무게 중심(Centroid) 계산
@@ -99,6 +110,7 @@ class Pig:
         self.pos_max = 0
         self.c_pos_max = 0
         self.last_seen = time.time()
+        self.last_box = None
         self.has_crossed_down = False 
 
         self.reenter_thresh = self.config.get('pig_reenter_thresh', DEFAULT_PIG_THRESH)
@@ -112,8 +124,15 @@ class Pig:
     def is_expired(self, current_time):
         return current_time - self.last_seen > OBJECT_TIMEOUT_SECONDS
 
+    def apply_config(self, config, geometry_changed=False):
+        self.orientation = config.get('orientation', 'height')
+        self.reenter_thresh = config.get('pig_reenter_thresh', DEFAULT_PIG_THRESH)
+        # 출하 카운트와 직결되므로 상태는 유지하고, 이전 라인 기준으로 누적된 재진입 프레임 수만 초기화
+        if geometry_changed: self.reenter_count = 0
+
     def update(self, box, line_info, timestamp):
         self.last_seen = timestamp
+        self.last_box = box
         x1, y1, x2, y2 = box
         h = y2 - y1
         cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
@@ -175,10 +194,11 @@ class Pig:
             elif p1 > line_val:
                 self._change_state("under_line")
 
-def trigger_violation(track_id, label, timestamp, reentered_ids, event_counter, save_active, clip_start, warning_client=None, history=None):
+def trigger_violation(track_id, label, timestamp, reentered_ids, event_counter, save_active, clip_start, warning_client=None, history=None, event_hook=None):
     print(f"{format_timestamp(timestamp)} [ALERT] ID {track_id} violated! ({label})")
     reentered_ids.add(track_id)
     event_counter[label] += 1
+    if event_hook: event_hook("violation", {"track_id": track_id, "label": label, "timestamp": timestamp})
     
     if not save_active[0]:
         save_active[0] = True
@@ -186,98 +206,127 @@ def trigger_violation(track_id, label, timestamp, reentered_ids, event_counter,
 
     if label == "worker" and warning_client:
         print(f"🚨 사람 위반 (ID: {track_id}), 신호 전송...")
-        warning_client.send_signal("LIGHT_ON")
-
-def process_video(read_frame_func, model, drive_mgr, db_cfg, warning_client, shutdown, count_mgr, 
-                  farm_config, fps=15.0, width=640, height=384, record_output_path=None):
-    
-    detecting = False
-    prev_detecting = False
-    idle_start_time = None
-    prev_small_gray = None
-
-    # 설정 로드
-    motion_thresh = farm_config.get('motion_threshold', 300)
-    worker_conf = farm_config.get('worker_conf', 0.6)
-    orientation = farm_config.get('orientation', 'height')
-    if not orientation: orientation = 'height'
+        # AlertDispatcher는 큐에 넣고 즉시 반환 (같은 위반 이벤트의 중복 신호는 1회만 전송)
+        if hasattr(warning_client, 'dispatch'):
+            warning_client.dispatch("LIGHT_ON", event_key=clip_start[0])
+        else:
+            warning_client.send_signal("LIGHT_ON")
 
-    # Line 파싱
-    line_str = farm_config.get('line_coords', '')
-    line_points = []
-    
+def build_line(farm_config, width, height):
+    orientation = farm_config.get('orientation') or 'height'
     try:
-        if not line_str: raise ValueError("Empty coordinates")
-        coords = list(map(int, line_str.split(',')))
-        if len(coords) != 4: raise ValueError("Invalid format")
-        line_points = [(coords[0], coords[1]), (coords[2], coords[3])]
+        line_points = parse_line_coords(farm_config.get('line_coords', ''))
     except (ValueError, IndexError):
         print(f"⚠️ [{farm_config.get('farm_code')}] 라인 좌표 미설정/오류. 기본 중앙선으로 대체합니다.")
         if orientation == 'width':
             line_points = [(width // 2, 0), (width // 2, height)] 
         else:
             line_points = [(0, height // 2), (width, height // 2)] 
-            
-    LINE = Line(line_points)
+    return Line(line_points)
+
+def process_video(read_frame_func, tracker, storage, db_writer, warning_client, shutdown, count_mgr, 
+                  farm_config, fps=15.0, width=640, height=384, record_output_path=None, config_watcher=None,
+                  state=None, display=True, clock=None, event_hook=None, qos=None, preview=None):
+    # display=False: 화면 출력 없이 실행 (회귀 테스트/헤드리스)
+    # preview: PreviewHub (lib/preview_server.py). 시청자가 있을 때만 결과 프레임을 넘김
+    # clock: 프레임 시각 함수 (기본 time.time, 녹화 영상 재생 시 영상 시각을 넘기면 재생 속도와 무관하게 동일 판정)
+    # event_hook(event_type, data): 위반(violation) / 움직임 on·off(motion) 이벤트 수신 콜백
+    # state: 재연결 시 같은 PipelineState를 넘기면 추적 상태/배경 모델을 이어서 사용
+    # qos: QoSController (lib/qos.py). 과부하 시 추론 해상도/간격, 움직임 판정 간격, 주석 그리기를 단계적으로 낮춤
+    if state is None: state = PipelineState()
+    state.resume()
+
+    detecting = state.detecting
+    prev_detecting = detecting
+    idle_start_time = state.idle_start_time
+    prev_small_gray = state.prev_small_gray
 
-    bg_sub = cv2.createBackgroundSubtractorMOG2(history=300, varThreshold=16, detectShadows=False)
+    # 설정 로드
+    motion_thresh = farm_config.get('motion_threshold', 300)
+    worker_conf = farm_config.get('worker_conf', 0.6)
+    orientation = farm_config.get('orientation', 'height')
+    if not orientation: orientation = 'height'
+
+    LINE = build_line(farm_config, width, height)
+
+    bg_sub = state.bg_sub
     
     # 객체 관리 컨테이너
-    pigs = {}
-    workers = {} # [추가] Worker 객체 관리
+    pigs = state.pigs
+    workers = state.workers # [추가] Worker 객체 관리
     
     track_history = defaultdict(list)
-    reentered_ids = set()
-    frame_count = 0
-    yolo_cache = None
+    reentered_ids = state.reentered_ids
     violation_buffer = deque(maxlen=int(fps * 6))
     save_active = [False]
     clip_start = [0]
     event_counter = {"worker": 0, "pig": 0}
 
+    encoder_opts = get_encoder_options(farm_config)
     recorder = None
     if record_output_path:
-        recorder = cv2.VideoWriter(record_output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        recorder = create_video_writer(record_output_path, fps, (width, height), encoder_opts)
 
+    motion = False
+    active_ids = set()
     while True:
         frame = read_frame_func()
         if frame is None: break
+        if shutdown.get('manual_quit'): break       # 미리보기 화면 등 외부 종료 요청
+        frame_start = time.perf_counter()
+        qos_params = qos.params if qos else None
+        annotate = qos_params['annotate'] if qos else True
         
-        timestamp = time.time()
+        timestamp = clock() if clock else time.time()
+
+        # 설정 파일 변경 반영 (프레임 사이에서만 적용하므로 한 프레임 안의 판정은 항상 같은 설정 기준)
+        changed = config_watcher.poll(timestamp) if config_watcher else []
+        if changed:
+            motion_thresh = farm_config.get('motion_threshold', 300)
+            worker_conf = farm_config.get('worker_conf', 0.6)
+            orientation = farm_config.get('orientation') or 'height'
+            geometry_changed = any(k in GEOMETRY_KEYS for k in changed)
+            if geometry_changed: LINE = build_line(farm_config, width, height)
+            for obj in list(pigs.values()) + list(workers.values()):
+                obj.apply_config(farm_config, geometry_changed)
+
         frame = cv2.resize(frame, (width, height))
-        gray = cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (5, 5), 0)
-        small_gray = cv2.resize(gray, (width//2, height//2))
-        
-        motion = motion_detected_background(prev_small_gray, small_gray, bg_sub, motion_thresh)
-        prev_small_gray = small_gray.copy()
+        # QoS 단계에 따라 움직임 판정을 건너뛴 프레임은 직전 판정 결과를 유지
+        if qos is None or qos.should_check_motion():
+            gray = cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+            small_gray = cv2.resize(gray, (width//2, height//2))
+
+            motion = motion_detected_background(prev_small_gray, small_gray, bg_sub, motion_thresh)
+            prev_small_gray = small_gray.copy()
 
         if motion:
             detecting = True; idle_start_time = None
         else:
-            if detecting and idle_start_time is None: idle_start_time = time.time()
-            elif detecting and (time.time() - idle_start_time > 3): detecting = False
+            if detecting and idle_start_time is None: idle_start_time = timestamp
+            elif detecting and (timestamp - idle_start_time > 3): detecting = False
         
         if detecting != prev_detecting:
             print(f"[{format_timestamp(timestamp)}] {'움직임 감지' if detecting else '대기'}")
+            if event_hook: event_hook("motion", {"active": detecting, "timestamp": timestamp})
             prev_detecting = detecting
 
-        active_ids = set()
-        if detecting:
-            if frame_count % 1 == 0 or yolo_cache is None:
-                yolo_cache = model.track(frame, persist=True, verbose=False)[0]
-            results = yolo_cache
-            frame_count += 1
-
-            for box in results.boxes:
-                if box.id is None: continue
-                track_id = int(box.id.item())
-                cls = int(box.cls.item())
-                label = model.names[cls]
-                
-                xyxy = box.xyxy[0].cpu().numpy()
-                x1, y1, x2, y2 = map(int, xyxy)
+        # 검출을 건너뛴 프레임(QoS stride)은 직전 프레임의 활성 ID를 유지해 궤적이 끊기지 않도록 함
+        # 대기 상태로 바뀌면 비워 지난 궤적이 대기 화면/미리보기/클립에 남지 않도록 함
+        if not detecting:
+            active_ids = set()
+        elif qos is None or qos.should_detect():
+            active_ids = set()
+            for box in tracker.update(frame, imgsz=qos_params['imgsz'] if qos else None):
+                track_id = box.track_id
+                label = tracker.names[box.cls]
+                x1, y1, x2, y2 = box.xyxy
                 cx, cy = (x1 + x2)//2, (y1 + y2)//2
 
+                # 재연결 직후 새 ID로 잡힌 객체는 끊기기 전 상태를 이어받음
+                if label in ("pig", "worker"):
+                    state.rebind(label, track_id, box.xyxy, timestamp)
+                    state.mark_seen(track_id)
+
                 # --- [PIG LOGIC] ---
                 if label == "pig":
                     if track_id not in pigs: pigs[track_id] = Pig(track_id, farm_config)
@@ -305,11 +354,11 @@ def process_video(read_frame_func, model, drive_mgr, db_cfg, warning_client, shu
                         pig._change_state("on_line")
 
                     if pig.state.startswith("re-enter") and track_id not in reentered_ids:              
-                        trigger_violation(track_id, "pig", timestamp, reentered_ids, event_counter, save_active, clip_start, history=pig.state_history)
+                        trigger_violation(track_id, "pig", timestamp, reentered_ids, event_counter, save_active, clip_start, history=pig.state_history, event_hook=event_hook)
                         pig._change_state("re-enter-handled")
 
                 # --- [WORKER LOGIC (IMPROVED)] ---
-                elif label == "worker" and box.conf.item() > worker_conf:
+                elif label == "worker" and box.conf > worker_conf:
                     if track_id not in workers: 
                         workers[track_id] = Worker(track_id, farm_config)
                     
@@ -317,18 +366,19 @@ def process_video(read_frame_func, model, drive_mgr, db_cfg, warning_client, shu
                     is_violation = worker.update((x1, y1, x2, y2), LINE, timestamp)
                     
                     if is_violation and track_id not in reentered_ids:
-                        trigger_violation(track_id, "worker", timestamp, reentered_ids, event_counter, save_active, clip_start, warning_client)
+                        trigger_violation(track_id, "worker", timestamp, reentered_ids, event_counter, save_active, clip_start, warning_client, event_hook=event_hook)
 
                 # 시각화
-                draw_detection_box(frame, (x1, y1, x2, y2), label, track_id, track_id in reentered_ids)
+                if annotate: draw_detection_box(frame, (x1, y1, x2, y2), label, track_id, track_id in reentered_ids)
                 active_ids.add(track_id)
                 track_history[track_id].append((cx, cy))
                 if len(track_history[track_id]) > 10: track_history[track_id].pop(0)
 
         # 저장 및 정리
         if save_active[0] and (timestamp - clip_start[0] >= 3):
-            gdrive = drive_mgr.get_drive()
-            if gdrive: save_infos(list(violation_buffer), clip_start[0], event_counter, gdrive, db_cfg)
+            buffered = list(violation_buffer)
+            save_infos([f for _, f in buffered], clip_start[0], event_counter, storage, db_writer, fps, encoder_opts,
+                       frame_times=[t for t, _ in buffered])
             save_active[0] = False; event_counter = {"worker": 0, "pig": 0}
 
         # 만료된 객체 삭제
@@ -340,20 +390,27 @@ def process_video(read_frame_func, model, drive_mgr, db_cfg, warning_client, shu
             if workers[k].is_expired(timestamp): workers.pop(k, None); reentered_ids.discard(k)
 
         # 화면 그리기
-        for tid in track_history:
-            t = track_history[tid]
-            if len(t) >= 2:
-                for i in range(1, len(t)): cv2.line(frame, t[i-1], t[i], (255,255,255), 1)
-        draw_line(frame, LINE.points)
-        
-        cv2.putText(frame, f"Count: {count_mgr.get_current_count()}", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
-        violation_buffer.append(frame.copy())
-        cv2.imshow("Detection", frame)
+        if annotate:
+            for tid in track_history:
+                t = track_history[tid]
+                if len(t) >= 2:
+                    for i in range(1, len(t)): cv2.line(frame, t[i-1], t[i], (255,255,255), 1)
+            draw_line(frame, LINE.points)
+
+            cv2.putText(frame, f"Count: {count_mgr.get_current_count()}", (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255,255,255), 2)
+        violation_buffer.append((timestamp, frame.copy()))
         if recorder: recorder.write(frame)
-
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            shutdown['manual_quit'] = True
-            break
-
-    cv2.destroyAllWindows()
-    if recorder: recorder.release()
\ No newline at end of file
+        if preview and preview.wants_frame(): preview.submit(frame)
+        if qos: qos.update((time.perf_counter() - frame_start) * 1000, detecting)
+
+        if display:
+            cv2.imshow("Detection", frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                shutdown['manual_quit'] = True
+                break
+
+    state.detecting, state.idle_start_time, state.prev_small_gray = detecting, idle_start_time, prev_small_gray
+    state.pause()
+    if display: cv2.destroyAllWindows()
+    if recorder:
+        print(f"📼 녹화 파일 저장: {record_output_path} | {format_encode_stats(recorder.release())}")
\ No newline at end of file
@@ -0,0 +1,194 @@
+'''
+    release date: 2026-10-19
+        - 위반 건수 롤업 테이블 (농장 / 일자 / 시간 / 탐지 유형별 건수)
+        - ViolationDBWriter가 위반 기록과 같은 트랜잭션에서 증분 반영
+        - 원본 이력으로부터 재구성하는 backfill 명령
+        - 농장별 반영 시작 시각(watermark) 기록: 이전 구간은 원본 이력으로 집계 (get_rollup_coverage)
+    사용법:
+        python -m lib.violation_rollup backfill --farm-code 101 --from 2025-01-01 --to 2026-10-19 [--assume-legacy-farm]
+        python -m lib.violation_rollup show --from 2026-10-01 --to 2026-10-19 [--farm-code 101] [--by hour]
+'''
+
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pymysql
+
+ROLLUP_UPSERT_SQL = """
+    INSERT INTO dc_biosec_violation_rollup
+    (farm_div_cd, event_dt, event_hh, detection_target_div_cd, violation_cnt, upd_dttm)
+    VALUES (%s, %s, %s, %s, %s, NOW())
+    ON DUPLICATE KEY UPDATE violation_cnt = violation_cnt + VALUES(violation_cnt), upd_dttm = NOW()
+"""
+
+BACKFILL_DELETE_SQL = """
+    DELETE FROM dc_biosec_violation_rollup
+    WHERE farm_div_cd = %s AND event_dt >= %s AND event_dt < %s
+"""
+
+# farm_div_cd가 기록된 행만 집계합니다. (V003 이전 행은 db_migrate stamp-farm으로 먼저 채움)
+# 보고서 상세 조회(farm_div_cd = %s)와 같은 행 집합이어야 합계가 맞습니다.
+BACKFILL_INSERT_SQL = """
+    INSERT INTO dc_biosec_violation_rollup
+    (farm_div_cd, event_dt, event_hh, detection_target_div_cd, violation_cnt, upd_dttm)
+    SELECT %s, DATE(event_dttm), HOUR(event_dttm), detection_target_div_cd, COUNT(*), NOW()
+    FROM dc_biosec_violation_hist
+    WHERE farm_div_cd = %s AND event_dttm >= %s AND event_dttm < %s
+    GROUP BY DATE(event_dttm), HOUR(event_dttm), detection_target_div_cd
+"""
+
+LEGACY_COUNT_SQL = """
+    SELECT COUNT(*) AS cnt FROM dc_biosec_violation_hist
+    WHERE farm_div_cd IS NULL AND event_dttm >= %s AND event_dttm < %s
+"""
+
+# 처음 반영한 배치의 가장 이른 위반 시각만 남김 (이후 배치는 무시)
+WATERMARK_INIT_SQL = """
+    INSERT IGNORE INTO dc_biosec_violation_rollup_watermark (farm_div_cd, covered_from, upd_dttm)
+    VALUES (%s, %s, NOW())
+"""
+
+# backfill 구간이 기존 반영 구간과 이어질 때만 앞으로 넓힘 (중간에 빈 구간이 생기지 않도록)
+WATERMARK_EXTEND_SQL = """
+    UPDATE dc_biosec_violation_rollup_watermark
+    SET covered_from = LEAST(covered_from, %s), upd_dttm = NOW()
+    WHERE farm_div_cd = %s AND covered_from <= %s
+"""
+
+GROUP_COLUMNS = {
+    'type': "detection_target_div_cd",
+    'day': "event_dt, detection_target_div_cd",
+    'hour': "event_dt, event_hh, detection_target_div_cd",
+}
+
+
+def build_rollup_rows(farm_cd, values_list):
+    """
+    위반 INSERT 값 목록(VIOLATION_INSERT_SQL 순서)을 롤업 증분 행으로 묶습니다.
+    반환값: [(farm_div_cd, event_dt, event_hh, div_cd, cnt), ...]
+    """
+    counter = Counter()
+    for values in values_list:
+        event_dt = datetime.strptime(values[0], '%Y-%m-%d %H:%M:%S')
+        counter[(event_dt.date(), event_dt.hour, str(values[1]))] += 1
+    return [(farm_cd, d, h, div_cd, cnt) for (d, h, div_cd), cnt in sorted(counter.items())]
+
+
+def apply_rollup(cursor, farm_cd, values_list):
+    """호출자의 트랜잭션 안에서 롤업 증분을 반영합니다. (커밋은 호출자가 수행)"""
+    rows = build_rollup_rows(farm_cd, values_list)
+    if rows:
+        cursor.executemany(ROLLUP_UPSERT_SQL, rows)
+        cursor.execute(WATERMARK_INIT_SQL, (farm_cd, min(values[0] for values in values_list)))
+    return len(rows)
+
+
+def backfill_rollup(db_conn, farm_cd, start_date, end_date, assume_legacy_farm=False):
+    """
+    [start_date, end_date) 구간의 롤업을 원본 이력으로부터 다시 계산합니다.
+    farm_div_cd가 비어 있는 과거 행은 집계하지 않고 건수만 알립니다.
+    assume_legacy_farm=True(단일 농장 DB)면 먼저 그 행들을 farm_cd로 기록(stamp-farm)한 뒤 집계합니다.
+    """
+    try:
+        if assume_legacy_farm:
+            from lib.db_migrate import stamp_farm
+            stamp_farm(db_conn, farm_cd)
+        with db_conn.cursor() as cursor:
+            cursor.execute(LEGACY_COUNT_SQL, (start_date, end_date))
+            legacy = cursor.fetchone()
+            legacy = legacy['cnt'] if isinstance(legacy, dict) else legacy[0]
+            if legacy:
+                print(f"⚠️ 농장 코드가 없는 과거 위반 {legacy}건은 롤업에서 제외됩니다. "
+                      f"단일 농장 DB라면 'python -m lib.db_migrate stamp-farm --farm-code {farm_cd}' "
+                      f"또는 --assume-legacy-farm으로 다시 실행하세요.")
+            cursor.execute(BACKFILL_DELETE_SQL, (farm_cd, start_date.date(), end_date.date()))
+            cursor.execute(BACKFILL_INSERT_SQL, (farm_cd, farm_cd, start_date, end_date))
+            inserted = cursor.rowcount
+            cursor.execute(WATERMARK_EXTEND_SQL, (start_date, farm_cd, end_date))
+            if end_date >= datetime.now():
+                # 아직 증분 반영 전이어도 현재까지 재구성했으면 start_date부터 신뢰
+                cursor.execute(WATERMARK_INIT_SQL, (farm_cd, start_date))
+        db_conn.commit()
+        print(f"✅ 롤업 재구성 완료: 농장 {farm_cd}, {start_date:%Y-%m-%d} ~ {end_date:%Y-%m-%d} ({inserted}행)")
+        return inserted
+    except pymysql.Error as e:
+        db_conn.rollback()
+        print(f"❌ 롤업 재구성 실패: {e}")
+        return 0
+
+
+def get_rollup_coverage(db_conn, farm_cd):
+    """
+    롤업이 farm_cd의 위반을 빠짐없이 담고 있는 시작 일자를 반환합니다. (그 날 00:00부터 신뢰)
+    반영 시작 시각이 하루 중간이면 그 날은 일부만 반영되어 있으므로 다음 날부터입니다.
+    기록이 없거나 조회에 실패하면 None (롤업을 쓰지 않음)
+    """
+    if not farm_cd: return None
+    try:
+        with db_conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT covered_from FROM dc_biosec_violation_rollup_watermark WHERE farm_div_cd = %s", (farm_cd,)
+            )
+            row = cursor.fetchone()
+    except pymysql.Error as e:
+        print(f"⚠️ 롤업 반영 시각 조회 실패, 원본 이력으로 집계합니다: {e}")
+        return None
+    if not row: return None
+    covered_from = row['covered_from']
+    day = covered_from.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day if day == covered_from else day + timedelta(days=1)
+
+
+def get_rollup_counts(db_conn, start_date, end_date, farm_cd=None, by='type'):
+    """
+    롤업 테이블에서 기간 내 건수를 조회합니다.
+    by: 'type'(유형별 합계) | 'day'(일자·유형별) | 'hour'(일자·시간·유형별)
+    """
+    columns = GROUP_COLUMNS[by]
+    sql = f"""
+        SELECT {columns}, SUM(violation_cnt) AS cnt
+        FROM dc_biosec_violation_rollup
+        WHERE event_dt >= %s AND event_dt < %s
+    """
+    params = [start_date.date(), end_date.date()]
+    if farm_cd:
+        sql += " AND farm_div_cd = %s"
+        params.append(farm_cd)
+    sql += f" GROUP BY {columns} ORDER BY {columns}"
+
+    with db_conn.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+if __name__ == "__main__":
+    from lib.service_manager import get_database_service
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["backfill", "show"])
+    parser.add_argument("--db-config", default="./lib/db_info_config.ini")
+    parser.add_argument("--farm-code", type=int)
+    parser.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", required=True, help="YYYY-MM-DD (해당 일 포함)")
+    parser.add_argument("--by", choices=list(GROUP_COLUMNS), default="day")
+    parser.add_argument("--assume-legacy-farm", action="store_true",
+                        help="backfill: 농장 코드가 없는 과거 행을 --farm-code 농장으로 기록 후 집계 (단일 농장 DB 전용)")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.date_from, '%Y-%m-%d')
+    end = datetime.strptime(args.date_to, '%Y-%m-%d') + timedelta(days=1)
+
+    conn = get_database_service(args.db_config)
+    if conn is None:
+        raise SystemExit(1)
+    try:
+        if args.command == "backfill":
+            if not args.farm_code:
+                parser.error("backfill에는 --farm-code가 필요합니다.")
+            backfill_rollup(conn, args.farm_code, start, end, args.assume_legacy_farm)
+        else:
+            for row in get_rollup_counts(conn, start, end, args.farm_code, args.by):
+                print(" | ".join(str(v) for v in row.values()))
+    finally:
+        conn.close()
@@ -2,10 +2,28 @@
     release date: 2025-06-09
     release date: 2025-08-04
         - RPI Client, Web Wook Client 분리
+    release date: 2026-10-19
+        - FramedRPIClient: 프레임 프로토콜(lib/rpi_protocol.py), 하트비트, 백그라운드 재연결, ACK 지연 측정
+        - WebhookClient: 세션 연결 풀, 다중 엔드포인트 동시 전송, 엔드포인트별 timeout/retries/지연 히스토그램
+          엔드포인트 재시도 사이 백오프, 재전송은 실패한 엔드포인트로만
 '''
 
+import itertools
 import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+import requests.adapters
+
+from lib.metrics import RollingStats
+from lib.rpi_protocol import (
+    encode_frame, FrameReader, ProtocolError,
+    TYPE_SIGNAL, TYPE_ACK, TYPE_PING, TYPE_PONG
+)
+
+RETRY_BACKOFF_BASE = 0.2        # 웹훅 엔드포인트 재시도 간격 (0.2s, 0.4s ... 최대 RETRY_BACKOFF_MAX)
+RETRY_BACKOFF_MAX = 2.0
 
 
 class RPIClient:
@@ -70,54 +88,336 @@ class RPIClient:
                 self.is_connected = False
 
 
+class FramedRPIClient:
+    """
+    프레임 프로토콜을 사용하는 상시 연결 RPI 클라이언트.
+
+    - 링크 스레드: heartbeat_interval마다 PING 전송, heartbeat_timeout(기본 간격의 3배) 동안 PONG이 없으면
+      연결을 끊고 백오프(1s → 최대 reconnect_max)로 재연결 (위반 발생 전에 미리 복구)
+    - 수신 스레드: ACK/PONG 처리
+    - send_signal(): 메시지 ID를 붙여 전송하고 ack_timeout 동안 ACK를 기다림 (송신~ACK 지연 집계)
+    """
+    def __init__(self, host, port, heartbeat_interval=5.0, heartbeat_timeout=None,
+                 ack_timeout=2.0, reconnect_max=30.0):
+        self.host = host
+        self.port = port
+        self.heartbeat_interval = heartbeat_interval
+        if not heartbeat_timeout or heartbeat_timeout <= heartbeat_interval:
+            heartbeat_timeout = heartbeat_interval * 3
+        self.heartbeat_timeout = heartbeat_timeout
+        self.ack_timeout = ack_timeout
+        self.reconnect_max = reconnect_max
+
+        self.socket = None
+        self.is_connected = False
+        self._ids = itertools.count(1)
+        self._pending_acks = {}             # 메시지 ID -> threading.Event
+        self._send_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._link_thread = None
+        self._last_pong = 0.0
+
+        # 지표
+        self.ack_latency = RollingStats()       # ms
+        self.heartbeat_rtt = RollingStats()     # ms
+        self.reconnect_count = 0
+        self.ack_timeout_count = 0
+
+    # ---------------------------------------------------------
+    # 외부 인터페이스 (RPIClient와 동일)
+    # ---------------------------------------------------------
+    def connect(self):
+        """최초 연결을 시도하고 링크 관리 스레드를 시작합니다."""
+        ok = self._open()
+        if not self._link_thread or not self._link_thread.is_alive():
+            self._stop_event.clear()
+            self._link_thread = threading.Thread(target=self._link_loop, name="RPILink", daemon=True)
+            self._link_thread.start()
+        return ok
+
+    def send_signal(self, message):
+        if not self.is_connected:
+            print(" RPI 링크가 끊어져 있습니다. (백그라운드 재연결 중)")
+            return False
+
+        msg_id = next(self._ids)
+        ack_event = threading.Event()
+        self._pending_acks[msg_id] = ack_event
+        t0 = time.perf_counter()
+        try:
+            if not self._send(encode_frame(TYPE_SIGNAL, msg_id, message)):
+                return False
+            if not ack_event.wait(self.ack_timeout):
+                self.ack_timeout_count += 1
+                print(f"❌ 신호 '{message}' (ID {msg_id}) ACK 시간 초과 ({self.ack_timeout}s)")
+                return False
+            latency_ms = (time.perf_counter() - t0) * 1000
+            self.ack_latency.add(latency_ms)
+            print(f"💡 신호 '{message}' (ID {msg_id}) 전달 확인 ({latency_ms:.1f}ms)")
+            return True
+        finally:
+            self._pending_acks.pop(msg_id, None)
+
+    def get_metrics(self):
+        return {
+            'connected': self.is_connected,
+            'reconnects': self.reconnect_count,
+            'ack_timeouts': self.ack_timeout_count,
+            'ack_latency_ms': self.ack_latency.summary(),
+            'heartbeat_rtt_ms': self.heartbeat_rtt.summary(),
+        }
+
+    def close(self):
+        self._stop_event.set()
+        self._drop("종료 요청")
+        if self._link_thread:
+            self._link_thread.join(2)
+        print(" 서버와의 연결을 종료했습니다.")
+
+    # ---------------------------------------------------------
+    # 내부 처리
+    # ---------------------------------------------------------
+    def _open(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=5)
+            sock.settimeout(1.0)            # 수신 스레드가 종료 요청을 확인할 수 있도록
+        except socket.error as e:
+            print(f"❌ 경고 서버 연결 실패 ({self.host}:{self.port}): {e}")
+            return False
+
+        with self._state_lock:
+            self.socket = sock
+            self.is_connected = True
+            self._last_pong = time.time()
+        threading.Thread(target=self._recv_loop, args=(sock,), name="RPIRecv", daemon=True).start()
+        print(f"✅ 경고 서버에 성공적으로 연결되었습니다 ({self.host}:{self.port}, framed).")
+        return True
+
+    def _drop(self, reason):
+        with self._state_lock:
+            sock, self.socket = self.socket, None
+            was_connected, self.is_connected = self.is_connected, False
+        if sock:
+            try: sock.close()
+            except socket.error: pass
+        if was_connected and not self._stop_event.is_set():
+            print(f"⚠️ RPI 링크 끊김: {reason}")
+
+    def _send(self, frame):
+        sock = self.socket
+        if sock is None: return False
+        try:
+            with self._send_lock:
+                sock.sendall(frame)
+            return True
+        except socket.error as e:
+            self._drop(f"전송 오류: {e}")
+            return False
+
+    def _recv_loop(self, sock):
+        reader = FrameReader()
+        while not self._stop_event.is_set() and self.socket is sock:
+            try:
+                data = sock.recv(4096)
+            except socket.timeout:
+                continue
+            except socket.error as e:
+                self._drop(f"수신 오류: {e}")
+                return
+            if not data:
+                self._drop("서버가 연결을 닫음")
+                return
+            try:
+                frames = reader.feed(data)
+            except ProtocolError as e:
+                self._drop(str(e))
+                return
+            for frame in frames:
+                self._handle_frame(frame)
+
+    def _handle_frame(self, frame):
+        f_type = frame.get('type')
+        if f_type == TYPE_ACK:
+            event = self._pending_acks.get(frame.get('id'))
+            if event: event.set()
+        elif f_type == TYPE_PONG:
+            self._last_pong = time.time()
+            sent_ts = frame.get('echo_ts')
+            if sent_ts: self.heartbeat_rtt.add((self._last_pong - sent_ts) * 1000)
+        elif f_type == TYPE_PING:
+            self._send(encode_frame(TYPE_PONG, frame.get('id'), echo_ts=frame.get('ts')))
+
+    def _link_loop(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            if not self.is_connected:
+                if self._open():
+                    self.reconnect_count += 1
+                    backoff = 1.0
+                else:
+                    if self._stop_event.wait(backoff): break
+                    backoff = min(backoff * 2, self.reconnect_max)
+                    continue
+
+            if time.time() - self._last_pong > self.heartbeat_timeout:
+                self._drop(f"하트비트 응답 없음 ({self.heartbeat_timeout}s)")
+                continue
+            self._send(encode_frame(TYPE_PING, next(self._ids)))
+            self._stop_event.wait(self.heartbeat_interval)
+
+
+def parse_webhook_endpoints(spec):
+    """
+    webhook_endpoints 설정값을 엔드포인트 목록으로 변환합니다.
+    한 줄에 하나씩: name | url | timeout(초) | retries | method(GET/POST)
+    예)
+        webhook_endpoints =
+            dashboard | http://10.0.0.5/api/violation | 2 | 1 | POST
+            relay     | https://relay.example.com/notify | 3 | 2 | POST
+    """
+    endpoints = []
+    for line in (spec or '').splitlines():
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) < 2 or not parts[1]: continue
+        try:
+            endpoints.append({
+                'name': parts[0] or parts[1],
+                'url': parts[1],
+                'timeout': float(parts[2]) if len(parts) > 2 and parts[2] else 5.0,
+                'retries': int(parts[3]) if len(parts) > 3 and parts[3] else 0,
+                'method': parts[4].upper() if len(parts) > 4 and parts[4] else 'GET',
+                'required': False,
+            })
+        except ValueError:
+            print(f"⚠️ webhook_endpoints 항목 형식 오류: '{line.strip()}'")
+    return endpoints
+
+
 class WebhookClient:
-    """웹훅 요청을 보내는 클라이언트 클래스"""
-    def __init__(self, webhook_url):
+    """
+    웹훅 요청을 보내는 클라이언트 클래스.
+
+    - requests.Session 연결 풀을 재사용하여 DNS/TCP/TLS 설정 비용을 첫 요청에만 지불
+    - 여러 엔드포인트(경광등, 농장 대시보드, 메시지 릴레이 등)로 동시에 전송
+    - 엔드포인트별 timeout/retries, 지연시간 히스토그램
+    - keepalive_interval > 0 이면 주기적으로 HEAD 요청을 보내 유휴 연결이 닫히지 않도록 유지
+    """
+    def __init__(self, webhook_url=None, endpoints=None, timeout=5.0, retries=0, keepalive_interval=0, verify=False):
         """
         Args:
-            webhook_url (str): 요청을 보낼 전체 웹훅 URL
+            webhook_url (str): 경광등 웹훅 URL (필수 엔드포인트 'light'로 등록)
+            endpoints (list): parse_webhook_endpoints() 결과 (부가 엔드포인트)
         """
+        self.endpoints = []
+        if webhook_url:
+            self.endpoints.append({'name': 'light', 'url': webhook_url, 'timeout': timeout,
+                                   'retries': retries, 'method': 'GET', 'required': True})
+        self.endpoints.extend(endpoints or [])
         self.webhook_url = webhook_url
+        self.verify = verify
+        self.keepalive_interval = keepalive_interval
         self.is_connected = False # 소켓 클라이언트와의 호환성을 위한 플래그
 
+        pool_size = max(1, len(self.endpoints))
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size * 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="Webhook")
+        self.latency = {ep['name']: RollingStats() for ep in self.endpoints}      # ms
+        self.failures = {ep['name']: 0 for ep in self.endpoints}
+        self.last_failed = []          # 직전 send_signal에서 실패한 엔드포인트 (AlertDispatcher 재시도 대상)
+        self._stop_event = threading.Event()
+
     def connect(self):
         """URL 유효성만 확인하여 연결 상태를 설정합니다."""
-        if self.webhook_url:
+        if self.endpoints:
             self.is_connected = True
-            print(f"✅ Webhook 설정이 유효합니다. ({self.webhook_url})")
+            for ep in self.endpoints:
+                print(f"✅ Webhook 설정이 유효합니다. [{ep['name']}] ({ep['url']}, timeout {ep['timeout']}s)")
+            if self.keepalive_interval > 0:
+                threading.Thread(target=self._keepalive_loop, name="WebhookKeepAlive", daemon=True).start()
             return True
         else:
             self.is_connected = False
             print("❌ Webhook URL이 설정되지 않아 연결할 수 없습니다.")
             return False
 
-    def send_signal(self, message):
+    def send_signal(self, message, endpoints=None):
         """
-        웹훅 URL로 GET 요청을 전송합니다.
+        모든 엔드포인트로 동시에 요청을 전송합니다.
         
         Args:
-            message (str): 인터페이스 호환용 인수 (실제 요청에는 사용되지 않음)
+            message (str): GET 엔드포인트에는 사용되지 않으며, POST 엔드포인트에는 JSON 본문으로 전달
+            endpoints (list): 이 이름의 엔드포인트로만 전송 (재시도 시 이미 성공한 엔드포인트 중복 전송 방지)
         
         Returns:
-            bool: 성공 여부
+            bool: 필수 엔드포인트(경광등) 성공 여부 (필수 엔드포인트가 없으면 하나라도 성공 시 True)
+            실패한 엔드포인트 이름은 last_failed에 남습니다.
         """
         if not self.is_connected:
             print("❌ Webhook이 연결(설정)되지 않았습니다. 신호를 보낼 수 없습니다.")
+            self.last_failed = []
             return False
-        
-        print(f" Webhook 신호 전송 시도: {self.webhook_url}")
-        try:
-            response = requests.get(self.webhook_url, verify=False, timeout=5)
-            response.raise_for_status() 
-            print(f"✅ Webhook 전송 성공. 응답 코드: {response.status_code}")
-            return True
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Webhook 전송 실패: {e}")
-            return False
-        except Exception as e:
-            print(f"❌ Webhook 전송 중 예기치 않은 오류 발생: {e}")
-            return False
+
+        targets = [ep for ep in self.endpoints if endpoints is None or ep['name'] in endpoints]
+        futures = {self.executor.submit(self._send_one, ep, message): ep for ep in targets}
+        results = {}
+        for future in as_completed(futures):
+            ep = futures[future]
+            try:
+                results[ep['name']] = future.result()
+            except Exception as e:
+                print(f"❌ Webhook [{ep['name']}] 전송 중 예기치 않은 오류 발생: {e}")
+                results[ep['name']] = False
+        self.last_failed = [name for name, ok in results.items() if not ok]
+
+        required = [ep['name'] for ep in self.endpoints if ep['required']]
+        if required:
+            # 이번에 보내지 않은 필수 엔드포인트는 앞선 시도에서 이미 성공한 것
+            return all(results.get(name, True) for name in required)
+        return any(results.values())
+
+    def _send_one(self, ep, message):
+        for attempt in range(ep['retries'] + 1):
+            if attempt and self._stop_event.wait(min(RETRY_BACKOFF_BASE * (2 ** (attempt - 1)), RETRY_BACKOFF_MAX)):
+                break
+            t0 = time.perf_counter()
+            try:
+                if ep['method'] == 'POST':
+                    payload = {'message': message, 'ts': time.time()}
+                    response = self.session.post(ep['url'], json=payload, verify=self.verify, timeout=ep['timeout'])
+                else:
+                    response = self.session.get(ep['url'], verify=self.verify, timeout=ep['timeout'])
+                response.raise_for_status()
+                latency_ms = (time.perf_counter() - t0) * 1000
+                self.latency[ep['name']].add(latency_ms)
+                print(f"✅ Webhook [{ep['name']}] 전송 성공. 응답 코드: {response.status_code} ({latency_ms:.0f}ms)")
+                return True
+            except requests.exceptions.RequestException as e:
+                self.latency[ep['name']].add((time.perf_counter() - t0) * 1000)
+                print(f"❌ Webhook [{ep['name']}] 전송 실패 ({attempt + 1}/{ep['retries'] + 1}): {e}")
+        self.failures[ep['name']] += 1
+        return False
+
+    def _keepalive_loop(self):
+        while not self._stop_event.wait(self.keepalive_interval):
+            for ep in self.endpoints:
+                origin = '/'.join(ep['url'].split('/')[:3]) + '/'
+                try:
+                    self.session.head(origin, verify=self.verify, timeout=ep['timeout'])
+                except requests.exceptions.RequestException:
+                    pass
+
+    def get_metrics(self):
+        return {
+            name: {'failures': self.failures[name], 'latency_ms': stats.summary(), 'histogram': stats.histogram()}
+            for name, stats in self.latency.items()
+        }
 
     def close(self):
-        """소켓 클라이언트와의 호환성을 위한 메서드."""
-        pass
+        """연결 풀과 전송 스레드를 정리합니다."""
+        self._stop_event.set()
+        self.executor.shutdown(wait=False)
+        self.session.close()
@@ -1,8 +1,5 @@
 # main_dev.py
 
-from ultralytics import YOLO
-import subprocess
-import torch
 import time
 import sys
 import os
@@ -13,60 +10,55 @@ import numpy as np
 import threading
 from datetime import datetime, date
 from pathlib import Path
-from queue import Queue, Empty
 
 # 사용자 정의 라이브러리
-from lib.utils import format_timestamp
+from lib.startup import StartupTimer       # 가장 먼저 import (시작 시각 기준)
+from lib.utils import format_timestamp, wait_for_pending_uploads, start_unsent_retry
 from lib.video_processor import process_video
-from lib.service_manager import DriveManager
-from lib.warning_client_manager import RPIClient, WebhookClient
-
-OUR_MODEL = 'lib/model/251120_s_best.pt'
-# OUR_MODEL = 'lib/model/250912_s_best.pt'
+from lib.storage_backend import create_storage_backend
+from lib.db_writer import ViolationDBWriter
+from lib.warning_client_manager import RPIClient, FramedRPIClient, WebhookClient, parse_webhook_endpoints
+from lib.alert_dispatcher import AlertDispatcher
+from lib.farm_config import parse_farm_config, FarmConfigError, FarmConfigWatcher
+from lib.heartbeat import Heartbeat
+from lib.tracker import create_tracker
+from lib.pipeline_state import PipelineState, get_snapshot_path
+from lib.model_registry import get_model_registry
+from lib.retention_manager import create_retention_manager
+from lib.segment_recorder import SegmentRecorder, get_segment_dir
+from lib.qos import create_qos_controller
+from lib.event_stream import create_event_stream
+from lib.preview_server import create_preview_server
+from lib.frame_source import create_frame_source
 
 # =========================================================
 # 1. 설정 로드 및 Factory 로직
 # =========================================================
 def load_farm_config(config_path, farm_name):
-    if not os.path.exists(config_path):
-        print(f"❌ 설정 파일을 찾을 수 없습니다: {config_path}")
+    try:
+        return parse_farm_config(config_path, farm_name)
+    except FarmConfigError as e:
+        print(f"❌ {e}")
         sys.exit(1)
 
-    cfg = configparser.ConfigParser()
-    cfg.read(config_path, encoding='utf-8')
-    
-    if farm_name not in cfg:
-        print(f"❌ 설정 파일에 [{farm_name}] 섹션이 없습니다.")
-        sys.exit(1)
-    
-    farm_config = dict(cfg[farm_name])
-    
-    # [DEFAULT] 섹션의 템플릿 상속 확인
-    if 'webhook_template' not in farm_config and 'webhook_template' in cfg['DEFAULT']:
-        farm_config['webhook_template'] = cfg['DEFAULT']['webhook_template']
-
-    def safe_get(key, default, type_func):
-        val = farm_config.get(key)
-        if not val:  # 값이 없거나 빈 문자열('')인 경우
-            return default
+def preload_model(farm_config, threads=None):
+    """
+    torch 스레드 수를 맞춘 뒤 모델을 로드하고 빈 프레임으로 한 번 추론합니다. (시작 시 백그라운드 실행)
+    torch/ultralytics import도 여기서 처음 일어나므로 다른 시작 단계와 겹쳐서 진행됩니다.
+    """
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
         try:
-            return type_func(val)
-        except (ValueError, TypeError):
-            print(f"⚠️ [{key}] 설정값 오류('{val}'). 기본값 {default}을 사용합니다.")
-            return default
-
-    # 형변환
-    farm_config['farm_code'] = safe_get('farm_code', int(farm_config.get('cd', 0)), int)
-        
-    if farm_config['farm_code'] == 0:
-        print("❌ 'farm_code' 설정 누락. DB 기록 불가.")
-        sys.exit(1)
-
-    farm_config['pig_reenter_thresh'] = safe_get('pig_reenter_thresh', 0.35, float)
-    farm_config['worker_conf'] = safe_get('worker_conf', 0.6, float)
-    farm_config['motion_threshold'] = safe_get('motion_threshold', 300, int)
-    
-    return farm_config
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass
+    model = get_model_registry().acquire(farm_config.get('model'))
+    try:
+        model.predict(np.zeros((384, 640, 3), dtype=np.uint8), verbose=False)     # 첫 프레임 지연(초기화) 미리 처리
+    except Exception as e:
+        print(f"⚠️ 모델 워밍업 실패: {e}")
+    return model
 
 def create_warning_client(farm_config):
     w_type = farm_config.get('warning_type', 'none').lower()
@@ -77,7 +69,15 @@ def create_warning_client(farm_config):
         host = farm_config.get('host')
         port = farm_config.get('port')
         if host and port:
-            print(f"🔌 [{farm_code}] 경고 장치: RPI Socket ({host}:{port})")
+            protocol = (farm_config.get('rpi_protocol') or 'raw').lower()
+            print(f"🔌 [{farm_code}] 경고 장치: RPI Socket ({host}:{port}, {protocol})")
+            if protocol == 'framed':
+                return FramedRPIClient(
+                    host, int(port),
+                    heartbeat_interval=farm_config['rpi_heartbeat_interval'],
+                    heartbeat_timeout=farm_config['rpi_heartbeat_timeout'],
+                    ack_timeout=farm_config['rpi_ack_timeout'],
+                )
             return RPIClient(host, int(port))
         else:
             print("❌ RPI 설정 오류: host/port 누락")
@@ -97,13 +97,21 @@ def create_warning_client(farm_config):
             except KeyError:
                 pass
 
+        # 3. 부가 엔드포인트 (대시보드, 메시지 릴레이 등)
+        endpoints = parse_webhook_endpoints(farm_config.get('webhook_endpoints'))
+
         # URL이 없거나 비어있으면 None 반환
-        if not url:
+        if not url and not endpoints:
             print(f"⚠️ [{farm_code}] Webhook 설정이 비어있습니다. 경광등 기능 없이 모니터링만 수행합니다.")
             return None
         
-        print(f"🔗 [{farm_code}] 경고 장치: Webhook ({url})")
-        return WebhookClient(url)
+        print(f"🔗 [{farm_code}] 경고 장치: Webhook ({url or '-'}, 부가 엔드포인트 {len(endpoints)}개)")
+        return WebhookClient(
+            url, endpoints,
+            timeout=farm_config['webhook_timeout'],
+            retries=farm_config['webhook_retries'],
+            keepalive_interval=farm_config['webhook_keepalive'],
+        )
 
     print(f"🚫 [{farm_code}] 경고 장치 미사용")
     return None
@@ -142,6 +150,10 @@ class DailyCountManager:
         self.last_save_date = date.today()
         self.lock = threading.Lock()
         self._stop_event = threading.Event()
+        self.event_hook = None      # event_hook("count", {...}): 증감/일자 변경 알림 (이벤트 스트림)
+
+    def _notify(self, delta, count):
+        if self.event_hook: self.event_hook("count", {"delta": delta, "count": count, "date": self.last_save_date.isoformat()})
 
     def load_initial_count(self):
         if not self.farm_cd: return
@@ -179,9 +191,11 @@ class DailyCountManager:
             if 'conn' in locals() and conn.open: conn.close()
 
     def increment(self):
-        with self.lock: self.count += 1; return self.count
+        with self.lock: self.count += 1; count = self.count
+        self._notify(+1, count); return count
     def decrement(self):
-        with self.lock: self.count -= 1; return self.count
+        with self.lock: self.count -= 1; count = self.count
+        self._notify(-1, count); return count
     def get_current_count(self):
         with self.lock: return self.count
 
@@ -194,13 +208,18 @@ class DailyCountManager:
                     if yesterday_cnt > 0: self.save_or_update_count(self.last_save_date, yesterday_cnt)
                     with self.lock:
                         self.count = 0; self.last_save_date = today
+                    self._notify(0, 0)
                 else:
                     curr = self.get_current_count()
                     if curr > 0: self.save_or_update_count(today, curr)
                 self._stop_event.wait(60)
             except Exception: self._stop_event.wait(60)
 
-    def stop(self): self._stop_event.set()
+    def stop(self):
+        self._stop_event.set()
+        # 주기 저장(60초) 사이에 늘어난 출하량이 재시작으로 사라지지 않도록 종료 시 한 번 더 저장
+        curr = self.get_current_count()
+        if curr > 0: self.save_or_update_count(self.last_save_date, curr)
 
 # =========================================================
 # 3. 메인 로직
@@ -216,89 +235,96 @@ def log_connection_status(db_config, farm_cd, status):
     finally:
         if 'conn' in locals() and conn.open: conn.close()
 
-def ffmpeg_frame_reader(proc_stdout, queue, size, stop_ev):
-    while not stop_ev.is_set():
-        try:
-            raw = proc_stdout.read(size)
-            if len(raw) == size: queue.put(raw)
-            else: break
-        except: break
-
-def main_rtsp(rtsp_url, gdrive, db_config, warning_client, farm_cd, conn_status, shutdown, count_mgr, farm_config):
+def main_rtsp(rtsp_url, storage, db_config, db_writer, warning_client, farm_cd, conn_status, shutdown, count_mgr, farm_config, config_watcher=None, heartbeat=None, state=None,
+              event_hook=None, display=True, preview=None, startup=None):
     width, height = 640, 384
-    frame_size = width * height * 3
     fps = 15.0
-    model = YOLO(OUR_MODEL)
+    # 모델은 farm_config의 model 값으로 레지스트리에서 선택 (lib/model_registry.ini)
+    # 첫 연결 후에 가져오므로, 시작 시 백그라운드 모델 로드와 스트림 연결이 동시에 진행됨
+    registry = get_model_registry()
+    tracker = None
+    # 과부하 시 품질 단계를 낮춰 지연이 쌓이지 않도록 함 (재연결 간 단계 유지)
+    qos = create_qos_controller(farm_config, fps)
+    if heartbeat and qos: heartbeat.add_source('qos', qos.get_metrics)
     
     print(f"🚀 RTSP 시작 (Farm: {farm_cd})")
 
-    while True:
-        if shutdown['manual_quit']: break
-        process, reader = None, None
-        stop_ev = threading.Event()
-        queue = Queue(maxsize=30)
-        first_raw = None
-
-        try:
-            process = subprocess.Popen([
-                "ffmpeg", "-rtsp_transport", "tcp", "-i", rtsp_url, "-vf", f"scale={width}:{height}",
-                "-f", "rawvideo", "-pix_fmt", "bgr24", "-vcodec", "rawvideo", "-loglevel", "warning", "-"
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=10**8)
-            
-            time.sleep(2)
-            if process.poll() is not None: raise RuntimeError("FFmpeg Start Fail")
-
-            reader = threading.Thread(target=ffmpeg_frame_reader, args=(process.stdout, queue, frame_size, stop_ev), daemon=True)
-            reader.start()
+    try:
+        while True:
+            if shutdown['manual_quit']: break
+            connect_start = time.perf_counter()
+            # 프레임 입력: frame_source = ffmpeg(하위 프로세스 파이프, 기본) | pyav(프로세스 내 디코딩)
+            source = create_frame_source(farm_config, rtsp_url, width, height, on_event=event_hook)
 
             try:
-                first_raw = queue.get(timeout=5)
-                if len(first_raw) != frame_size: raise RuntimeError("Invalid Frame")
-            except Empty: raise RuntimeError("No Frame")
-
-            print("✅ 스트림 연결 성공")
-            if not conn_status['is_connected']:
-                log_connection_status(db_config, farm_cd, 'Y')
-                conn_status['is_connected'] = True
-
-            def get_frame():
-                nonlocal first_raw
-                if first_raw: d = first_raw; first_raw = None; return np.frombuffer(d, dtype=np.uint8).reshape((height, width, 3)).copy()
-                try: return np.frombuffer(queue.get(timeout=3), dtype=np.uint8).reshape((height, width, 3)).copy()
-                except: return None
-
-            # [중요] farm_config 전달
-            process_video(get_frame, model, gdrive, db_config, warning_client, shutdown, count_mgr, 
-                          farm_config=farm_config, fps=fps, width=width, height=height)
-
-        except RuntimeError as e:
-            if conn_status['is_connected']:
-                log_connection_status(db_config, farm_cd, 'N')
-                conn_status['is_connected'] = False
-            print(f"🔄 재연결 대기: {e}")
-            time.sleep(5)
-        except Exception as e:
-            print(f"❌ 오류: {e}")
-            break
-        finally:
-            if stop_ev: stop_ev.set()
-            if process: process.terminate()
+                source.open()       # 첫 프레임이 들어오면 바로 반환 (실패 시 FrameSourceError)
+
+                print(f"✅ 스트림 연결 성공 [{source.name}] ({time.perf_counter() - connect_start:.2f}s)")
+                if startup and startup.mark('first_frame'): startup.record('stream', time.perf_counter() - connect_start)
+
+                if tracker is None:
+                    if startup: startup.wait('model')       # 백그라운드 로드/워밍업이 끝날 때까지 대기
+                    model = registry.acquire(farm_config.get('model'))
+                    tracker = create_tracker(model, farm_config)
+                    if startup:
+                        tracker = startup.wrap_tracker(tracker)
+                        startup.mark('model_ready')
+                        startup.report()
+                if not conn_status['is_connected']:
+                    log_connection_status(db_config, farm_cd, 'Y')
+                    conn_status['is_connected'] = True
+                    if event_hook: event_hook("camera", {"connected": True})
+
+                get_frame = source.read
+                if heartbeat: get_frame = heartbeat.wrap(get_frame)
+                if qos: qos.backlog_func = source.backlog
+
+                # [중요] farm_config 전달
+                process_video(get_frame, tracker, storage, db_writer, warning_client, shutdown, count_mgr, 
+                              farm_config=farm_config, fps=fps, width=width, height=height, config_watcher=config_watcher,
+                              state=state, qos=qos, event_hook=event_hook, display=display, preview=preview)
+
+            except RuntimeError as e:
+                if conn_status['is_connected']:
+                    log_connection_status(db_config, farm_cd, 'N')
+                    conn_status['is_connected'] = False
+                    if event_hook: event_hook("camera", {"connected": False, "reason": str(e)})
+                print(f"🔄 재연결 대기: {e}")
+                if heartbeat: heartbeat.beat('reconnecting')
+                time.sleep(5)
+            except Exception as e:
+                print(f"❌ 오류: {e}")
+                break
+            finally:
+                source.close()
+    finally:
+        if tracker is not None: registry.release(farm_config.get('model'))
 
-def main_video(path, gdrive, db_config, warning_client, shutdown, count_mgr, farm_config, rec_path=None):
+def main_video(path, storage, db_writer, warning_client, shutdown, count_mgr, farm_config, rec_path=None, config_watcher=None, heartbeat=None,
+               event_hook=None, display=True, preview=None, startup=None):
     from cv2 import VideoCapture
     cap = VideoCapture(path)
     if not cap.isOpened(): return
     fps = cap.get(5)
-    model = YOLO(OUR_MODEL)
-    if torch.cuda.is_available(): model.to('cuda')
+    registry = get_model_registry()
+    if startup: startup.wait('model')
+    model = registry.acquire(farm_config.get('model'))
+    tracker = create_tracker(model, farm_config)
+    if startup:
+        tracker = startup.wrap_tracker(tracker)
+        startup.mark('model_ready')
+        startup.report()
     
     def get_frame():
         ret, f = cap.read()
         return f if ret else None
+    if heartbeat: get_frame = heartbeat.wrap(get_frame)
 
-    process_video(get_frame, model, gdrive, db_config, warning_client, shutdown, count_mgr, 
-                  farm_config=farm_config, fps=fps, width=640, height=384, record_output_path=rec_path)
+    process_video(get_frame, tracker, storage, db_writer, warning_client, shutdown, count_mgr, 
+                  farm_config=farm_config, fps=fps, width=640, height=384, record_output_path=rec_path,
+                  config_watcher=config_watcher, event_hook=event_hook, display=display, preview=preview)
     cap.release()
+    registry.release(farm_config.get('model'))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -306,15 +332,24 @@ if __name__ == "__main__":
     group.add_argument("--rtsp", help="RTSP URL")
     group.add_argument("--video", help="Video path")
     parser.add_argument("--farm-name", required=True)
-    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--record", action="store_true", help="--video: 결과 화면 녹화 / --rtsp: 원본 스트림 세그먼트 녹화(재인코딩 없음)")
+    parser.add_argument("--threads", type=int, help="torch 연산 스레드 수 (supervisor.py가 CPU 할당량에 맞춰 지정)")
+    parser.add_argument("--heartbeat-file", help="생존 신호 파일 경로 (supervisor.py 감시용)")
+    parser.add_argument("--headless", action="store_true", help="화면 창 없이 실행 (미리보기는 preview_port 설정 시 웹으로)")
     args = parser.parse_args()
 
+    startup = StartupTimer()
+    startup.record('imports', startup.elapsed())
+    heartbeat = Heartbeat(args.heartbeat_file) if args.heartbeat_file else None
+
     # 1. Config 로드
     CONFIG_PATH = './lib/farm_config.ini'
     DB_PATH = './lib/db_info_config.ini'
     
-    farm_config = load_farm_config(CONFIG_PATH, args.farm_name)
+    farm_config = startup.phase('config', load_farm_config, CONFIG_PATH, args.farm_name)
     farm_idx = farm_config['farm_code']
+    # 모델 로드(수 초)는 기다리지 않고 시작, 나머지 준비/스트림 연결과 동시에 진행
+    model_future = startup.background('model', preload_model, farm_config, args.threads)
 
     # 2. DB Config
     db_p = configparser.ConfigParser()
@@ -326,31 +361,90 @@ if __name__ == "__main__":
         'cursorclass': pymysql.cursors.DictCursor
     }
 
-    # 3. Client & Drive & Counter
+    # 3. Client & Storage & Counter
     warning_client = create_warning_client(farm_config)
-    if warning_client and hasattr(warning_client, 'connect'): warning_client.connect()
+    if warning_client:
+        # 경고 장치 연결/전송은 전용 스레드에서 수행 (프레임 루프는 기다리지 않음)
+        warning_client = AlertDispatcher(
+            warning_client,
+            dedup_window=farm_config['alert_dedup_window'],
+            min_interval=farm_config['alert_min_interval'],
+            max_retries=farm_config['alert_max_retries'],
+        )
+        warning_client.connect()
     
-    drive_manager = DriveManager()
+    # 카운트/위반/움직임/카메라 연결 이벤트를 로컬 SSE로 전송 (event_stream_port 설정 시)
+    event_bus, event_server = create_event_stream(farm_config)
     count_manager = DailyCountManager(DB_CONFIG, farm_idx)
-    count_manager.load_initial_count()
+    count_manager.event_hook = event_bus
+    # 추적/배경 상태: 재연결 간에는 같은 객체를 재사용하고, 종료 시 스냅샷을 남겨 재시작 때 복원
+    snapshot_path = get_snapshot_path(farm_config)
+    # 서로 독립적인 시작 단계(저장소 인증 / 오늘 출하량 조회 / 상태 복원)를 동시에 실행
+    ready = startup.run_parallel({
+        'storage': lambda: create_storage_backend(farm_config),
+        'count': count_manager.load_initial_count,
+        'state': lambda: PipelineState.load(snapshot_path, farm_config, farm_config['state_snapshot_max_age']) if args.rtsp else None,
+    })
+    storage, pipeline_state = ready['storage'], ready['state']
     t = threading.Thread(target=count_manager.run_periodic_check, daemon=True)
     t.start()
+    db_writer = ViolationDBWriter(DB_CONFIG, farm_idx, farm_config['camera_id'], flush_interval=farm_config['db_flush_interval'])
+    db_writer.start()
+    # 업로드/DB 기록에 실패한 클립 재전송 (시작 시 + 백오프 간격, 최대 횟수 초과 시 보류 디렉터리로 이동)
+    unsent_retry = start_unsent_retry(
+        storage, db_writer,
+        interval=farm_config['unsent_retry_interval'],
+        max_attempts=farm_config['unsent_max_attempts'],
+        backoff_max=farm_config['unsent_retry_backoff_max'],
+        dead_letter_dir=farm_config['unsent_dead_letter_dir'],
+    )
+    # 임시 클립/녹화/DB 오류 로그 디스크 사용량 관리 (업로드 대기 중인 클립은 삭제하지 않음)
+    retention = create_retention_manager(farm_config)
+    if retention: retention.start()
 
     shutdown = {'manual_quit': False}
     conn = {'is_connected': False}
+    # 화면이 없는 환경(서비스/원격)에서는 자동으로 헤드리스, 결과 화면은 MJPEG 미리보기로 확인
+    display = not args.headless and (os.name == 'nt' or bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY')))
+    if not display: print("🖥️ 헤드리스 모드 (화면 창 없음)")
+    preview_server = create_preview_server(farm_config, shutdown)
+    preview = preview_server.hub if preview_server else None
+    # 라인/임계값 등 감지 설정은 파일 변경 시 재시작 없이 반영
+    config_watcher = FarmConfigWatcher(CONFIG_PATH, args.farm_name, farm_config)
+
+    # 원본 스트림 세그먼트 녹화: 카메라 스트림을 그대로 복사 저장 (프레임 루프와 별도 ffmpeg 프로세스)
+    segment_recorder = None
+    if args.rtsp and (args.record or (farm_config.get('record_mode') or '').lower() == 'passthrough'):
+        farm_config['segment_dir'] = get_segment_dir(farm_config)
+        segment_recorder = SegmentRecorder(args.rtsp, farm_config['segment_dir'],
+                                           int(farm_config.get('segment_seconds') or 60)).start()
 
     try:
         if args.rtsp:
-            main_rtsp(args.rtsp, drive_manager, DB_CONFIG, warning_client, farm_idx, conn, shutdown, count_manager, farm_config)
+            main_rtsp(args.rtsp, storage, DB_CONFIG, db_writer, warning_client, farm_idx, conn, shutdown, count_manager, farm_config, config_watcher, heartbeat,
+                      pipeline_state, event_bus, display, preview, startup)
         elif args.video:
             rec_path = None
             if args.record:
                 Path("./recorded_videos").mkdir(exist_ok=True)
                 rec_path = f"./recorded_videos/{Path(args.video).stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-            main_video(args.video, drive_manager, DB_CONFIG, warning_client, shutdown, count_manager, farm_config, rec_path)
+            main_video(args.video, storage, db_writer, warning_client, shutdown, count_manager, farm_config, rec_path, config_watcher, heartbeat,
+                       event_bus, display, preview, startup)
     except KeyboardInterrupt: pass
     finally:
-        if args.rtsp and conn['is_connected']: log_connection_status(DB_CONFIG, farm_idx, 'N')
+        if args.rtsp and conn['is_connected']:
+            log_connection_status(DB_CONFIG, farm_idx, 'N')
+            if event_bus: event_bus("camera", {"connected": False, "reason": "shutdown"})
         if warning_client: warning_client.close()
+        if pipeline_state: pipeline_state.save(snapshot_path)
+        if segment_recorder: segment_recorder.stop()
         count_manager.stop()
+        unsent_retry.set()
+        wait_for_pending_uploads()
+        db_writer.stop()
+        if retention: retention.stop()
+        if event_server: event_server.stop()
+        if preview_server: preview_server.stop()
+        if model_future.done() and model_future.exception() is None: get_model_registry().release(farm_config.get('model'))
+        if heartbeat: heartbeat.beat('stopped')
         print("연결 종료.")
\ No newline at end of file
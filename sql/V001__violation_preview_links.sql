@@ -0,0 +1,4 @@
+-- 위반 이벤트 미리보기 이미지 링크 (키프레임 / 컨택트 시트)
+ALTER TABLE dc_biosec_violation_hist
+    ADD COLUMN thumbnail_drive_link_addr VARCHAR(500) NULL AFTER snapshot_drive_link_addr,
+    ADD COLUMN contact_sheet_drive_link_addr VARCHAR(500) NULL AFTER thumbnail_drive_link_addr;
@@ -0,0 +1,12 @@
+-- 위반 건수 롤업 (농장 / 일자 / 시간 / 탐지 유형)
+-- ViolationDBWriter가 증분 반영, 재구성: python -m lib.violation_rollup backfill
+CREATE TABLE IF NOT EXISTS dc_biosec_violation_rollup (
+    farm_div_cd              INT         NOT NULL,
+    event_dt                 DATE        NOT NULL,
+    event_hh                 TINYINT     NOT NULL,
+    detection_target_div_cd  VARCHAR(2)  NOT NULL,
+    violation_cnt            INT         NOT NULL DEFAULT 0,
+    upd_dttm                 DATETIME    NOT NULL,
+    PRIMARY KEY (farm_div_cd, event_dt, event_hh, detection_target_div_cd),
+    KEY idx_violation_rollup_dt (event_dt)
+);
@@ -0,0 +1,8 @@
+-- 위반 이력에 농장 코드 / 카메라 ID 기록 및 농장별 기간 조회 인덱스
+-- 기존 행의 farm_div_cd는 NULL로 남으며, 단일 농장 DB는 아래로 채울 수 있습니다.
+--   python -m lib.db_migrate stamp-farm --farm-code <코드>
+ALTER TABLE dc_biosec_violation_hist
+    ADD COLUMN farm_div_cd INT NULL AFTER contact_sheet_drive_link_addr,
+    ADD COLUMN camera_id VARCHAR(64) NULL AFTER farm_div_cd;
+
+CREATE INDEX idx_violation_hist_farm_dttm ON dc_biosec_violation_hist (farm_div_cd, event_dttm);
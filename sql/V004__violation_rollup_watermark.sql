@@ -0,0 +1,8 @@
+-- 롤업 반영 시작 시각 (농장별). covered_from 이후 위반은 롤업에 모두 반영되어 있음
+-- ViolationDBWriter가 첫 증분 때 기록하고, backfill이 앞쪽으로 넓힙니다.
+-- 주간 보고서는 이 시각 이전 구간을 원본 이력에서 집계합니다.
+CREATE TABLE IF NOT EXISTS dc_biosec_violation_rollup_watermark (
+    farm_div_cd   INT       NOT NULL PRIMARY KEY,
+    covered_from  DATETIME  NOT NULL,
+    upd_dttm      DATETIME  NOT NULL
+);
@@ -0,0 +1,265 @@
+# supervisor.py
+'''
+    release date: 2026-10-19
+        - farm_config.ini의 농장 섹션(rtsp_url 설정)마다 main.py 파이프라인을 실행/감시
+        - 농장별 CPU 고정(sched_setaffinity) + torch/OpenMP 스레드 수를 할당 CPU 수에 맞춤
+        - 하트비트 파일 지연 / 처리 FPS 하한 미달 시 정상 종료(SIGINT) 후 백오프 재시작
+    사용법:
+        python supervisor.py [--config ./lib/farm_config.ini] [--farms FARM_A,FARM_B]
+    농장 섹션 설정 (생략 시 [DEFAULT] 또는 기본값):
+        rtsp_url = rtsp://...           ; 없으면 감시 대상에서 제외
+        supervise = yes                 ; no면 제외
+        cpu_set = 0-3                   ; 생략 시 남은 CPU를 농장 수만큼 균등 분할
+        threads = 4                     ; 생략 시 할당 CPU 수
+        heartbeat_timeout = 60          ; 하트비트가 이 시간(초) 이상 갱신되지 않으면 재시작
+        min_fps = 5                     ; 처리 FPS가 fps_grace초 이상 이 값 미만이면 재시작
+        fps_grace = 30
+        startup_grace = 180             ; 시작 직후(모델 로드/첫 연결) 감시 유예
+        restart_backoff_max = 300
+        stop_timeout = 90               ; SIGINT 후 main.py 마무리(녹화/업로드/DB 기록)를 기다리는 시간, 초과 시 강제 종료
+'''
+
+import argparse
+import configparser
+import os
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from lib.heartbeat import read_heartbeat
+
+DEFAULT_SETTINGS = {
+    'heartbeat_timeout': 60.0,
+    'min_fps': 5.0,
+    'fps_grace': 30.0,
+    'startup_grace': 180.0,
+    'restart_backoff_max': 300.0,
+    # main.py 종료 시 녹화 정지(~10s) + 업로드 대기(30s) + DB 기록(10s) + 기타 스레드 정리보다 길어야 함
+    'stop_timeout': 90.0,
+}
+MIN_STOP_TIMEOUT = 60       # 이보다 짧으면 경고
+BACKOFF_BASE = 5.0
+STABLE_SECONDS = 600        # 이 시간 이상 정상 실행 후 멈춘 경우 백오프 초기화
+
+
+def parse_cpu_set(spec):
+    """'0-3,6' -> [0, 1, 2, 3, 6]"""
+    cpus = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part: continue
+        if '-' in part:
+            lo, hi = part.split('-', 1)
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(part))
+    return sorted(cpus)
+
+
+def get_available_cpus():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def assign_cpus(farms, available):
+    """cpu_set이 지정되지 않은 농장에 남은 CPU를 연속 구간으로 균등 분할합니다. (부족하면 공유)"""
+    reserved = {c for f in farms if f.cpus for c in f.cpus}
+    free = [c for c in available if c not in reserved] or available
+    pending = [f for f in farms if not f.cpus]
+    if not pending: return
+    size = max(1, len(free) // len(pending))
+    for i, farm in enumerate(pending):
+        start = (i * size) % len(free)
+        farm.cpus = free[start:start + size] or free[:size]
+
+
+class FarmProcess:
+    def __init__(self, name, section, args):
+        self.name = name
+        self.rtsp_url = section['rtsp_url']
+        self.cpus = parse_cpu_set(section['cpu_set']) if section.get('cpu_set') else []
+        self.threads_override = int(section['threads']) if section.get('threads') else None
+        self.settings = {k: float(section.get(k) or v) for k, v in DEFAULT_SETTINGS.items()}
+        if self.settings['stop_timeout'] < MIN_STOP_TIMEOUT:
+            print(f"⚠️ [{name}] stop_timeout {self.settings['stop_timeout']:g}s는 main.py 종료 처리(약 {MIN_STOP_TIMEOUT}s)보다 "
+                  f"짧아 업로드/DB 기록 중 강제 종료될 수 있습니다.")
+        self.heartbeat_path = os.path.abspath(os.path.join(args.run_dir, f"{name}.heartbeat.json"))
+        self.log_path = os.path.join(args.log_dir, f"{name}.log")
+        self.python = args.python
+
+        self.proc = None
+        self.log_file = None
+        self.stop_deadline = None
+        self.started_at = None
+        self.next_start = 0.0
+        self.failures = 0
+        self.restarts = 0
+        self.below_floor_since = None
+        self.last_reason = None
+
+    @property
+    def threads(self):
+        return self.threads_override or max(1, len(self.cpus))
+
+    def start(self):
+        env = dict(os.environ)
+        for key in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+            env[key] = str(self.threads)
+        env['PYTHONUNBUFFERED'] = '1'
+
+        cmd = [
+            self.python, 'main.py', '--rtsp', self.rtsp_url, '--farm-name', self.name,
+            '--threads', str(self.threads), '--heartbeat-file', self.heartbeat_path, '--headless',
+        ]
+        cpus = self.cpus
+        preexec = (lambda: os.sched_setaffinity(0, cpus)) if cpus and hasattr(os, 'sched_setaffinity') else None
+
+        if os.path.exists(self.heartbeat_path): os.remove(self.heartbeat_path)
+        self.log_file = open(self.log_path, 'a', encoding='utf-8')
+        self.log_file.write(f"\n===== {datetime.now():%Y-%m-%d %H:%M:%S} 시작 (재시작 {self.restarts}회) =====\n")
+        self.log_file.flush()
+        self.proc = subprocess.Popen(cmd, stdout=self.log_file, stderr=subprocess.STDOUT, env=env, preexec_fn=preexec)
+        self.started_at = time.time()
+        self.below_floor_since = None
+        print(f"🚀 [{self.name}] 시작 pid={self.proc.pid}, CPU {self.cpus or '전체'}, 스레드 {self.threads}")
+
+    def check(self, now):
+        """재시작이 필요하면 사유 문자열을, 정상이면 None을 반환합니다."""
+        rc = self.proc.poll()
+        if rc is not None:
+            return f"프로세스 종료 (코드 {rc})"
+
+        uptime = now - self.started_at
+        if uptime < self.settings['startup_grace']: return None
+
+        hb = read_heartbeat(self.heartbeat_path)
+        if not hb or hb.get('pid') != self.proc.pid:
+            return "하트비트 없음"
+        age = now - hb['ts']
+        if age > self.settings['heartbeat_timeout']:
+            return f"하트비트 지연 {age:.0f}s ({hb.get('state')})"
+
+        if hb.get('state') == 'running' and hb.get('fps', 0) < self.settings['min_fps']:
+            if self.below_floor_since is None: self.below_floor_since = now
+            elif now - self.below_floor_since > self.settings['fps_grace']:
+                return f"처리 속도 저하 {hb.get('fps')} fps < {self.settings['min_fps']}"
+        else:
+            self.below_floor_since = None
+        return None
+
+    def interrupt(self):
+        """SIGINT만 보내고 바로 반환합니다. (여러 농장을 동시에 종료할 때 wait_stopped와 나눠 호출)"""
+        if self.proc and self.proc.poll() is None and self.stop_deadline is None:
+            # SIGINT: main.py의 finally 블록(업로드 대기, DB 기록 마무리)이 실행되도록
+            self.proc.send_signal(signal.SIGINT)
+            self.stop_deadline = time.time() + self.settings['stop_timeout']
+
+    def wait_stopped(self):
+        if self.proc and self.proc.poll() is None:
+            try:
+                self.proc.wait(max(0.0, (self.stop_deadline or time.time()) - time.time()))
+            except subprocess.TimeoutExpired:
+                print(f"⚠️ [{self.name}] 정상 종료 시간({self.settings['stop_timeout']:g}s) 초과, 강제 종료")
+                self.proc.kill()
+                self.proc.wait()
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+        self.proc = None
+        self.stop_deadline = None
+
+    def stop(self):
+        self.interrupt()
+        self.wait_stopped()
+
+    def schedule_restart(self, now, reason):
+        ran = now - self.started_at if self.started_at else 0
+        if ran >= STABLE_SECONDS: self.failures = 0
+        delay = min(self.settings['restart_backoff_max'], BACKOFF_BASE * (2 ** self.failures))
+        self.failures += 1
+        self.restarts += 1
+        self.last_reason = reason
+        self.next_start = now + delay
+        print(f"🔄 [{self.name}] {reason} → {delay:.0f}초 후 재시작 (누적 {self.restarts}회)")
+
+    def status_line(self):
+        hb = read_heartbeat(self.heartbeat_path) if self.proc else None
+        pid = self.proc.pid if self.proc else '-'
+        state = hb.get('state') if hb else ('대기' if not self.proc else '-')
+        fps = hb.get('fps') if hb else '-'
+        qos = (hb or {}).get('qos')
+        qos_str = f" | QoS {qos['level']}" if qos else ''
+        return f"{self.name} | pid {pid} | {state} | {fps} fps{qos_str} | 재시작 {self.restarts} | {self.last_reason or ''}"
+
+
+def load_farms(config_path, only, args):
+    cfg = configparser.ConfigParser()
+    cfg.read(config_path, encoding='utf-8')
+    farms = []
+    for name in cfg.sections():
+        if only and name not in only: continue
+        section = cfg[name]
+        if not section.get('rtsp_url'): continue
+        if section.get('supervise', 'yes').lower() in ('no', 'false', '0'): continue
+        farms.append(FarmProcess(name, section, args))
+    return farms
+
+
+def run(farms, check_interval=5.0, status_interval=60.0):
+    stopping = {'flag': False}
+
+    def _on_signal(signum, frame):
+        stopping['flag'] = True
+    signal.signal(signal.SIGINT, _on_signal)
+    signal.signal(signal.SIGTERM, _on_signal)
+
+    last_status = time.time()
+    try:
+        while not stopping['flag']:
+            now = time.time()
+            for farm in farms:
+                if farm.proc is None:
+                    if now >= farm.next_start: farm.start()
+                    continue
+                reason = farm.check(now)
+                if reason:
+                    farm.stop()
+                    farm.schedule_restart(now, reason)
+
+            if now - last_status >= status_interval:
+                print(f"[{datetime.now():%H:%M:%S}] " + " / ".join(f.status_line() for f in farms))
+                last_status = now
+            time.sleep(check_interval)
+    finally:
+        print("🛑 감독 종료: 파이프라인을 정리합니다...")
+        # 모든 농장에 먼저 SIGINT를 보내 마무리를 동시에 진행 (농장 수만큼 대기 시간이 늘지 않도록)
+        for farm in farms:
+            farm.interrupt()
+        for farm in farms:
+            farm.wait_stopped()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="./lib/farm_config.ini")
+    parser.add_argument("--farms", help="감시할 농장 섹션 (쉼표 구분, 생략 시 rtsp_url이 있는 전체)")
+    parser.add_argument("--python", default=sys.executable)
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--run-dir", default="run")
+    parser.add_argument("--check-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    os.makedirs(args.run_dir, exist_ok=True)
+
+    only = set(args.farms.split(',')) if args.farms else None
+    farms = load_farms(args.config, only, args)
+    if not farms:
+        print("❌ 실행할 농장이 없습니다. (농장 섹션에 rtsp_url을 설정하세요)")
+        sys.exit(1)
+
+    assign_cpus(farms, get_available_cpus())
+    run(farms, args.check_interval)
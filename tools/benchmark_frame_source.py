@@ -0,0 +1,90 @@
+'''
+    release date: 2026-10-19
+        - 프레임 입력 방식 비교 벤치마크: ffmpeg 파이프(하위 프로세스) / PyAV(프로세스 내 디코딩)
+        - 첫 프레임까지 시간, 수신 fps, 프레임 간격 p50/p95, CPU 사용률(하위 프로세스 포함), 버린 프레임 수 출력
+        - 검출 없이 입력만 측정하므로 --consume-ms로 프레임당 처리 시간을 흉내 내 밀림/버림 동작도 확인 가능
+    사용법:
+        python -m tools.benchmark_frame_source --url rtsp://... [--seconds 30] [--sources ffmpeg,pyav] [--consume-ms 40]
+'''
+
+import argparse
+import os
+import resource
+import time
+
+from lib.frame_source import FRAME_SOURCES, FrameSourceError
+
+WIDTH, HEIGHT = 640, 384
+
+
+def cpu_seconds():
+    """현재 프로세스 + 종료된 하위 프로세스의 CPU 시간 (ffmpeg 파이프 비용 포함)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def percentile(values, q):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def run_source(kind, url, seconds, consume_ms):
+    source = FRAME_SOURCES[kind](url, WIDTH, HEIGHT)
+    t0 = time.perf_counter()
+    cpu0 = cpu_seconds()
+    try:
+        source.open()
+    except (FrameSourceError, RuntimeError) as e:
+        return {'error': str(e)}
+    first_frame = time.perf_counter() - t0
+
+    gaps, last, pts_values = [], time.perf_counter(), []
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            frame = source.read()
+            if frame is None: break
+            now = time.perf_counter()
+            gaps.append((now - last) * 1000); last = now
+            if source.pts is not None: pts_values.append(source.pts)
+            if consume_ms: time.sleep(consume_ms / 1000)
+        elapsed = time.perf_counter() - t0 - first_frame
+    finally:
+        source.close()
+    # ffmpeg 하위 프로세스 CPU 시간은 종료(wait) 후에 집계되므로 close 뒤에 측정
+    if getattr(source, 'process', None): source.process.wait(5)
+    cpu = cpu_seconds() - cpu0
+
+    return {
+        'first_frame_s': round(first_frame, 2),
+        'frames': source.frames,
+        'fps': round(source.frames / elapsed, 2) if elapsed > 0 else 0.0,
+        'gap_p50_ms': round(percentile(gaps, 50), 1),
+        'gap_p95_ms': round(percentile(gaps, 95), 1),
+        'cpu_pct': round(cpu / (time.perf_counter() - t0) * 100, 1),
+        'dropped': source.dropped,
+        'pts': 'O' if pts_values else '-',
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True, help="RTSP URL")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--sources", default="ffmpeg,pyav")
+    parser.add_argument("--consume-ms", type=float, default=0, help="프레임당 처리 시간 흉내(ms)")
+    args = parser.parse_args()
+
+    print(f"CPU {os.cpu_count()}개, {WIDTH}x{HEIGHT}, {args.seconds:g}초, 처리 흉내 {args.consume_ms:g}ms")
+    print(f"{'source':8} | {'첫프레임':>7} | {'frames':>6} | {'fps':>6} | {'p50':>6} | {'p95':>6} | {'CPU%':>6} | {'버림':>4} | PTS")
+    for kind in args.sources.split(','):
+        kind = kind.strip()
+        if kind not in FRAME_SOURCES:
+            print(f"{kind:8} | 알 수 없는 입력 방식"); continue
+        r = run_source(kind, args.url, args.seconds, args.consume_ms)
+        if 'error' in r:
+            print(f"{kind:8} | 실패: {r['error']}"); continue
+        print(f"{kind:8} | {r['first_frame_s']:>6}s | {r['frames']:>6} | {r['fps']:>6} | {r['gap_p50_ms']:>5}ms | "
+              f"{r['gap_p95_ms']:>5}ms | {r['cpu_pct']:>5}% | {r['dropped']:>4} | {r['pts']}")
@@ -0,0 +1,177 @@
+'''
+    release date: 2026-10-19
+        - 추적기 비교 벤치마크: builtin(ByteTracker) / ultralytics + tracker_custom.yaml / ultralytics 기본(botsort.yaml)
+        - 프레임당 추적 비용(ms)과 ID 교체 지표 출력
+          정답(--gt, MOT 형식: frame,id,x,y,w,h[,...])이 있으면 실제 ID switch 수,
+          없으면 '끊긴 트랙 근처에서 새 ID가 생긴 횟수'를 ID 교체 추정치로 사용
+    사용법:
+        python -m tools.benchmark_tracker --video sample.mp4 [--frames 1500] [--gt sample_gt.txt]
+            [--config ./lib/farm_config.ini --farm-name FARM_A]
+'''
+
+import argparse
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from lib.tracker import ByteTracker, TRACKER_CONFIG_PATH, iou_matrix, linear_assignment
+
+DEFAULT_MODEL = 'lib/model/251120_s_best.pt'
+WIDTH, HEIGHT = 640, 384
+
+
+def read_frames(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        ret, frame = cap.read()
+        if not ret: break
+        frames.append(cv2.resize(frame, (WIDTH, HEIGHT)))
+    cap.release()
+    return frames
+
+
+def detect_all(model, frames, conf):
+    """검출 결과를 미리 구해 두고 순수 연관(association) 비용만 따로 측정합니다."""
+    detections, elapsed = [], 0.0
+    for frame in frames:
+        t0 = time.perf_counter()
+        boxes = model.predict(frame, verbose=False, conf=conf)[0].boxes
+        elapsed += time.perf_counter() - t0
+        detections.append((boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)))
+    return detections, elapsed / max(len(frames), 1) * 1000
+
+
+def run_builtin(detections, params):
+    tracker = ByteTracker(**params)
+    tracks, elapsed = [], 0.0
+    for boxes, scores, classes in detections:
+        t0 = time.perf_counter()
+        out = tracker.update(boxes, scores, classes)
+        elapsed += time.perf_counter() - t0
+        tracks.append([(tid, cls, box) for tid, cls, _, box in out])
+    return tracks, elapsed / max(len(detections), 1) * 1000
+
+
+def run_ultralytics(model_path, frames, tracker_config):
+    from ultralytics import YOLO
+    model = YOLO(model_path)        # persist 트래커 상태가 섞이지 않도록 실행마다 새로 로드
+    tracks, elapsed = [], 0.0
+    for frame in frames:
+        t0 = time.perf_counter()
+        boxes = model.track(frame, persist=True, verbose=False, tracker=tracker_config)[0].boxes
+        elapsed += time.perf_counter() - t0
+        items = []
+        if boxes.id is not None:
+            for tid, cls, box in zip(boxes.id.cpu().numpy(), boxes.cls.cpu().numpy(), boxes.xyxy.cpu().numpy()):
+                items.append((int(tid), int(cls), box))
+        tracks.append(items)
+    return tracks, elapsed / max(len(frames), 1) * 1000
+
+
+def track_stats(tracks, gap_frames=30, rebirth_iou=0.3):
+    """ID 수, 평균 트랙 길이, ID 교체 추정치(끊긴 트랙 근처에서 새 ID 생성)"""
+    first_seen, last_seen, lengths = {}, {}, defaultdict(int)
+    rebirths = 0
+    for frame_idx, items in enumerate(tracks):
+        for tid, cls, box in items:
+            lengths[tid] += 1
+            if tid not in first_seen:
+                first_seen[tid] = frame_idx
+                # 최근 gap_frames 안에 사라진 같은 클래스 트랙과 겹치면 같은 객체의 ID가 바뀐 것으로 간주
+                for other, (o_frame, o_cls, o_box) in last_seen.items():
+                    if o_cls != cls or o_frame >= frame_idx or frame_idx - o_frame > gap_frames: continue
+                    if iou_matrix(np.array([box]), np.array([o_box]))[0, 0] >= rebirth_iou:
+                        rebirths += 1
+                        break
+            last_seen[tid] = (frame_idx, cls, box)
+    return {
+        'ids': len(lengths),
+        'avg_len': sum(lengths.values()) / max(len(lengths), 1),
+        'id_switch_est': rebirths,
+    }
+
+
+def load_gt(path):
+    """MOT 형식 정답: {frame(0부터): [(gt_id, xyxy)]}"""
+    gt = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split(',')
+            if len(parts) < 6: continue
+            frame, gid, x, y, w, h = (float(v) for v in parts[:6])
+            gt[int(frame) - 1].append((int(gid), np.array([x, y, x + w, y + h], dtype=np.float32)))
+    return gt
+
+
+def count_id_switches(tracks, gt, iou_thresh=0.5):
+    """프레임마다 정답-예측을 IoU로 1:1 매칭하고, 정답 ID에 붙는 예측 ID가 바뀐 횟수를 셉니다."""
+    assigned, switches, matched = {}, 0, 0
+    for frame_idx, items in enumerate(tracks):
+        gt_items = gt.get(frame_idx, [])
+        if not gt_items or not items: continue
+        cost = 1.0 - iou_matrix(np.stack([b for _, b in gt_items]), np.stack([np.asarray(b) for _, _, b in items]))
+        pairs, _, _ = linear_assignment(cost, 1.0 - iou_thresh)
+        for g, p in pairs:
+            gid, pid = gt_items[g][0], items[p][0]
+            matched += 1
+            if gid in assigned and assigned[gid] != pid: switches += 1
+            assigned[gid] = pid
+    return switches, matched
+
+
+def load_builtin_params(config_path, farm_name):
+    params = {'high_thresh': 0.5, 'low_thresh': 0.1, 'new_track_thresh': 0.6, 'match_thresh': 0.8, 'track_buffer': 30}
+    if not (config_path and farm_name): return params
+    from lib.farm_config import parse_farm_config
+    cfg = parse_farm_config(config_path, farm_name)
+    keys = {'high_thresh': 'track_high_thresh', 'low_thresh': 'track_low_thresh', 'new_track_thresh': 'track_new_thresh',
+            'match_thresh': 'track_match_thresh', 'track_buffer': 'track_buffer'}
+    for name, key in keys.items():
+        if cfg.get(key): params[name] = type(params[name])(cfg[key])
+    return params
+
+
+if __name__ == "__main__":
+    from ultralytics import YOLO
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--frames", type=int, default=1500)
+    parser.add_argument("--gt", help="MOT 형식 정답 파일 (640x384 기준 좌표)")
+    parser.add_argument("--config")
+    parser.add_argument("--farm-name")
+    parser.add_argument("--skip-default", action="store_true", help="ultralytics 기본 botsort.yaml 비교 생략")
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    print(f"🎞️ 프레임 {len(frames)}개 로드 ({WIDTH}x{HEIGHT})")
+
+    params = load_builtin_params(args.config, args.farm_name)
+    detections, detect_ms = detect_all(YOLO(args.model), frames, params['low_thresh'])
+    print(f"🔍 검출만: {detect_ms:.2f} ms/frame")
+
+    results = {}
+    tracks, ms = run_builtin(detections, params)
+    results['builtin'] = (tracks, ms, ms)
+
+    tracks, ms = run_ultralytics(args.model, frames, TRACKER_CONFIG_PATH)
+    results['ultralytics (tracker_custom.yaml)'] = (tracks, ms, ms - detect_ms)
+    if not args.skip_default:
+        tracks, ms = run_ultralytics(args.model, frames, 'botsort.yaml')
+        results['ultralytics (botsort.yaml 기본)'] = (tracks, ms, ms - detect_ms)
+
+    gt = load_gt(args.gt) if args.gt else None
+    print("추적기 | 전체 ms/frame | 추적 비용 ms/frame | ID 수 | 평균 길이 | ID 교체" + (" (정답 기준)" if gt else " (추정)"))
+    for name, (tracks, total_ms, track_ms) in results.items():
+        stats = track_stats(tracks)
+        if gt:
+            switches, matched = count_id_switches(tracks, gt)
+            switch_str = f"{switches} ({switches / max(matched, 1) * 1000:.1f}/1000 매칭)"
+        else:
+            switch_str = str(stats['id_switch_est'])
+        total_str = f"{detect_ms + total_ms:.2f}" if name == 'builtin' else f"{total_ms:.2f}"
+        print(f"{name} | {total_str} | {track_ms:.2f} | {stats['ids']} | {stats['avg_len']:.1f} | {switch_str}")
@@ -0,0 +1,265 @@
+'''
+    release date: 2026-10-19
+        - 기준 영상(골든 푸티지) 회귀 테스트: 출하 카운트 / 위반 시각 / 처리 속도
+        - process_video를 화면 없이(display=False) 영상 시각 기준(clock)으로 재생
+          DB Writer / 저장소 / 경고 장치는 기록만 하는 대역(stub) 사용
+        - 기대값(manifest) 대비 정확도 차이와 기준 실행(baseline) 대비 fps / p95 프레임 지연 비교
+          허용치를 넘으면 종료 코드 1
+    사용법:
+        python -m tools.golden_regression --manifest golden/manifest.json [--baseline golden/baseline.json]
+        python -m tools.golden_regression --manifest golden/manifest.json --update-baseline
+    manifest 형식: tools/golden_manifest.example.json 참고
+'''
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+
+from lib.farm_config import parse_farm_config
+from lib.model_registry import get_model_registry
+from lib.pipeline_state import PipelineState
+from lib.tracker import create_tracker
+from lib.utils import wait_for_pending_uploads
+from lib.video_processor import process_video
+
+WIDTH, HEIGHT = 640, 384
+DEFAULT_TOLERANCE = {
+    'count': 0,                 # 출하 카운트 허용 오차(두)
+    'violation_time': 2.0,      # 위반 시각 매칭 허용 오차(초)
+    'missed': 0,                # 놓친 위반 허용 건수
+    'extra': 0,                 # 오탐 위반 허용 건수
+}
+DEFAULT_FPS_DROP = 0.10         # baseline 대비 fps 10% 이상 하락 시 실패
+DEFAULT_P95_RISE = 0.20         # baseline 대비 p95 지연 20% 이상 증가 시 실패
+
+# 설정 파일 없이 manifest에 값을 직접 줄 때의 기본값/형변환
+CONFIG_DEFAULTS = {
+    'pig_reenter_thresh': 0.35, 'worker_conf': 0.6, 'motion_threshold': 300,
+    'orientation': 'height', 'dirty_zone_location': 'below',
+}
+
+
+# --- 대역(stub) ---
+class StubStorage:
+    name = "stub"
+
+    def __init__(self):
+        self.uploads = []
+
+    def upload(self, local_path, folder_name=None):
+        self.uploads.append(local_path)
+        return f"stub://{os.path.basename(local_path)}"
+
+
+class StubDBWriter:
+    def __init__(self):
+        self.records = []
+
+    def submit(self, values, on_commit=None):
+        self.records.append(values)
+        if on_commit: on_commit(True)       # 커밋 성공으로 처리해 임시 클립 정리
+
+
+class StubWarningClient:
+    def __init__(self):
+        self.signals = []
+
+    def dispatch(self, message, event_key=None):
+        self.signals.append((message, event_key))
+
+    def send_signal(self, message):
+        self.signals.append((message, None))
+
+
+class CountRecorder:
+    """DailyCountManager 대역: 증감 이력을 영상 시각과 함께 기록"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.count = 0
+        self.changes = []
+
+    def increment(self):
+        self.count += 1; self.changes.append((self.clock(), +1)); return self.count
+
+    def decrement(self):
+        self.count -= 1; self.changes.append((self.clock(), -1)); return self.count
+
+    def get_current_count(self):
+        return self.count
+
+
+# --- 평가 ---
+def percentile(values, q):
+    if not values: return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def match_violations(expected, detected, time_tol):
+    """라벨이 같고 시각 차이가 time_tol 이내인 쌍을 가까운 순서로 1:1 매칭합니다."""
+    pairs = sorted(
+        (abs(e['t'] - d['t']), i, j)
+        for i, e in enumerate(expected) for j, d in enumerate(detected)
+        if e['label'] == d['label'] and abs(e['t'] - d['t']) <= time_tol
+    )
+    used_e, used_d, matched = set(), set(), []
+    for diff, i, j in pairs:
+        if i in used_e or j in used_d: continue
+        used_e.add(i); used_d.add(j); matched.append(diff)
+    missed = [expected[i] for i in range(len(expected)) if i not in used_e]
+    extra = [detected[j] for j in range(len(detected)) if j not in used_d]
+    return matched, missed, extra
+
+
+def build_config(entry, config_path):
+    if entry.get('farm_name'):
+        farm_config = parse_farm_config(config_path, entry['farm_name'])
+    else:
+        farm_config = dict(CONFIG_DEFAULTS, farm_code=0, camera_id=entry['name'])
+    for key, value in (entry.get('config') or {}).items():
+        default = CONFIG_DEFAULTS.get(key)
+        farm_config[key] = type(default)(value) if isinstance(default, (int, float)) else value
+    return farm_config
+
+
+def run_entry(entry, config_path, base_dir):
+    farm_config = build_config(entry, config_path)
+    video_path = os.path.join(base_dir, entry['video'])
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"영상을 열 수 없습니다: {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 15.0
+
+    # 영상 시각: 재생 속도와 무관하게 실제 녹화 시간 기준으로 만료/대기 판정
+    start_wall = time.time()
+    frame_idx = [0]
+    clock = lambda: start_wall + frame_idx[0] / fps
+
+    frame_times, last_read = [], [None]
+    def read_frame():
+        now = time.perf_counter()
+        if last_read[0] is not None:
+            frame_times.append((now - last_read[0]) * 1000)     # 이전 프레임 처리 시간(ms)
+        ret, frame = cap.read()
+        last_read[0] = time.perf_counter()
+        if not ret: return None
+        frame_idx[0] += 1
+        return frame
+
+    violations = []
+    def on_event(event_type, data):
+        if event_type == "violation":
+            violations.append({'t': round(data['timestamp'] - start_wall, 2), 'label': data['label'], 'track_id': data['track_id']})
+
+    registry = get_model_registry()
+    model_ref = entry.get('model') or farm_config.get('model')
+    model = registry.acquire(model_ref)
+    tracker = create_tracker(model, farm_config)
+    if hasattr(tracker, 'reset'): tracker.reset()
+
+    storage, db_writer, warning = StubStorage(), StubDBWriter(), StubWarningClient()
+    counter = CountRecorder(clock)
+    t0 = time.perf_counter()
+    try:
+        process_video(read_frame, tracker, storage, db_writer, warning, {'manual_quit': False}, counter,
+                      farm_config=farm_config, fps=fps, width=WIDTH, height=HEIGHT,
+                      state=PipelineState(), display=False, clock=clock, event_hook=on_event)
+    finally:
+        cap.release()
+        registry.release(model_ref)
+    elapsed = time.perf_counter() - t0
+    wait_for_pending_uploads()
+
+    return {
+        'frames': frame_idx[0],
+        'fps': round(frame_idx[0] / elapsed, 2) if elapsed > 0 else 0.0,
+        'p95_ms': round(percentile(frame_times, 95), 2),
+        'count': counter.count,
+        'violations': violations,
+        'clips': len(db_writer.records),
+        'signals': len(warning.signals),
+    }
+
+
+def evaluate(entry, result, baseline, fps_drop, p95_rise):
+    tol = dict(DEFAULT_TOLERANCE, **(entry.get('tolerance') or {}))
+    expected = entry.get('expected') or {}
+    failures, notes = [], []
+
+    if 'count' in expected:
+        delta = result['count'] - expected['count']
+        notes.append(f"카운트 {result['count']} (기대 {expected['count']}, 차이 {delta:+d})")
+        if abs(delta) > tol['count']: failures.append(f"카운트 차이 {delta:+d} > ±{tol['count']}")
+
+    if 'violations' in expected:
+        matched, missed, extra = match_violations(expected['violations'], result['violations'], tol['violation_time'])
+        avg_diff = sum(matched) / len(matched) if matched else 0.0
+        notes.append(f"위반 일치 {len(matched)}/{len(expected['violations'])}, 놓침 {len(missed)}, 오탐 {len(extra)}, 평균 시각차 {avg_diff:.2f}s")
+        if len(missed) > tol['missed']: failures.append(f"놓친 위반 {len(missed)}건 {[m['t'] for m in missed]}")
+        if len(extra) > tol['extra']: failures.append(f"오탐 위반 {len(extra)}건 {[e['t'] for e in extra]}")
+
+    if baseline:
+        notes.append(f"fps {result['fps']} (기준 {baseline['fps']}), p95 {result['p95_ms']}ms (기준 {baseline['p95_ms']}ms)")
+        if baseline['fps'] and result['fps'] < baseline['fps'] * (1 - fps_drop):
+            failures.append(f"fps 하락 {baseline['fps']} → {result['fps']}")
+        if baseline['p95_ms'] and result['p95_ms'] > baseline['p95_ms'] * (1 + p95_rise):
+            failures.append(f"p95 지연 증가 {baseline['p95_ms']} → {result['p95_ms']}ms")
+        if 'count' in baseline and baseline['count'] != result['count']:
+            notes.append(f"기준 실행 대비 카운트 {result['count'] - baseline['count']:+d}")
+    else:
+        notes.append(f"fps {result['fps']}, p95 {result['p95_ms']}ms (기준 없음)")
+    return failures, notes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", required=True)
+    parser.add_argument("--config", default="./lib/farm_config.ini")
+    parser.add_argument("--baseline", help="이전 실행 결과 JSON (fps/p95 비교 기준)")
+    parser.add_argument("--update-baseline", action="store_true", help="이번 결과를 baseline 파일로 저장")
+    parser.add_argument("--only", help="실행할 항목 이름 (쉼표 구분)")
+    parser.add_argument("--fps-drop", type=float, default=DEFAULT_FPS_DROP)
+    parser.add_argument("--p95-rise", type=float, default=DEFAULT_P95_RISE)
+    args = parser.parse_args()
+
+    with open(args.manifest, encoding='utf-8') as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(args.manifest))
+    baseline_path = args.baseline or os.path.join(base_dir, 'baseline.json')
+    baselines = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    only = set(args.only.split(',')) if args.only else None
+    results, failed = {}, False
+    for entry in manifest['recordings']:
+        if only and entry['name'] not in only: continue
+        print(f"\n▶️ [{entry['name']}] {entry['video']}")
+        try:
+            result = run_entry(entry, args.config, base_dir)
+        except Exception as e:
+            print(f"❌ [{entry['name']}] 실행 실패: {e}")
+            failed = True
+            continue
+        results[entry['name']] = result
+        failures, notes = evaluate(entry, result, baselines.get(entry['name']), args.fps_drop, args.p95_rise)
+        for note in notes: print(f"   {note}")
+        if failures:
+            failed = True
+            for failure in failures: print(f"   ❌ {failure}")
+        else:
+            print("   ✅ 통과")
+
+    if args.update_baseline and results:
+        baselines.update(results)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 기준 결과 저장: {baseline_path}")
+
+    print(f"\n{'❌ 회귀 발생' if failed else '✅ 전체 통과'} ({len(results)}개 영상)")
+    sys.exit(1 if failed else 0)
@@ -2,20 +2,29 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from lib.service_manager import get_database_service
+from lib.storage_backend import create_storage_backend
+from lib.violation_rollup import get_rollup_counts, get_rollup_coverage
 from datetime import datetime, timedelta
+from string import Template
 import pymysql
+import pymysql.cursors
 import schedule
 import time
 import configparser
+import csv
+import io
 import os
-from typing import List, Dict, Tuple, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Tuple, Any, Iterator, Optional
 
 
 GMAIL_CONFIG_PATH = './lib/gmail_config.ini'
 DB_CONFIG_PATH = './lib/db_info_config.ini'
+FARM_CONFIG_PATH = './lib/farm_config.ini'
 
-def load_configurations(gmail_path: str, db_path: str) -> Tuple[Dict, str]:
-    """ 지정된 경로의 ini 파일들을 로드. """
+def load_configurations(gmail_path: str, db_path: str) -> Tuple[Dict, str, Dict]:
+    """ 지정된 경로의 ini 파일들을 로드. ([report] 섹션은 선택) """
     try:
         config = configparser.ConfigParser()
         config.read([gmail_path, db_path], encoding='utf-8')
@@ -24,12 +33,14 @@ def load_configurations(gmail_path: str, db_path: str) -> Tuple[Dict, str]:
         smtp_settings['port'] = int(smtp_settings['port'])
 
         aes_key = config.get('database', 'aes_key')
+
+        report_settings = dict(config.items('report')) if config.has_section('report') else {}
         
         print("✅ ini 파일 로드 완료.")
-        return smtp_settings, aes_key
+        return smtp_settings, aes_key, report_settings
     except Exception as e:
         print(f"❌ ini 파일 로드 중 오류 발생: {e}")
-        return None, None
+        return None, None, None
 
 def load_ini_config(file_path):
     """지정된 INI 설정 파일을 로드합니다."""
@@ -39,166 +50,411 @@ def load_ini_config(file_path):
     config.read(file_path, encoding='utf-8')
     return config
 
-def get_last_week_date_range():
-    """지난주 시작/종료 날짜를 'yymmdd' 형식으로 반환합니다."""
+def get_last_week_datetime_range() -> Tuple[datetime, datetime]:
+    """지난주 월요일 00:00 ~ 이번주 월요일 00:00 (종료 시각 미포함)"""
     today = datetime.now()
     start_of_current_week = today - timedelta(days=today.weekday())
     start_of_last_week = start_of_current_week - timedelta(days=7)
-    end_of_last_week = start_of_last_week + timedelta(days=6)
-    return start_of_last_week.strftime('%y%m%d'), end_of_last_week.strftime('%y%m%d')
+    start_date = start_of_last_week.replace(hour=0, minute=0, second=0, microsecond=0)
+    end_date = start_of_current_week.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start_date, end_date
 
-def get_weekly_violations_from_db(db_conn):
-    """지난주 위반 기록을 DB에서 가져옵니다."""
+def get_last_week_date_range():
+    """지난주 시작/종료 날짜를 'yymmdd' 형식으로 반환합니다."""
+    start_date, end_date = get_last_week_datetime_range()
+    return start_date.strftime('%y%m%d'), (end_date - timedelta(days=1)).strftime('%y%m%d')
+
+def get_weekly_violation_counts(db_conn, start_date: datetime, end_date: datetime,
+                                farm_cd: Optional[int] = None) -> Dict[str, int]:
+    """
+    기간 내 위반 건수를 유형별로 집계합니다. (total, people, pig)
+    롤업이 빠짐없이 반영된 일자(get_rollup_coverage) 이후는 롤업 테이블에서,
+    그 이전(롤업 도입 전, 도입 당일, backfill 안 된 구간)은 원본 이력을 GROUP BY 합니다.
+    farm_cd 지정 시 (farm_div_cd, event_dttm) 인덱스 범위 조회로 해당 농장만 집계합니다.
+    """
+    counts = {'total': 0, 'people': 0, 'pig': 0}
     if not db_conn or not db_conn.open: 
         print("❌ DB 연결이 없습니다.")
-        return [], 0, 0
-
+        return counts
+
+    covered_from = get_rollup_coverage(db_conn, farm_cd)
+    split = min(max(covered_from, start_date), end_date) if covered_from else end_date
+
+    sql, params = """
+        SELECT detection_target_div_cd, COUNT(*) AS cnt
+        FROM dc_biosec_violation_hist
+        WHERE event_dttm >= %s AND event_dttm < %s
+    """, [start_date, split]
+    if farm_cd:
+        sql += " AND farm_div_cd = %s"
+        params.append(farm_cd)
+    sql += " GROUP BY detection_target_div_cd"
+    try:
+        rows = []
+        if split > start_date:
+            print(f"ℹ️ 롤업 미반영 구간 원본 집계: {start_date:%Y-%m-%d} ~ {split:%Y-%m-%d}")
+            with db_conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows.extend(cursor.fetchall())
+        if split < end_date:
+            rows.extend(get_rollup_counts(db_conn, split, end_date, farm_cd, by='type'))
+        for row in rows:
+            div_cd, cnt = str(row['detection_target_div_cd']), int(row['cnt'])
+            counts['total'] += cnt
+            if div_cd in ("0", "1"): counts['people'] += cnt
+            if div_cd in ("0", "2"): counts['pig'] += cnt
+    except pymysql.Error as e:
+        print(f"❌ DB 집계 중 오류 발생: {e}")
+    return counts
+
+def stream_weekly_violations(db_conn, start_date: datetime, end_date: datetime,
+                             farm_cd: Optional[int] = None, limit: Optional[int] = None) -> Iterator[Dict]:
+    """
+    기간 내 위반 상세 행을 서버 측 커서(SSDictCursor)로 한 행씩 가져옵니다. (limit 지정 시 앞에서부터 limit건)
+    주의: 모두 소비하기 전에는 같은 연결로 다른 쿼리를 실행할 수 없습니다.
+    """
+    if not db_conn or not db_conn.open: 
+        print("❌ DB 연결이 없습니다.")
+        return
+
+    # farm_cd 지정 시 WHERE farm_div_cd = ? AND event_dttm 범위 -> idx_violation_hist_farm_dttm 범위 스캔
+    farm_filter = "farm_div_cd = %s AND " if farm_cd else ""
+    sql = f"""
+        SELECT event_dttm, snapshot_file_nm, snapshot_drive_link_addr, detection_target_div_cd,
+               thumbnail_drive_link_addr, contact_sheet_drive_link_addr, camera_id
+        FROM dc_biosec_violation_hist
+        WHERE {farm_filter}event_dttm >= %s AND event_dttm < %s
+        ORDER BY event_dttm ASC
+    """
+    params = ([farm_cd] if farm_cd else []) + [start_date, end_date]
+    if limit:
+        # 내보내기 없이 본문만 만들 때: 서버 측 커서가 닫히면서 나머지 행을 읽지 않도록
+        sql += " LIMIT %s"
+        params.append(limit)
     cursor = None
     try:
-        today = datetime.now()
-        start_of_current_week = today - timedelta(days=today.weekday())
-        start_of_last_week = start_of_current_week - timedelta(days=7)
-        start_date = start_of_last_week.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_date = start_of_current_week.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        sql = """
-            SELECT event_dttm, snapshot_file_nm, snapshot_drive_link_addr, detection_target_div_cd
-            FROM dc_biosec_violation_hist
-            WHERE event_dttm >= %s AND event_dttm < %s
-            ORDER BY event_dttm ASC
-        """
-        cursor = db_conn.cursor() # DictCursor로 설정했으므로 딕셔너리로 반환
-        cursor.execute(sql, (start_date, end_date))
-        results = cursor.fetchall()
-
-        people_count = sum(1 for row in results if row['detection_target_div_cd'] in ["0", "1"])
-        pig_count = sum(1 for row in results if row['detection_target_div_cd'] in ["0", "2"])
-        return results, people_count, pig_count
+        cursor = db_conn.cursor(pymysql.cursors.SSDictCursor)
+        cursor.execute(sql, params)
+        for row in cursor:
+            yield row
     except pymysql.Error as e:
         print(f"❌ DB 조회 중 오류 발생: {e}")
-        return [], 0, 0
     finally:
         if cursor:
             cursor.close()
 
-def get_email_recipients(db_conn, aes_key):
-    """DB에서 복호화된 이메일 수신자 목록을 조회합니다."""
+def get_farm_email_recipients(db_conn, aes_key) -> Dict[Optional[int], List[str]]:
+    """
+    농장별 수신자 목록을 조회합니다. {farm_div_cd: [이메일, ...]}
+    farm_div_cd가 비어 있는 수신자(본사 등)는 None 키로 묶이며 모든 농장 보고서를 받습니다.
+    """
     if not db_conn or not db_conn.open:
         print("❌ DB 연결이 없습니다.")
-        return []
-
-    recipients_list = []
-    cursor = None
+        return {}
+
+    sql = """
+        SELECT T2.farm_div_cd, CAST(AES_DECRYPT(UNHEX(T1.user_email_addr), %s) AS CHAR) AS decrypted_email
+        FROM dw_biosec_user_mas T1
+        INNER JOIN dw_biosec_receive_info T2 ON T1.seq = T2.user_seq
+        WHERE T2.receive_yn = %s AND T2.alarm_method_div_cd = %s;
+    """
+    recipients = {}
     try:
-        sql = """
-            SELECT CAST(AES_DECRYPT(UNHEX(T1.user_email_addr), %s) AS CHAR) AS decrypted_email
-            FROM dw_biosec_user_mas T1
-            INNER JOIN dw_biosec_receive_info T2 ON T1.seq = T2.user_seq
-            WHERE T2.receive_yn = %s AND T2.alarm_method_div_cd = %s;
-        """
-        cursor = db_conn.cursor() # DictCursor 사용 시 `row['decrypted_email']`로 접근
-        cursor.execute(sql, (aes_key, 'y', 1))
-        results = cursor.fetchall()
-        # DictCursor를 사용했으므로 row['decrypted_email']로 접근
-        recipients_list = [row['decrypted_email'] for row in results if row and row['decrypted_email']]
-        print(f"📬 조회된 수신자 목록: {recipients_list}")
-        return recipients_list
+        with db_conn.cursor() as cursor:
+            cursor.execute(sql, (aes_key, 'y', 1))
+            for row in cursor.fetchall():
+                if not row['decrypted_email']: continue
+                farm_cd = int(row['farm_div_cd']) if row['farm_div_cd'] is not None else None
+                emails = recipients.setdefault(farm_cd, [])
+                if row['decrypted_email'] not in emails:
+                    emails.append(row['decrypted_email'])
+        print(f"📬 농장별 수신자: { {k: len(v) for k, v in recipients.items()} }")
     except pymysql.Error as e:
-        print(f"❌ 수신자 조회(복호화) 중 DB 오류 발생: {e}")
-        return []
-    except Exception as e:
-        print(f"❌ 복호화 또는 처리 중 오류 발생: {e}")
-        return []
-    finally:
-        if cursor:
-            cursor.close()
+        print(f"❌ 농장별 수신자 조회(복호화) 중 DB 오류 발생: {e}")
+    return recipients
 
-def generate_weekly_summary(
-    violation_data, people_count, pig_count,
-    first_date, last_date,
-    smtp_config, recipients_list, email_subject
-):
-    """DB 데이터를 기반으로 주간 요약 이메일을 생성하고 발송합니다."""
+def load_farm_names(farm_config_path: str) -> Dict[int, str]:
+    """farm_config.ini 섹션에서 {farm_code: 섹션명}을 만듭니다. (제목 표시용, 파일이 없으면 빈 dict)"""
+    names = {}
+    if not os.path.exists(farm_config_path): return names
+    config = configparser.ConfigParser()
+    config.read(farm_config_path, encoding='utf-8')
+    for section in config.sections():
+        code = config[section].get('farm_code') or config[section].get('cd')
+        if code and code.isdigit():
+            names[int(code)] = section
+    return names
+
+# --- 보고서 템플릿 (모듈 로드 시 1회 컴파일) ---
+TYPE_LABELS = {'0': "작업자+돼지", '1': "작업자", '2': "돼지"}
+DEFAULT_MAX_ROWS = 200
+
+HTML_HEAD = Template(
+    "<html><head><style>table, td, th {border: 1px solid black; border-collapse: collapse; padding: 5px;} "
+    "th {background-color: #f2f2f2; text-align: center;} td {text-align: center;}</style></head><body>"
+    "<h2>$title ($first_date ~ $last_date)</h2>"
+)
+HTML_SUMMARY = Template(
+    "<p>ㆍ총 위반 건수: $total 건<br>"
+    "&nbsp;&nbsp;&nbsp;- 작업자 관련: $people 건<br>"
+    "&nbsp;&nbsp;&nbsp;- 돼지 관련: $pig 건<br>"
+    "ㆍ 상세 내역 (아래)</p>"
+    "<table style=\"width:100%;\"><tr><th>발생 일시</th><th>탐지 유형</th><th>스냅샷 파일명</th>"
+    "<th>영상 확인 (링크)</th><th>미리보기</th></tr>"
+)
+HTML_ROW = Template(
+    "<tr><td>$event_time</td><td>$type_str</td><td>$file_name</td>"
+    "<td><a href='$link' target='_blank'>영상 보기</a></td><td>$preview_html</td></tr>"
+)
+HTML_PAGE_NOTE = Template(
+    "<p>※ 상세 내역은 1/$pages 페이지(처음 $shown 건)만 표시됩니다. 전체 $total 건: $export_html</p>"
+)
+HTML_EMPTY = Template("<p>지난주($first_date ~ $last_date) 동안 감지된 위반 사항이 없습니다.</p>")
+
+TEXT_SUMMARY = Template(
+    "ㆍ총 위반 건수: $total 건\n"
+    "\t - 작업자 관련: $people 건\n"
+    "\t - 돼지 관련: $pig 건\n"
+    "ㆍ 상세 내역 (아래)\n\n"
+    "발생 일시 | 탐지 유형 | 파일명 | 링크 | 키프레임 | 컨택트 시트\n"
+    "---|---|---|---|---|---\n"
+)
+TEXT_ROW = Template("$event_time | $type_str | $file_name | $link | $thumb_link | $sheet_link\n")
+TEXT_PAGE_NOTE = Template("\n※ 상세 내역은 1/$pages 페이지(처음 $shown 건)만 표시됩니다. 전체 $total 건: $export_link\n")
+TEXT_EMPTY = Template("지난주($first_date ~ $last_date) 동안 감지된 위반 사항이 없습니다.")
+
+EXPORT_COLUMNS = ['event_dttm', 'detection_target_div_cd', 'snapshot_file_nm', 'snapshot_drive_link_addr',
+                  'thumbnail_drive_link_addr', 'contact_sheet_drive_link_addr', 'camera_id']
+
+def render_weekly_report(
+    rows: Iterator[Dict], counts: Dict[str, int],
+    first_date: str, last_date: str,
+    max_rows: int = DEFAULT_MAX_ROWS, export_file: Optional[io.TextIOBase] = None,
+    title: str = "주간 위반 감지 요약"
+) -> Tuple[io.StringIO, io.StringIO, int]:
+    """
+    상세 행을 한 번만 순회하며 본문을 버퍼에 기록합니다.
+    - 메일 본문에는 max_rows 건까지만 렌더링 (export_file이 없으면 그 뒤 행은 읽지 않음)
+    - export_file이 주어지면 전체 행을 CSV로 기록
+    - 요약 건수는 counts(get_weekly_violation_counts)를 그대로 사용, 상세 행 수가 어긋나면 경고만 출력
+    반환값: (text 버퍼, html 버퍼, 렌더링한 행 수)
+    """
+    text_buf, html_buf = io.StringIO(), io.StringIO()
+    html_buf.write(HTML_HEAD.substitute(title=title, first_date=first_date, last_date=last_date))
+
+    if not counts['total']:
+        text_buf.write(TEXT_EMPTY.substitute(first_date=first_date, last_date=last_date))
+        html_buf.write(HTML_EMPTY.substitute(first_date=first_date, last_date=last_date))
+        return text_buf, html_buf, 0
+
+    text_buf.write(TEXT_SUMMARY.substitute(counts))
+    html_buf.write(HTML_SUMMARY.substitute(counts))
+
+    exporter = csv.writer(export_file) if export_file else None
+    if exporter: exporter.writerow(EXPORT_COLUMNS)
+
+    shown = seen = 0
+    for record in rows:
+        seen += 1
+        if exporter:
+            exporter.writerow([record.get(col) for col in EXPORT_COLUMNS])
+        if shown >= max_rows: continue
+
+        thumb_link = record.get('thumbnail_drive_link_addr')
+        sheet_link = record.get('contact_sheet_drive_link_addr')
+        values = {
+            'event_time': record['event_dttm'].strftime('%Y-%m-%d %H:%M:%S'),
+            'type_str': TYPE_LABELS.get(str(record['detection_target_div_cd']), "알 수 없음"),
+            'file_name': record['snapshot_file_nm'],
+            'link': record['snapshot_drive_link_addr'],
+            'thumb_link': thumb_link or '-',
+            'sheet_link': sheet_link or '-',
+            'preview_html': " / ".join(
+                f"<a href='{url}' target='_blank'>{name}</a>"
+                for name, url in (("키프레임", thumb_link), ("컨택트 시트", sheet_link)) if url
+            ) or "-",
+        }
+        html_buf.write(HTML_ROW.substitute(values))
+        text_buf.write(TEXT_ROW.substitute(values))
+        shown += 1
+        if shown >= max_rows and not exporter: break
+
+    # 조회가 중간에 끊겼을 수 있으므로 상세 행으로 집계를 덮어쓰지 않음
+    expected = counts['total'] if exporter else min(counts['total'], max_rows)
+    if seen != expected:
+        print(f"⚠️ 집계({counts['total']}건)와 상세 내역({seen}건{', 내보내기 포함' if exporter else ''})이 다릅니다. "
+              f"요약은 집계 기준으로 표시합니다. (상세 조회가 중간에 끊겼을 수 있음)")
+
+    html_buf.write("</table>")
+    return text_buf, html_buf, shown
+
+def append_page_note(text_buf: io.StringIO, html_buf: io.StringIO, total: int, shown: int, export_link: Optional[str]):
+    """표시 건수가 전체보다 적으면 페이지 안내와 전체 내보내기 링크를 덧붙입니다."""
+    if shown >= total: return
+    pages = (total + shown - 1) // shown if shown else 1
+    export_html = f"<a href='{export_link}' target='_blank'>전체 내역 내려받기 (CSV)</a>" if export_link else "내보내기 파일 없음"
+    text_buf.write(TEXT_PAGE_NOTE.substitute(pages=pages, shown=shown, total=total, export_link=export_link or "-"))
+    html_buf.write(HTML_PAGE_NOTE.substitute(pages=pages, shown=shown, total=total, export_html=export_html))
+
+def build_report_message(smtp_config, recipients_list, email_subject, text_body, html_body):
     msg = MIMEMultipart('alternative')
     msg['From'] = smtp_config['sender_email']
     msg['To'] = ', '.join(recipients_list)
     msg['Subject'] = email_subject
-
-    text_body = ""
-    html_body = "<html><head><style>table, td, th {border: 1px solid black; border-collapse: collapse; padding: 5px;} th {background-color: #f2f2f2; text-align: center;} td {text-align: center;}</style></head><body>"
-    html_body += f"<h2>주간 위반 감지 요약 ({first_date} ~ {last_date})</h2>"
-
-    total_count = len(violation_data)
-
-    if violation_data:
-        summary_text = f"ㆍ총 위반 건수: {total_count} 건\n" \
-                       f"\t - 작업자 관련: {people_count} 건\n" \
-                       f"\t - 돼지 관련: {pig_count} 건\n" \
-                       f"ㆍ 상세 내역 (아래)\n\n"
-        summary_html = f"<p>ㆍ총 위반 건수: {total_count} 건<br>" \
-                       f"&nbsp;&nbsp;&nbsp;- 작업자 관련: {people_count} 건<br>" \
-                       f"&nbsp;&nbsp;&nbsp;- 돼지 관련: {pig_count} 건<br>" \
-                       f"ㆍ 상세 내역 (아래)</p>"
-        text_body += summary_text
-        html_body += summary_html
-
-        html_body += """
-            <table style="width:100%;">
-                <tr>
-                    <th>발생 일시</th>
-                    <th>탐지 유형</th>
-                    <th>스냅샷 파일명</th>
-                    <th>영상 확인 (링크)</th>
-                </tr>
-        """
-        text_body += "발생 일시 | 탐지 유형 | 파일명 | 링크\n"
-        text_body += "---|---|---|---\n"
-
-        for record in violation_data:
-            event_time = record['event_dttm'].strftime('%Y-%m-%d %H:%M:%S')
-            file_name = record['snapshot_file_nm']
-            link = record['snapshot_drive_link_addr']
-            div_cd = record['detection_target_div_cd']
-
-            if div_cd == '0':
-                type_str = "작업자+돼지"
-            elif div_cd == '1':
-                type_str = "작업자"
-            elif div_cd == '2':
-                type_str = "돼지"
-            else:
-                type_str = "알 수 없음"
-
-            html_body += f"""
-                <tr>
-                    <td>{event_time}</td>
-                    <td>{type_str}</td>
-                    <td>{file_name}</td>
-                    <td><a href='{link}' target='_blank'>영상 보기</a></td>
-                </tr>
-            """
-            text_body += f"{event_time} | {type_str} | {file_name} | {link}\n"
-
-        html_body += "</table>"
-
-    else:
-        text_body += f"지난주({first_date} ~ {last_date}) 동안 감지된 위반 사항이 없습니다."
-        html_body += f"<p>지난주({first_date} ~ {last_date}) 동안 감지된 위반 사항이 없습니다.</p>"
-
-    html_body += "</body></html>"
     msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
     msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+    return msg
+
+
+class SMTPSender:
+    """
+    하나의 인증된 SMTP 연결로 여러 메일을 보냅니다.
+    - security: ssl(기본, SMTP_SSL) | starttls | none(대역 서버 테스트용)
+    - send_interval: 메일 간 최소 간격(초) - 발송 제한 회피
+    - 연결 끊김/4xx 임시 오류는 재연결 후 max_retries회 재시도 (retry_delay * 2^n 백오프)
+    """
+    def __init__(self, smtp_config, send_interval=1.0, max_retries=2, retry_delay=2.0, timeout=30):
+        self.config = smtp_config
+        self.security = (smtp_config.get('security') or 'ssl').lower()
+        self.send_interval = float(smtp_config.get('send_interval') or send_interval)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.server = None
+        self._last_send = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        host, port = self.config['host'], self.config['port']
+        if self.security == 'ssl':
+            self.server = smtplib.SMTP_SSL(host, port, timeout=self.timeout)
+        else:
+            self.server = smtplib.SMTP(host, port, timeout=self.timeout)
+            if self.security == 'starttls':
+                self.server.starttls()
+        if self.config.get('sender_password'):
+            self.server.login(self.config['sender_email'], self.config['sender_password'])
+        print(f"✉️ SMTP 세션 연결 ({host}:{port}, {self.security})")
+
+    def send(self, msg, recipients_list):
+        """성공 여부를 반환합니다."""
+        for attempt in range(self.max_retries + 1):
+            wait = self.send_interval - (time.time() - self._last_send)
+            if wait > 0: time.sleep(wait)
+            try:
+                if self.server is None: self._connect()
+                self.server.sendmail(self.config['sender_email'], recipients_list, msg.as_string())
+                self._last_send = time.time()
+                return True
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+                print(f"❌ 이메일 발송 실패 ({attempt + 1}/{self.max_retries + 1}): {e}")
+                self.close()
+                if isinstance(e, smtplib.SMTPResponseException) and e.smtp_code >= 500:
+                    return False        # 영구 오류(인증 실패, 수신 거부 등)는 재시도하지 않음
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay * (2 ** attempt))
+        return False
+
+    def close(self):
+        if self.server is None: return
+        try:
+            self.server.quit()
+        except Exception:
+            pass
+        self.server = None
+
+
+def send_report_email(smtp_config, recipients_list, email_subject, text_body, html_body):
+    msg = build_report_message(smtp_config, recipients_list, email_subject, text_body, html_body)
+    with SMTPSender(smtp_config) as sender:
+        if sender.send(msg, recipients_list):
+            print("✅ 이메일 발송 성공!")
+
+def build_weekly_report(
+    db_conn, start_date, end_date,
+    first_date, last_date,
+    report_config=None, farm_cd=None, title="주간 위반 감지 요약"
+) -> Tuple[str, str, Dict[str, int]]:
+    """DB에서 집계/상세를 읽어 주간 보고서 본문을 만듭니다. 반환값: (text, html, counts)"""
+    report_config = report_config or {}
+    max_rows = int(report_config.get('max_rows') or DEFAULT_MAX_ROWS)
+
+    counts = get_weekly_violation_counts(db_conn, start_date, end_date, farm_cd)
+
+    export_path = None
+    export_file = None
+    if counts['total'] > max_rows:
+        export_dir = report_config.get('export_dir') or 'report_exports'
+        os.makedirs(export_dir, exist_ok=True)
+        farm_tag = f"{farm_cd}_" if farm_cd else ""
+        export_path = os.path.join(export_dir, f"violations_{farm_tag}{first_date}_{last_date}.csv")
+        export_file = open(export_path, 'w', encoding='utf-8-sig', newline='')
 
     try:
-        with smtplib.SMTP_SSL(smtp_config['host'], smtp_config['port']) as server:
-            server.login(smtp_config['sender_email'], smtp_config['sender_password'])
-            server.sendmail(smtp_config['sender_email'], recipients_list, msg.as_string())
-        print("✅ 이메일 발송 성공!")
-    except Exception as e:
-        print(f"❌ 이메일 발송 실패: {e}")
+        rows = stream_weekly_violations(db_conn, start_date, end_date, farm_cd,
+                                        limit=None if export_file else max_rows)
+        text_buf, html_buf, shown = render_weekly_report(
+            rows, counts, first_date, last_date, max_rows=max_rows, export_file=export_file, title=title
+        )
+    finally:
+        if export_file: export_file.close()
+
+    export_link = None
+    if export_path:
+        # 기본은 로컬 보관 (export_type = gdrive | s3 로 원격 공유 링크 생성)
+        storage = create_storage_backend({'export_type': 'local', 'export_local_dir': export_dir, **report_config}, prefix='export')
+        export_link = storage.upload(export_path) if storage else None
+    append_page_note(text_buf, html_buf, counts['total'], shown, export_link)
+    html_buf.write("</body></html>")
+    return text_buf.getvalue(), html_buf.getvalue(), counts
 
-def run_weekly_report_job(smtp_config: Dict, aes_key: str, db_config_path: str):
-    """주간 보고서 생성 및 발송 메인 함수."""
+def generate_weekly_summary(
+    db_conn, start_date, end_date,
+    first_date, last_date,
+    smtp_config, recipients_list, email_subject,
+    report_config=None, farm_cd=None
+):
+    """DB에서 집계/상세를 읽어 주간 요약 이메일을 생성하고 발송합니다. (farm_cd 지정 시 해당 농장만)"""
+    text_body, html_body, _ = build_weekly_report(
+        db_conn, start_date, end_date, first_date, last_date, report_config, farm_cd
+    )
+    send_report_email(smtp_config, recipients_list, email_subject, text_body, html_body)
+
+_worker_db = threading.local()
+
+def _get_worker_db_conn(db_config_path, opened):
+    """작업 스레드마다 DB 연결 1개를 재사용합니다. (SSCursor 스트리밍은 연결을 점유하므로 공유 불가)"""
+    conn = getattr(_worker_db, 'conn', None)
+    if conn is None or not conn.open:
+        conn = get_database_service(config_file_path=db_config_path)
+        _worker_db.conn = conn
+        if conn: opened.append(conn)
+    return conn
+
+def _build_farm_report(db_config_path, opened, farm_cd, farm_name, start_date, end_date, first_date, last_date, report_config):
+    t0 = time.perf_counter()
+    db_conn = _get_worker_db_conn(db_config_path, opened)
+    if db_conn is None:
+        raise RuntimeError("작업용 DB 연결 실패")
+    title = f"[{farm_name}] 주간 위반 감지 요약" if farm_name else "주간 위반 감지 요약"
+    text_body, html_body, counts = build_weekly_report(
+        db_conn, start_date, end_date, first_date, last_date, report_config, farm_cd, title
+    )
+    return text_body, html_body, counts, time.perf_counter() - t0
+
+def run_weekly_report_job(smtp_config: Dict, aes_key: str, db_config_path: str, report_config: Dict = None):
+    """
+    주간 보고서 생성 및 발송 메인 함수.
+    농장별 보고서를 작업 풀에서 동시에 생성하고, 완성되는 순서대로 하나의 SMTP 세션으로 발송합니다.
+    """
+    report_config = report_config or {}
+    db_conn_task = None
+    opened_conns = []
     try:
         print(f"[{datetime.now()}] 주간 요약 이메일 작업을 시작합니다...")
         db_conn_task = get_database_service(config_file_path=db_config_path)
@@ -207,37 +463,73 @@ def run_weekly_report_job(smtp_config: Dict, aes_key: str, db_config_path: str):
             return
         print(f"[{datetime.now()}] 작업용 DB 연결 성공.")
         
-        recipients = get_email_recipients(db_conn_task, aes_key)
-        if not recipients:
-            print("❌ 이메일을 보낼 수신자가 없어 작업을 종료합니다.")
-            return
-        violation_data, people_count, pig_count = get_weekly_violations_from_db(db_conn_task)
+        recipients_by_farm = get_farm_email_recipients(db_conn_task, aes_key)
+        common_recipients = recipients_by_farm.pop(None, [])
+        if not recipients_by_farm:
+            # 농장별 수신자가 없으면 기존처럼 전체 보고서 1건
+            if not common_recipients:
+                print("❌ 이메일을 보낼 수신자가 없어 작업을 종료합니다.")
+                return
+            recipients_by_farm = {None: []}
+
+        start_date, end_date = get_last_week_datetime_range()
         first_date, last_date = get_last_week_date_range()
+        farm_names = load_farm_names(report_config.get('farm_config_path') or FARM_CONFIG_PATH)
         
         week_num = datetime.now().isocalendar()[1]
-        subject = f"[{datetime.now().strftime('%Y-%m-%d')}] {week_num}주차 위반 감지 요약 보고서"
-
-        generate_weekly_summary(
-            violation_data, people_count, pig_count,
-            first_date, last_date,
-            smtp_config, recipients, subject
-        )
+        workers = int(report_config.get('workers') or 4)
+        timings = []
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Report") as pool, SMTPSender(smtp_config) as sender:
+            futures = {
+                pool.submit(_build_farm_report, db_config_path, opened_conns, farm_cd, farm_names.get(farm_cd),
+                            start_date, end_date, first_date, last_date, report_config): farm_cd
+                for farm_cd in recipients_by_farm
+            }
+            for future in as_completed(futures):
+                farm_cd = futures[future]
+                farm_label = farm_names.get(farm_cd, farm_cd) if farm_cd else "전체"
+                try:
+                    text_body, html_body, counts, build_sec = future.result()
+                except Exception as e:
+                    print(f"❌ [{farm_label}] 보고서 생성 실패: {e}")
+                    timings.append((farm_label, None, None, False))
+                    continue
+
+                recipients = recipients_by_farm[farm_cd] + [r for r in common_recipients if r not in recipients_by_farm[farm_cd]]
+                subject = f"[{datetime.now().strftime('%Y-%m-%d')}] {week_num}주차 위반 감지 요약 보고서"
+                if farm_cd: subject += f" - {farm_label}"
+
+                t0 = time.perf_counter()
+                msg = build_report_message(smtp_config, recipients, subject, text_body, html_body)
+                ok = sender.send(msg, recipients)
+                timings.append((farm_label, build_sec, time.perf_counter() - t0, ok))
+                print(f"{'✅' if ok else '❌'} [{farm_label}] 위반 {counts['total']}건, 수신자 {len(recipients)}명")
+
+        print("농장 | 생성(s) | 발송(s) | 결과")
+        for farm_label, build_sec, send_sec, ok in timings:
+            build_str = f"{build_sec:.2f}" if build_sec is not None else "-"
+            send_str = f"{send_sec:.2f}" if send_sec is not None else "-"
+            print(f"{farm_label} | {build_str} | {send_str} | {'성공' if ok else '실패'}")
     except Exception as e:
         print(f"❌ 주간보고서 작업 중 오류 발생: {e}")
     finally:
+        for conn in opened_conns:
+            if conn.open: conn.close()
         if db_conn_task and db_conn_task.open:
             db_conn_task.close()
             print(f"[{datetime.now()}] 작업용 DB 연결 해제.")
     print(f"[{datetime.now()}] ✅ 주간 요약 이메일 작업 완료.")
 
 
-def setup_and_run_scheduler(smtp_config: Dict, aes_key: str, db_config_path: str):
+def setup_and_run_scheduler(smtp_config: Dict, aes_key: str, db_config_path: str, report_config: Dict = None):
     """ 스케줄러를 설정하고 실행합니다. """
     schedule.every().monday.at("09:00").do(
         run_weekly_report_job,
         smtp_config=smtp_config,
         aes_key=aes_key,
-        db_config_path=db_config_path
+        db_config_path=db_config_path,
+        report_config=report_config
     )
 
     print("✅ 스케줄러 설정 완료. 매주 월요일 09:00에 보고서가 발송됩니다.")
@@ -273,8 +565,8 @@ def setup_and_run_scheduler(smtp_config: Dict, aes_key: str, db_config_path: str
 
 if __name__ == "__main__":
     try:
-        smtp_settings, db_aes_key = load_configurations(GMAIL_CONFIG_PATH, DB_CONFIG_PATH)
+        smtp_settings, db_aes_key, report_settings = load_configurations(GMAIL_CONFIG_PATH, DB_CONFIG_PATH)
         if smtp_settings and db_aes_key:
-            setup_and_run_scheduler(smtp_settings, db_aes_key, DB_CONFIG_PATH)
+            setup_and_run_scheduler(smtp_settings, db_aes_key, DB_CONFIG_PATH, report_settings)
     except Exception as e:
         print(f"❌ 프로그램 실행 중 심각한 오류 발생: {e}")
\ No newline at end of file